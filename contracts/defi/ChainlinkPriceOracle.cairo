@@ -1,14 +1,19 @@
 %lang starknet
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin
-from starkware.starknet.common.syscalls import storage_read, storage_write
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.math import assert_nn_le, assert_not_zero
+from starkware.cairo.common.math_cmp import is_le
+from starkware.cairo.common.pow import pow
+from starkware.starknet.common.syscalls import storage_read, storage_write, get_block_timestamp, get_caller_address
 from starkware.cairo.common.uint256 import Uint256, uint256_unsigned_div_rem
 
 ## Local Imports ##
 from contracts.interfaces.IAggregatorV3 import IAggregatorV3
 
 ## @title Chainlink Price Oracle
-## @description A price oracle that fetches data from a Chainlink V3 Aggregator contract.
+## @description A price oracle that fetches data from Chainlink V3 Aggregator contracts, one feed per asset.
+## @description Caches the last price so repeated reads within the staleness window skip the aggregator.
 ## @description Adapted from https://solidity-by-example.org/defi/chainlink-price-oracle/
 ## @author andreas <andreas@nascent.xyz>
 
@@ -16,8 +21,38 @@ from contracts.interfaces.IAggregatorV3 import IAggregatorV3
 ##                 STORAGE                 ##
 #############################################
 
+## Largest supported feed decimals, so the divisor fits in a Uint256 low word ##
+const MAX_DECIMALS = 38
+
+## An aggregator and the divisor that scales its answers down by its decimals ##
+struct Feed:
+    member aggregator: felt
+    member decimals: felt
+    member scale: felt
+end
+
+## The last scaled price, with the round and the time it was reported at ##
+struct PriceData:
+    member price: Uint256
+    member roundId: Uint256
+    member timestamp: felt
+end
+
 @storage_var
-func PRICE_FEED() -> (aggregator: felt):
+func OWNER() -> (owner: felt):
+end
+
+@storage_var
+func PRICE_FEEDS(asset: felt) -> (feed: Feed):
+end
+
+## Seconds a cached price stays valid after it was reported ##
+@storage_var
+func STALENESS_WINDOW() -> (window: felt):
+end
+
+@storage_var
+func CACHED_PRICES(asset: felt) -> (data: PriceData):
 end
 
 #############################################
@@ -30,35 +65,284 @@ func constructor{
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
-    price_feed: felt # Address of the Chainlink V3 Aggregator contract
+    owner: felt,
+    staleness_window: felt
+):
+    OWNER.write(owner)
+    STALENESS_WINDOW.write(staleness_window)
+    return ()
+end
+
+#############################################
+##                 ADMIN                   ##
+#############################################
+
+func onlyOwner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}():
+    let (owner) = OWNER.read()
+    let (caller) = get_caller_address()
+    assert owner = caller
+    return ()
+end
+
+@external
+func transferOwnership{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    new_owner: felt
+):
+    onlyOwner()
+    OWNER.write(new_owner)
+    return ()
+end
+
+## Registers the Chainlink V3 Aggregator reporting the price of `asset` with `decimals` ##
+## Clears the cached price of the previous feed ##
+@external
+func setFeed{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    asset: felt,
+    aggregator: felt,
+    decimals: felt
 ):
-    PRICE_FEED.write(price_feed)
+    alloc_locals
+    onlyOwner()
+    assert_nn_le(decimals, MAX_DECIMALS)
+    let (local scale) = pow(10, decimals)
+    PRICE_FEEDS.write(asset, Feed(aggregator=aggregator, decimals=decimals, scale=scale))
+    CACHED_PRICES.write(asset, PriceData(price=Uint256(0, 0), roundId=Uint256(0, 0), timestamp=0))
     return ()
 end
 
+@external
+func setStalenessWindow{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    window: felt
+):
+    onlyOwner()
+    STALENESS_WINDOW.write(window)
+    return ()
+end
+
+#############################################
+##                 VIEWS                   ##
+#############################################
+
+@view
+func getOwner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (
+    owner: felt
+):
+    let (owner) = OWNER.read()
+    return (owner)
+end
+
+@view
+func getFeed{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    asset: felt
+) -> (
+    feed: Feed
+):
+    let (feed) = PRICE_FEEDS.read(asset)
+    return (feed)
+end
+
+@view
+func stalenessWindow{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (
+    window: felt
+):
+    let (window) = STALENESS_WINDOW.read()
+    return (window)
+end
+
 #############################################
 ##              ORACLE LOGIC               ##
 #############################################
 
+## Returns the cached price while it is fresh, otherwise refreshes it from the aggregator ##
 @external
 func getLatestPrice{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
-}() -> (
+}(
+    asset: felt
+) -> (
     price: Uint256
 ):
     alloc_locals
-    let (local price_feed) = PRICE_FEED.read()
+    let (local data: PriceData) = CACHED_PRICES.read(asset)
+    let (local window) = STALENESS_WINDOW.read()
+    let (block_timestamp) = get_block_timestamp()
+    let (fresh) = _isFresh(data.timestamp, window, block_timestamp)
+    if fresh == 1:
+        return (price=data.price)
+    end
+
+    let (local updated: PriceData) = updatePrice(asset)
+    return (price=updated.price)
+end
+
+## Returns the price of every asset, from the cache while fresh and from the aggregator otherwise ##
+## Reads the staleness window and the block timestamp once for the whole batch ##
+@view
+func getLatestPrices{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    assets_len: felt,
+    assets: felt*
+) -> (
+    prices_len: felt,
+    prices: Uint256*
+):
+    alloc_locals
+    let (local prices: Uint256*) = alloc()
+    let (local window) = STALENESS_WINDOW.read()
+    let (block_timestamp) = get_block_timestamp()
+    _recursePrices(window, block_timestamp, assets_len, assets, prices)
+    return (assets_len, prices)
+end
+
+# Internal helper function for getLatestPrices
+func _recursePrices{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    window: felt,
+    block_timestamp: felt,
+    len: felt,
+    assets: felt*,
+    prices: Uint256*
+):
+    alloc_locals
+    if len == 0:
+        return ()
+    end
+
+    let (local data: PriceData) = CACHED_PRICES.read([assets])
+    let (fresh) = _isFresh(data.timestamp, window, block_timestamp)
+    if fresh == 1:
+        assert prices.low = data.price.low
+        assert prices.high = data.price.high
+        return _recursePrices(window, block_timestamp, len - 1, assets + 1, prices + Uint256.SIZE)
+    end
+
+    let (local fetched: PriceData) = _fetchPrice([assets])
+    assert prices.low = fetched.price.low
+    assert prices.high = fetched.price.high
+    return _recursePrices(window, block_timestamp, len - 1, assets + 1, prices + Uint256.SIZE)
+end
+
+## Fetches the latest round of the asset's aggregator and caches it ##
+@external
+func updatePrice{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    asset: felt
+) -> (
+    data: PriceData
+):
+    alloc_locals
+    let (local data: PriceData) = _fetchPrice(asset)
+    CACHED_PRICES.write(asset, data)
+    return (data)
+end
+
+## Returns the cached price of the asset, reverts if it is older than the staleness window ##
+@view
+func getCachedPrice{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    asset: felt
+) -> (
+    data: PriceData
+):
+    alloc_locals
+    let (local data: PriceData) = CACHED_PRICES.read(asset)
+    let (local window) = STALENESS_WINDOW.read()
+    let (block_timestamp) = get_block_timestamp()
+    let (fresh) = _isFresh(data.timestamp, window, block_timestamp)
+    assert fresh = 1
+    return (data)
+end
+
+#############################################
+##             INTERNAL LOGIC              ##
+#############################################
+
+# Reads the latest round of the asset's aggregator, scaled down by the feed decimals
+func _fetchPrice{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    asset: felt
+) -> (
+    data: PriceData
+):
+    alloc_locals
+    let (local feed: Feed) = PRICE_FEEDS.read(asset)
+    assert_not_zero(feed.aggregator)
     let (
-        roundID: Uint256, # This should be a uint80
-        price: Uint256,
+        local roundID: Uint256, # This should be a uint80
+        local price: Uint256,
         startedAt: Uint256,
-        timeStamp: Uint256,
+        local timeStamp: Uint256,
         answeredInRound: Uint256, # This should be a uint80
-    ) = IAggregatorV3.latestRoundData(contract_address=price_feed)
+    ) = IAggregatorV3.latestRoundData(contract_address=feed.aggregator)
 
-    # Price scaled up by 10 ** 8 (ETH/USD)
-    let (scaled_price: Uint256, _: Uint256) = uint256_unsigned_div_rem(price, Uint256(100000000, 0))
-    return (price=scaled_price)
-end
\ No newline at end of file
+    # Price scaled up by 10 ** decimals
+    let (local scaled_price: Uint256, _: Uint256) = uint256_unsigned_div_rem(price, Uint256(feed.scale, 0))
+
+    # Round timestamps fit in a felt
+    assert timeStamp.high = 0
+    local data: PriceData = PriceData(price=scaled_price, roundId=roundID, timestamp=timeStamp.low)
+    return (data)
+end
+
+# A price is fresh if it has been cached and was reported within the staleness window
+func _isFresh{
+    range_check_ptr
+}(
+    timestamp: felt,
+    window: felt,
+    block_timestamp: felt
+) -> (
+    fresh: felt
+):
+    if timestamp == 0:
+        return (fresh=0)
+    end
+
+    let (fresh) = is_le(block_timestamp, timestamp + window)
+    return (fresh)
+end
@@ -1,6 +1,6 @@
 %lang starknet
 
-from starkware.starknet.common.syscalls import get_caller_address
+from starkware.starknet.common.syscalls import get_caller_address, get_contract_address, get_block_timestamp
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
 from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
@@ -10,7 +10,11 @@ from starkware.cairo.common.uint256 import (
 )
 
 ## Local Imports ##
-from contracts.defi.LendingPool.LendingPoolCore import (getReserveATokenAddress, getReserveIsActive, getReserveIsFreezed)
+from contracts.defi.LendingPool.LendingPoolCore import (
+    getReserveATokenAddress, getReserveIsActive, getReserveIsFreezed, getReserveState, initializeCore,
+    updateStateOnDeposit, MAX_SCALED_BALANCE
+)
+from contracts.interfaces.IERC20 import IERC20
 
 
 ## @title Lending Pool
@@ -68,6 +72,32 @@ func onlyUnfreezedReserve{
     return ()
 end
 
+## Reserve must be active and not frozen, checked from a single storage read ##
+## Returns the rest of the reserve state so the caller doesn't read it again ##
+func onlyActiveUnfreezedReserve{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt
+) -> (
+    liquidityIndex: felt,
+    lastUpdateTimestamp: felt
+):
+    let (
+        liquidityIndex: felt,
+        lastUpdateTimestamp: felt,
+        isActive: felt,
+        isFrozen: felt
+    ) = getReserveState(reserve)
+
+    # absent native booleans, 0<>1 serves as false<>true
+    assert isActive = 1
+    assert isFrozen = 0
+
+    return (liquidityIndex, lastUpdateTimestamp)
+end
+
 ## Reserve must be active ##
 func onlyAmountGreaterThanZero{
     syscall_ptr: felt*,
@@ -88,6 +118,14 @@ end
 func INITIALIZED() -> (res: felt):
 end
 
+#############################################
+##                 EVENTS                  ##
+#############################################
+
+@event
+func Deposit(reserve: felt, user: felt, amount: Uint256, referral: Uint256, timestamp: felt):
+end
+
 #############################################
 ##               CONSTRUCTOR               ##
 #############################################
@@ -97,8 +135,11 @@ func constructor{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
-}():
+}(
+    owner: felt # Configures the reserves
+):
     INITIALIZED.write(0)
+    initializeCore(owner)
     return ()
 end
 
@@ -118,6 +159,8 @@ end
 ##               POOL LOGIC                ##
 #############################################
 
+## Deposits `amount` of the reserve asset, earning the reserve's liquidity rate ##
+@external
 func deposit{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
@@ -127,6 +170,34 @@ func deposit{
     amount: Uint256,
     referralCode: Uint256 # TODO: Should be Uint16
 ):
+    alloc_locals
+    let (local liquidityIndex, local lastUpdateTimestamp) = onlyActiveUnfreezedReserve(reserve)
 
+    # Deposits are tracked as felts, scaled by the liquidity index
+    assert amount.high = 0
+    onlyAmountGreaterThanZero(amount.low)
+    assert_le(amount.low, MAX_SCALED_BALANCE)
+
+    ## Accrue interest and credit the caller ##
+    let (local caller) = get_caller_address()
+    updateStateOnDeposit(
+        reserve,
+        caller,
+        amount.low,
+        liquidityIndex,
+        lastUpdateTimestamp
+    )
+
+    ## Transfer from caller to pool ##
+    let (contract_address) = get_contract_address()
+    IERC20.transfer_from(
+        contract_address=reserve,
+        sender=caller,
+        recipient=contract_address,
+        amount=amount
+    )
+
+    let (block_timestamp) = get_block_timestamp()
+    Deposit.emit(reserve, caller, amount, referralCode, block_timestamp)
     return ()
-end
\ No newline at end of file
+end
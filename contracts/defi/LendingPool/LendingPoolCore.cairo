@@ -1,6 +1,6 @@
 %lang starknet
 
-from starkware.starknet.common.syscalls import get_caller_address
+from starkware.starknet.common.syscalls import get_caller_address, get_block_timestamp
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
 from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
@@ -9,6 +9,9 @@ from starkware.cairo.common.uint256 import (
     Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check
 )
 
+## Local Imports ##
+from contracts.utils.math_64x61 import ONE, mul_fp, to64x61
+
 ## @title Lending Pool Core
 ## @description Refactored Core Logic for the Lending Pool
 ## @description Adapted from Aave's Lending Pool https://github.com/aave/aave-protocol
@@ -34,20 +37,78 @@ func onlyLendingPool{
     return ()
 end
 
+## Ensures that the caller is the owner configuring the reserves ##
+func onlyOwner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}():
+    alloc_locals
+    let (local caller) = get_caller_address()
+    let (owner: felt) = OWNER.read()
+    assert owner = caller
+
+    return ()
+end
+
 #############################################
 ##                 STORAGE                 ##
 #############################################
 
-struct RESERVE_DATA:
+## Reserve state takes three slots, and the deposit guard only reads the packed one ##
+## liquidityIndex and liquidityRate are 64.61 fixed point numbers below 2^125, too wide to share a felt ##
+## RESERVE_STATES packs liquidityIndex * 2^66 + lastUpdateTimestamp * 4 + isFreezed * 2 + isActive ##
+const STATE_SHIFT = 2 ** 66
+const MAX_TIMESTAMP = 2 ** 64 - 1
+const MAX_LIQUIDITY_INDEX = 2 ** 125
 
+@storage_var
+func LENDING_POOL() -> (pool: felt):
 end
 
 @storage_var
-func LENDING_POOL() -> (pool: felt):
+func OWNER() -> (owner: felt):
+end
+
+@storage_var
+func RESERVE_ATOKENS(reserve: felt) -> (aTokenAddress: felt):
 end
 
 @storage_var
-func RESERVES(reserve: felt) -> (reserveData: felt):
+func RESERVE_RATES(reserve: felt) -> (liquidityRate: felt):
+end
+
+@storage_var
+func RESERVE_STATES(reserve: felt) -> (state: felt):
+end
+
+## Deposits divided by the liquidity index at the time, as plain token amounts ##
+## Multiplying by the current index gives the balance including interest ##
+@storage_var
+func SCALED_BALANCES(reserve: felt, user: felt) -> (scaledBalance: felt):
+end
+
+@storage_var
+func TOTAL_SCALED_SUPPLY(reserve: felt) -> (scaledSupply: felt):
+end
+
+## Upper bound of scaled balances, so balance * liquidityIndex never wraps the field ##
+const MAX_SCALED_BALANCE = 2 ** 120
+
+#############################################
+##               CONSTRUCTOR               ##
+#############################################
+
+## Sets the owner configuring the reserves, called from the pool constructor ##
+func initializeCore{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt
+):
+    OWNER.write(owner)
+    return ()
 end
 
 #############################################
@@ -62,12 +123,8 @@ func getReserveATokenAddress{
 }(
     reserve: felt
 ) -> (reserve: felt):
-    let (reserveData: felt) = RESERVES.read(reserve)
-    return (reserve=reserveData)
-
-    # TODO: convert to struct
-    # let (reserveData: RESERVE_DATA) = RESERVES.read(reserve)
-    # return (reserve=reserveData.aTokenAddress)
+    let (aTokenAddress) = RESERVE_ATOKENS.read(reserve)
+    return (reserve=aTokenAddress)
 end
 
 @external
@@ -78,12 +135,8 @@ func getReserveIsActive{
 }(
     reserve: felt
 ) -> (active: felt):
-    let (reserveData: felt) = RESERVES.read(reserve)
-    return (active=reserveData)
-
-    # TODO: convert to struct
-    # let (reserveData: RESERVE_DATA) = RESERVES.read(reserve)
-    # return (reserve=reserveData.isActive)
+    let (_, _, isActive, _) = getReserveState(reserve)
+    return (active=isActive)
 end
 
 @external
@@ -94,10 +147,292 @@ func getReserveIsFreezed{
 }(
     reserve: felt
 ) -> (freezed: felt):
-    let (reserveData: felt) = RESERVES.read(reserve)
-    return (freezed=reserveData)
+    let (_, _, _, isFreezed) = getReserveState(reserve)
+    return (freezed=isFreezed)
+end
+
+## The reserve's index, last update and flags, from a single storage read ##
+func getReserveState{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt
+) -> (
+    liquidityIndex: felt,
+    lastUpdateTimestamp: felt,
+    isActive: felt,
+    isFreezed: felt
+):
+    alloc_locals
+    let (state) = RESERVE_STATES.read(reserve)
+    let (liquidityIndex, lastUpdateTimestamp, isActive, isFreezed) = unpackReserveState(state)
+    return (liquidityIndex, lastUpdateTimestamp, isActive, isFreezed)
+end
+
+@view
+func getReserveData{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt
+) -> (
+    aTokenAddress: felt,
+    liquidityIndex: felt,
+    liquidityRate: felt,
+    lastUpdateTimestamp: felt,
+    isActive: felt,
+    isFreezed: felt
+):
+    alloc_locals
+    let (local aTokenAddress) = RESERVE_ATOKENS.read(reserve)
+    let (local liquidityRate) = RESERVE_RATES.read(reserve)
+    let (liquidityIndex, lastUpdateTimestamp, isActive, isFreezed) = getReserveState(reserve)
+    return (
+        aTokenAddress=aTokenAddress,
+        liquidityIndex=liquidityIndex,
+        liquidityRate=liquidityRate,
+        lastUpdateTimestamp=lastUpdateTimestamp,
+        isActive=isActive,
+        isFreezed=isFreezed
+    )
+end
 
-    # TODO: convert to struct
-    # let (reserveData: RESERVE_DATA) = RESERVES.read(reserve)
-    # return (reserve=reserveData.isFreezed)
+## The liquidity index including the interest accrued since the last update ##
+@view
+func getReserveNormalizedIncome{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt
+) -> (liquidityIndex: felt):
+    alloc_locals
+    let (local liquidityIndex, local lastUpdateTimestamp, _, _) = getReserveState(reserve)
+    let (local liquidityRate) = RESERVE_RATES.read(reserve)
+    let (block_timestamp) = get_block_timestamp()
+    let (newLiquidityIndex) = cumulateLiquidityIndex(
+        liquidityIndex,
+        liquidityRate,
+        lastUpdateTimestamp,
+        block_timestamp
+    )
+    return (newLiquidityIndex)
+end
+
+@view
+func scaledBalanceOf{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    user: felt
+) -> (scaledBalance: felt):
+    let (scaledBalance) = SCALED_BALANCES.read(reserve, user)
+    return (scaledBalance)
+end
+
+@view
+func totalScaledSupply{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt
+) -> (scaledSupply: felt):
+    let (scaledSupply) = TOTAL_SCALED_SUPPLY.read(reserve)
+    return (scaledSupply)
+end
+
+## The deposits of `user` in the reserve, including the interest accrued so far ##
+@view
+func balanceOf{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    user: felt
+) -> (balance: felt):
+    alloc_locals
+    let (local scaledBalance) = SCALED_BALANCES.read(reserve, user)
+    let (liquidityIndex) = getReserveNormalizedIncome(reserve)
+    let (balance, _) = unsigned_div_rem(scaledBalance * liquidityIndex, ONE)
+    return (balance)
+end
+
+#############################################
+##             STATE UPDATES               ##
+#############################################
+
+## Accrues the reserve's interest and credits `amount` to `user` ##
+## Takes the reserve state already read by the pool's guard and writes it once ##
+func updateStateOnDeposit{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    user: felt,
+    amount: felt,
+    liquidityIndex: felt,
+    lastUpdateTimestamp: felt
+) -> (liquidityIndex: felt):
+    alloc_locals
+    let (local liquidityRate) = RESERVE_RATES.read(reserve)
+    let (local block_timestamp) = get_block_timestamp()
+    let (local newLiquidityIndex) = cumulateLiquidityIndex(
+        liquidityIndex,
+        liquidityRate,
+        lastUpdateTimestamp,
+        block_timestamp
+    )
+
+    # Deposits are only accepted into active, unfrozen reserves
+    let (state) = packReserveState(newLiquidityIndex, block_timestamp, 1, 0)
+    RESERVE_STATES.write(reserve, state)
+
+    # Rounds down, in favor of the reserve
+    let (local scaledAmount, _) = unsigned_div_rem(amount * ONE, newLiquidityIndex)
+    assert_not_zero(scaledAmount)
+
+    let (scaledBalance) = SCALED_BALANCES.read(reserve, user)
+    SCALED_BALANCES.write(reserve, user, scaledBalance + scaledAmount)
+
+    let (scaledSupply) = TOTAL_SCALED_SUPPLY.read(reserve)
+    local newScaledSupply = scaledSupply + scaledAmount
+    assert_le(newScaledSupply, MAX_SCALED_BALANCE)
+    TOTAL_SCALED_SUPPLY.write(reserve, newScaledSupply)
+
+    return (newLiquidityIndex)
+end
+
+## Linear interest: liquidityIndex * (1 + liquidityRate * elapsed seconds) ##
+func cumulateLiquidityIndex{
+    range_check_ptr
+}(
+    liquidityIndex: felt,
+    liquidityRate: felt,
+    lastUpdateTimestamp: felt,
+    block_timestamp: felt
+) -> (liquidityIndex: felt):
+    alloc_locals
+    if lastUpdateTimestamp == block_timestamp:
+        return (liquidityIndex)
+    end
+
+    assert_le(lastUpdateTimestamp, block_timestamp)
+    let (local elapsed) = to64x61(block_timestamp - lastUpdateTimestamp)
+    let (local interest) = mul_fp(liquidityRate, elapsed)
+    let (newLiquidityIndex) = mul_fp(liquidityIndex, ONE + interest)
+    return (newLiquidityIndex)
+end
+
+#############################################
+##           RESERVE CONFIGURATION         ##
+#############################################
+
+## Activates a reserve backed by `aTokenAddress`, accruing `liquidityRate` per second ##
+@external
+func initReserve{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    aTokenAddress: felt,
+    liquidityRate: felt
+):
+    alloc_locals
+    onlyOwner()
+    assert_not_zero(aTokenAddress)
+
+    # A reserve is only initialized once
+    let (initialized) = RESERVE_ATOKENS.read(reserve)
+    assert initialized = 0
+
+    let (local block_timestamp) = get_block_timestamp()
+    let (state) = packReserveState(ONE, block_timestamp, 1, 0)
+    RESERVE_ATOKENS.write(reserve, aTokenAddress)
+    RESERVE_RATES.write(reserve, liquidityRate)
+    RESERVE_STATES.write(reserve, state)
+    return ()
+end
+
+@external
+func setReserveIsActive{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    active: felt
+):
+    alloc_locals
+    onlyOwner()
+    let (local liquidityIndex, local lastUpdateTimestamp, _, local isFreezed) = getReserveState(reserve)
+    # Initialized reserves always have a nonzero index
+    assert_not_zero(liquidityIndex)
+    let (state) = packReserveState(liquidityIndex, lastUpdateTimestamp, active, isFreezed)
+    RESERVE_STATES.write(reserve, state)
+    return ()
+end
+
+@external
+func setReserveIsFreezed{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reserve: felt,
+    freezed: felt
+):
+    alloc_locals
+    onlyOwner()
+    let (local liquidityIndex, local lastUpdateTimestamp, local isActive, _) = getReserveState(reserve)
+    # Initialized reserves always have a nonzero index
+    assert_not_zero(liquidityIndex)
+    let (state) = packReserveState(liquidityIndex, lastUpdateTimestamp, isActive, freezed)
+    RESERVE_STATES.write(reserve, state)
+    return ()
+end
+
+#############################################
+##              STATE PACKING              ##
+#############################################
+
+## Packs the liquidity index, last update timestamp and reserve flags into a single felt ##
+func packReserveState{
+    range_check_ptr
+}(
+    liquidityIndex: felt,
+    lastUpdateTimestamp: felt,
+    isActive: felt,
+    isFreezed: felt
+) -> (state: felt):
+    # absent native booleans, 0<>1 serves as false<>true
+    assert isActive * isActive = isActive
+    assert isFreezed * isFreezed = isFreezed
+    assert_nn_le(lastUpdateTimestamp, MAX_TIMESTAMP)
+    assert_nn_le(liquidityIndex, MAX_LIQUIDITY_INDEX)
+    return (state=liquidityIndex * STATE_SHIFT + lastUpdateTimestamp * 4 + isFreezed * 2 + isActive)
+end
+
+func unpackReserveState{
+    range_check_ptr
+}(
+    state: felt
+) -> (
+    liquidityIndex: felt,
+    lastUpdateTimestamp: felt,
+    isActive: felt,
+    isFreezed: felt
+):
+    alloc_locals
+    let (local liquidityIndex, config) = unsigned_div_rem(state, STATE_SHIFT)
+    let (local lastUpdateTimestamp, flags) = unsigned_div_rem(config, 4)
+    let (isFreezed, isActive) = unsigned_div_rem(flags, 2)
+    return (liquidityIndex, lastUpdateTimestamp, isActive, isFreezed)
 end
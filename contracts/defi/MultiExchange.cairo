@@ -5,6 +5,8 @@ from starkware.starknet.common.syscalls import get_caller_address, get_contract_
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
 from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
+from starkware.cairo.common.math_cmp import is_le_felt
+from starkware.cairo.common.alloc import alloc
 from starkware.starknet.common.syscalls import storage_read, storage_write
 from starkware.cairo.common.uint256 import (
     Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check, uint256_signed_nn_le, uint256_mul
@@ -34,6 +36,11 @@ end
 func PAIRS(id: felt) -> (pair: Pair):
 end
 
+# Canonical (token0 < token1) pair settings to the pair id, 0 if the pair doesn't exist
+@storage_var
+func PAIR_IDS(token0: felt, token1: felt, swapStrategy: felt, fee: felt) -> (id: felt):
+end
+
 # Equivalent to totalSupply
 @storage_var
 func PAIR_COUNT() -> (count: felt):
@@ -109,14 +116,12 @@ func createPair{
     # Prevent Zero Swap Strategy
     assert_not_zero(_swap_strategy)
 
-    # Swap Tokens and Amounts to prevent permutations of tokens
-    # if _tokenA > _tokenB:
-
-    # end
+    # Sort tokens to prevent permutations of the same pair
+    let (local token0, local token1) = _sortTokens(_tokenA, _tokenB)
 
-
-    # // sort tokens
-    # (address token0, address token1) = tokenA < tokenB ? (tokenA, tokenB) : (tokenB, tokenA);
+    # Prevent Duplicate Pairs
+    let (existingId) = PAIR_IDS.read(token0, token1, _swap_strategy, _fee)
+    assert existingId = 0
 
     # totalSupply++;
     # id = totalSupply;
@@ -124,16 +129,13 @@ func createPair{
     local newPairCount = pairCount + 1
     PAIR_COUNT.write(newPairCount)
 
-    # if (pairSettings[token0][token1][swapStrategy][fee] != 0) revert PairExists();
-
-    # pairSettings[token0][token1][swapStrategy][fee] = id;
-
-    # pairs[id] = Pair({
-    #     token0: token0,
-    #     token1: token1,
-    #     swapStrategy: swapStrategy,
-    #     fee: fee
-    # });
+    PAIR_IDS.write(token0, token1, _swap_strategy, _fee, newPairCount)
+    PAIRS.write(newPairCount, Pair(
+        token0=token0,
+        token1=token1,
+        swapStrategy=_swap_strategy,
+        fee=_fee
+    ))
 
     # // if base is address(0), assume ETH and overwrite amount
     # if (token0 == address(0)) token0amount = msg.value;
@@ -154,3 +156,99 @@ func createPair{
         lp=lp
     )
 end
+
+#############################################
+##                  VIEWS                  ##
+#############################################
+
+## Returns the id of the pair, 0 if it doesn't exist ##
+## The tokens may be passed in either order ##
+@view
+func getPair{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    _tokenA: felt,
+    _tokenB: felt,
+    _swap_strategy: felt,
+    _fee: felt
+) -> (
+    id: felt
+):
+    let (token0, token1) = _sortTokens(_tokenA, _tokenB)
+    let (id) = PAIR_IDS.read(token0, token1, _swap_strategy, _fee)
+    return (id)
+end
+
+@view
+func getPairById{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    _id: felt
+) -> (
+    pair: Pair
+):
+    let (pair) = PAIRS.read(_id)
+    return (pair)
+end
+
+## Resolves the id of every pair, 0 for the ones that don't exist ##
+## Tokens of each pair may be passed in either order ##
+@view
+func getPairIds{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    _pairs_len: felt,
+    _pairs: Pair*
+) -> (
+    ids_len: felt,
+    ids: felt*
+):
+    alloc_locals
+    let (local ids: felt*) = alloc()
+    _recursePairIds(_pairs_len, _pairs, ids)
+    return (_pairs_len, ids)
+end
+
+# Internal helper function for getPairIds
+func _recursePairIds{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    _len: felt,
+    _pairs: Pair*,
+    _ids: felt*
+):
+    if _len == 0:
+        return ()
+    end
+
+    let (id) = getPair(_pairs.token0, _pairs.token1, _pairs.swapStrategy, _pairs.fee)
+    assert [_ids] = id
+    return _recursePairIds(_len - 1, _pairs + Pair.SIZE, _ids + 1)
+end
+
+#############################################
+##             INTERNAL LOGIC              ##
+#############################################
+
+# Orders two token addresses so every pair has a single storage key
+func _sortTokens{range_check_ptr}(
+    _tokenA: felt,
+    _tokenB: felt
+) -> (
+    token0: felt,
+    token1: felt
+):
+    let (a_le_b) = is_le_felt(_tokenA, _tokenB)
+    if a_le_b == 1:
+        return (_tokenA, _tokenB)
+    end
+    return (_tokenB, _tokenA)
+end
@@ -1,12 +1,13 @@
 %lang starknet
 
-from starkware.starknet.common.syscalls import get_caller_address, get_contract_address
+from starkware.starknet.common.syscalls import get_caller_address, get_contract_address, get_block_timestamp
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
 from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
 from starkware.starknet.common.syscalls import storage_read, storage_write
 from starkware.cairo.common.uint256 import (
-    Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check, uint256_signed_nn_le, uint256_mul
+    Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check, uint256_signed_nn_le, uint256_mul,
+    uint256_eq, uint256_unsigned_div_rem
 )
 
 ## Local Imports ##
@@ -22,6 +23,14 @@ from contracts.interfaces.IERC20 import IERC20
 ##                 STORAGE                 ##
 #############################################
 
+## Fixed point precision of the reward per token (1e18) ##
+const PRECISION = 10 ** 18
+
+## Sets the reward rate ##
+@storage_var
+func OWNER() -> (owner: felt):
+end
+
 @storage_var
 func STAKING_TOKEN() -> (token: felt):
 end
@@ -58,28 +67,61 @@ end
 func BALANCES(user: felt) -> (balance: Uint256):
 end
 
+## Account allowed to claim a user's rewards through claimMany, 0 if none ##
+@storage_var
+func REWARD_DELEGATE(user: felt) -> (delegate: felt):
+end
+
 #############################################
 ##               CONSTRUCTOR               ##
 #############################################
 
+## The tokens are fixed at construction, swapping them would strand the accrued rewards ##
 @constructor
 func constructor{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
+    owner: felt,
     staking_token: felt,
     reward_token: felt
 ):
+    OWNER.write(owner)
     STAKING_TOKEN.write(staking_token)
     REWARD_TOKEN.write(reward_token)
     return ()
 end
 
+#############################################
+##                 ADMIN                   ##
+#############################################
+
+func onlyOwner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}():
+    let (owner) = OWNER.read()
+    let (caller) = get_caller_address()
+    assert owner = caller
+    return ()
+end
+
 #############################################
 ##                ACCESSORS                ##
 #############################################
 
+@view
+func getOwner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (owner: felt):
+    let (_owner) = OWNER.read()
+    return (owner=_owner)
+end
+
 @view
 func rewardToken{
     syscall_ptr: felt*,
@@ -154,8 +196,32 @@ func rewards{
     return (reward=_reward)
 end
 
+@view
+func totalSupply{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (total_supply: Uint256):
+    let (_total_supply) = TOTAL_SUPPLY.read()
+    return (total_supply=_total_supply)
+end
+
+@view
+func balanceOf{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    user: felt
+) -> (balance: Uint256):
+    let (_balance) = BALANCES.read(user)
+    return (balance=_balance)
+end
+
 ## MAIN VIEW FUNCTIONS ##
 
+## Rewards accumulated per staked token since the start, scaled by PRECISION ##
+## Accrues lazily from the last update, so it costs the same for any number of stakers ##
 @view
 func rewardPerToken{
     syscall_ptr: felt*,
@@ -163,18 +229,11 @@ func rewardPerToken{
     range_check_ptr
 }() -> (reward: Uint256):
     alloc_locals
+    let (local _reward_stored) = REWARD_PER_TOKEN_STORED.read()
     let (local _total_supply) = TOTAL_SUPPLY.read()
-    let (is_zero) = uint256_signed_nn_le(_total_supply, Uint256(0, 0))
-    if is_zero == 1:
-        return (reward=Uint256(0, 0))
-    end
-
-    let (_reward) = rewardPerTokenStored()
-    # TODO: get current block timestamp
-
-    # formula:
-    # rewardPerTokenStored + (((block.timestamp - lastUpdateTime) * rewardRate * 1e18) / _totalSupply);
-    return (reward=_reward)
+    let (block_timestamp) = get_block_timestamp()
+    let (reward) = _rewardPerToken(_reward_stored, _total_supply, block_timestamp)
+    return (reward)
 end
 
 @view
@@ -190,6 +249,54 @@ func earned{
     let (local user_reward) = USER_REWARD_PER_TOKEN_PAID.read(user)
     let (local accumulated_rewards) = REWARDS.read(user)
     let (reward_per_token) = rewardPerToken()
+    let (amount) = _earned(balance, reward_per_token, user_reward, accumulated_rewards)
+    return (amount)
+end
+
+## Reward per token at `block_timestamp`, given the stored value and the total supply ##
+## LAST_UPDATE_TIME and REWARD_RATE are only read while tokens are staked ##
+func _rewardPerToken{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reward_stored: Uint256,
+    total_supply: Uint256,
+    block_timestamp: felt
+) -> (reward: Uint256):
+    alloc_locals
+    let (is_zero) = uint256_eq(total_supply, Uint256(0, 0))
+    if is_zero == 1:
+        return (reward=reward_stored)
+    end
+
+    # formula:
+    # rewardPerTokenStored + (((block.timestamp - lastUpdateTime) * rewardRate * 1e18) / _totalSupply);
+    let (local _last_update_time) = LAST_UPDATE_TIME.read()
+    let (local _rate) = REWARD_RATE.read()
+    let (local elapsed: Uint256) = uint256_sub(Uint256(block_timestamp, 0), _last_update_time)
+    # Reverts rather than wrap when a product doesn't fit in 256 bits
+    let (local emitted: Uint256, emitted_high: Uint256) = uint256_mul(elapsed, _rate)
+    assert emitted_high.low = 0
+    assert emitted_high.high = 0
+    let (local scaled: Uint256, scaled_high: Uint256) = uint256_mul(emitted, Uint256(PRECISION, 0))
+    assert scaled_high.low = 0
+    assert scaled_high.high = 0
+    let (local increase: Uint256, _) = uint256_unsigned_div_rem(scaled, total_supply)
+    let (reward: Uint256, _) = uint256_add(reward_stored, increase)
+    return (reward)
+end
+
+## Rewards owed to a user, from values already read from storage ##
+func _earned{
+    range_check_ptr
+}(
+    balance: Uint256,
+    reward_per_token: Uint256,
+    user_reward: Uint256,
+    accumulated_rewards: Uint256
+) -> (amount: Uint256):
+    alloc_locals
 
     # Original formula:
     # (
@@ -198,8 +305,11 @@ func earned{
     # ) + rewards[account]
 
     let (local rel_reward: Uint256) = uint256_sub(reward_per_token, user_reward)
-    let (local rel_balance: Uint256, _: Uint256) = uint256_mul(balance, rel_reward)
-    let (local amount: Uint256, _: Uint256) = uint256_add(rel_balance, accumulated_rewards)
+    let (local rel_balance: Uint256, rel_balance_high: Uint256) = uint256_mul(balance, rel_reward)
+    assert rel_balance_high.low = 0
+    assert rel_balance_high.high = 0
+    let (local scaled_balance: Uint256, _) = uint256_unsigned_div_rem(rel_balance, Uint256(PRECISION, 0))
+    let (amount: Uint256, _) = uint256_add(scaled_balance, accumulated_rewards)
     return (amount)
 end
 
@@ -207,64 +317,88 @@ end
 ##                MUTATORS                 ##
 #############################################
 
-@view
-func setRewardToken{
+## Owner only, since it checkpoints the accumulator and re-rates all future accrual ##
+@external
+func setRewardRate{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
-    reward_token: felt
+    rate: Uint256
 ):
-    REWARD_TOKEN.write(reward_token)
+    onlyOwner()
+    ## Accrue at the previous rate first ##
+    checkpoint()
+    REWARD_RATE.write(rate)
     return ()
 end
 
-@view
-func setStakingToken{
+#############################################
+##              STAKING LOGIC              ##
+#############################################
+
+## Accrues the reward per token up to the current block ##
+## Returns the total supply it read so callers don't read it again ##
+func checkpoint{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
-}(
-    staking_token: felt
-):
-    STAKING_TOKEN.write(staking_token)
-    return ()
+}() -> (reward_per_token: Uint256, total_supply: Uint256):
+    alloc_locals
+    let (local _reward_stored) = REWARD_PER_TOKEN_STORED.read()
+    let (local _total_supply) = TOTAL_SUPPLY.read()
+    let (local block_timestamp) = get_block_timestamp()
+    let (local _reward_per_token) = _rewardPerToken(_reward_stored, _total_supply, block_timestamp)
+    REWARD_PER_TOKEN_STORED.write(_reward_per_token)
+    LAST_UPDATE_TIME.write(Uint256(block_timestamp, 0))
+    return (_reward_per_token, _total_supply)
 end
 
-@view
-func setRewardRate{
+## Called at the beginning of all staking functions ##
+## In place of Solidity's native modifiers ##
+## Checkpoints the global accumulator, then settles only `address` ##
+## Every slot is read once, the values callers need are returned ##
+## With `claim` set, the settled reward is returned and zeroed in the same write ##
+func updateReward{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
-    rate: Uint256
+    address: felt,
+    claim: felt
+) -> (
+    total_supply: Uint256,
+    balance: Uint256,
+    reward: Uint256
 ):
-    REWARD_RATE.write(rate)
-    return ()
+    alloc_locals
+    let (local _reward_per_token, local _total_supply) = checkpoint()
+    let (local balance, local reward) = _settle(address, _reward_per_token, claim)
+    return (_total_supply, balance, reward)
 end
 
-#############################################
-##              STAKING LOGIC              ##
-#############################################
-
-## Called at the beginning of all staking functions ##
-## In place of Solidity's native modifiers ##
-func updateReward{
+## Settles the rewards of `address` against an already checkpointed reward per token ##
+## `claim` is 1 when the caller pays the reward out, which stores 0 instead of the reward ##
+func _settle{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
-    address: felt
+    address: felt,
+    reward_per_token: Uint256,
+    claim: felt
+) -> (
+    balance: Uint256,
+    reward: Uint256
 ):
     alloc_locals
-    let (local _reward_per_token_stored) = rewardPerToken()
-    let _last_update_time = 0 # TODO: how to get `block.timestamp`?
-
-    let (_earned) = earned(address)
-    REWARDS.write(address, _earned)
-    USER_REWARD_PER_TOKEN_PAID.write(address, _reward_per_token_stored)
-
-    return ()
+    let (local balance) = BALANCES.read(address)
+    let (local user_reward) = USER_REWARD_PER_TOKEN_PAID.read(address)
+    let (local accumulated_rewards) = REWARDS.read(address)
+    let (local reward) = _earned(balance, reward_per_token, user_reward, accumulated_rewards)
+    REWARDS.write(address, Uint256(reward.low * (1 - claim), reward.high * (1 - claim)))
+    USER_REWARD_PER_TOKEN_PAID.write(address, reward_per_token)
+    return (balance, reward)
 end
 
 @external
@@ -278,18 +412,16 @@ func stake{
     alloc_locals
     ## !! CALL updateReward() !! ##
     let (local caller) = get_caller_address()
-    updateReward(caller)
+    let (local intial_supply, local initial_balance, _) = updateReward(caller, 0)
 
     ## Update total supply ##
-    let (intial_supply) = TOTAL_SUPPLY.read()
-    let (new_supply, _: Uint256) = uint256_add(intial_supply, amount)
+    let (local new_supply, _) = uint256_add(intial_supply, amount)
     let (positive_update) = uint256_le(intial_supply, new_supply)
     assert_not_zero(positive_update)
     TOTAL_SUPPLY.write(new_supply)
 
     ## Update balances ##
-    let (initial_balance) = BALANCES.read(caller)
-    let (new_balance, _: Uint256) = uint256_add(initial_balance, amount)
+    let (local new_balance, _) = uint256_add(initial_balance, amount)
     let (positive_update) = uint256_le(initial_balance, new_balance)
     assert_not_zero(positive_update)
     BALANCES.write(caller, new_balance)
@@ -318,28 +450,24 @@ func withdraw{
     alloc_locals
     ## !! CALL updateReward() !! ##
     let (local caller) = get_caller_address()
-    updateReward(caller)
+    let (local intial_supply, local initial_balance, _) = updateReward(caller, 0)
 
     ## Update total supply ##
-    let (intial_supply) = TOTAL_SUPPLY.read()
-    let (new_supply, _: Uint256) = uint256_add(intial_supply, amount)
-    let (negative_update) = uint256_le(new_supply, intial_supply)
+    let (negative_update) = uint256_le(amount, intial_supply)
     assert_not_zero(negative_update)
+    let (new_supply) = uint256_sub(intial_supply, amount)
     TOTAL_SUPPLY.write(new_supply)
 
     ## Update balances ##
-    let (initial_balance) = BALANCES.read(caller)
-    let (new_balance, _: Uint256) = uint256_add(initial_balance, amount)
-    let (negative_update) = uint256_le(new_balance, initial_balance)
+    let (negative_update) = uint256_le(amount, initial_balance)
     assert_not_zero(negative_update)
+    let (new_balance) = uint256_sub(initial_balance, amount)
     BALANCES.write(caller, new_balance)
 
-    ## Transfer from caller to contract ##
+    ## Transfer from contract to caller ##
     let (local staking_token) = STAKING_TOKEN.read()
-    let (contract_address) = get_contract_address()
-    IERC20.transfer_from(
+    IERC20.transfer(
         contract_address=staking_token,
-        sender=contract_address,
         recipient=caller,
         amount=amount
     )
@@ -356,20 +484,182 @@ func getReward{
     alloc_locals
     ## !! CALL updateReward() !! ##
     let (local caller) = get_caller_address()
-    updateReward(caller)
+    let (_, _, local reward) = updateReward(caller, 1)
+
+    ## Transfer from contract to caller ##
+    let (local reward_token) = REWARD_TOKEN.read()
+    IERC20.transfer(
+        contract_address=reward_token,
+        recipient=caller,
+        amount=reward
+    )
 
-    ## Send the reward to the caller ##
-    let (local reward) = REWARDS.read(caller)
-    REWARDS.write(caller, Uint256(0, 0))
+    return ()
+end
+#############################################
+##              BATCH STAKING              ##
+#############################################
+
+@view
+func rewardDelegate{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    user: felt
+) -> (delegate: felt):
+    let (delegate) = REWARD_DELEGATE.read(user)
+    return (delegate)
+end
+
+## Lets `delegate` claim the caller's rewards through claimMany, the only way to set a delegate ##
+@external
+func setRewardDelegate{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    delegate: felt
+):
+    let (caller) = get_caller_address()
+    REWARD_DELEGATE.write(caller, delegate)
+    return ()
+end
+
+## Stakes `amounts[i]` for every `recipients[i]`, funded by the caller in a single transfer ##
+## Grants the caller no rights over the recipients' rewards ##
+@external
+func stakeFor{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipients_len: felt,
+    recipients: felt*,
+    amounts_len: felt,
+    amounts: Uint256*
+):
+    alloc_locals
+    assert recipients_len = amounts_len
+    let (local caller) = get_caller_address()
+    let (local _reward_per_token, local intial_supply) = checkpoint()
+
+    let (local total) = _stakeFor(_reward_per_token, recipients_len, recipients, amounts, Uint256(0, 0))
+
+    ## Update total supply ##
+    let (local new_supply, carry) = uint256_add(intial_supply, total)
+    assert carry = 0
+    TOTAL_SUPPLY.write(new_supply)
 
     ## Transfer from caller to contract ##
-    let (local reward_token) = REWARD_TOKEN.read()
+    let (local staking_token) = STAKING_TOKEN.read()
     let (contract_address) = get_contract_address()
+    IERC20.transfer_from(
+        contract_address=staking_token,
+        sender=caller,
+        recipient=contract_address,
+        amount=total
+    )
+
+    return ()
+end
+
+# Internal helper function for stakeFor, returns the total staked
+func _stakeFor{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    reward_per_token: Uint256,
+    len: felt,
+    recipients: felt*,
+    amounts: Uint256*,
+    total: Uint256
+) -> (total: Uint256):
+    alloc_locals
+    if len == 0:
+        return (total)
+    end
+
+    local recipient = [recipients]
+    local amount: Uint256 = [amounts]
+    uint256_check(amount)
+    assert_not_zero(recipient)
+
+    ## Update balances ##
+    let (local initial_balance, _) = _settle(recipient, reward_per_token, 0)
+    let (local new_balance, carry) = uint256_add(initial_balance, amount)
+    assert carry = 0
+    BALANCES.write(recipient, new_balance)
+
+    let (local new_total, carry) = uint256_add(total, amount)
+    assert carry = 0
+
+    return _stakeFor(reward_per_token, len - 1, recipients + 1, amounts + Uint256.SIZE, new_total)
+end
+
+## Settles the rewards of every user and pays them to the caller in a single transfer ##
+## The caller must be each user or their reward delegate ##
+@external
+func claimMany{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    users_len: felt,
+    users: felt*
+):
+    alloc_locals
+    let (local caller) = get_caller_address()
+    let (local _reward_per_token, _) = checkpoint()
+
+    let (local total) = _claimMany(caller, _reward_per_token, users_len, users, Uint256(0, 0))
+
+    ## Transfer from contract to caller ##
+    let (local reward_token) = REWARD_TOKEN.read()
     IERC20.transfer(
         contract_address=reward_token,
         recipient=caller,
-        amount=reward
+        amount=total
     )
 
     return ()
-end
\ No newline at end of file
+end
+
+# Internal helper function for claimMany, returns the total claimed
+func _claimMany{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    caller: felt,
+    reward_per_token: Uint256,
+    len: felt,
+    users: felt*,
+    total: Uint256
+) -> (total: Uint256):
+    alloc_locals
+    if len == 0:
+        return (total)
+    end
+
+    local user = [users]
+    if user != caller:
+        let (delegate) = REWARD_DELEGATE.read(user)
+        assert delegate = caller
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    else:
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    end
+
+    let (_, local reward) = _settle(user, reward_per_token, 1)
+
+    let (local new_total, carry) = uint256_add(total, reward)
+    assert carry = 0
+
+    return _claimMany(caller, reward_per_token, len - 1, users + 1, new_total)
+end
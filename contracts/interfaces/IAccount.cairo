@@ -5,6 +5,15 @@
 ## @description Adapted from OpenZeppelin's Cairo Contracts: https://github.com/OpenZeppelin/cairo-contracts
 ## @author andreas <andreas@nascent.xyz>
 
+## A single call of a batch, its calldata is `calldata[data_offset:data_offset + data_len]` ##
+## Declared here so contracts can import the interface without Account's entry points ##
+struct CallArray:
+    member to: felt
+    member selector: felt
+    member data_offset: felt
+    member data_len: felt
+end
+
 @contract_interface
 namespace IAccount:
     func get_nonce() -> (res : felt):
@@ -25,4 +34,13 @@ namespace IAccount:
             nonce: felt
         ) -> (response_len: felt, response: felt*):
     end
+
+    func execute_batch(
+            call_array_len: felt,
+            call_array: CallArray*,
+            calldata_len: felt,
+            calldata: felt*,
+            nonce: felt
+        ) -> (response_len: felt, response: felt*):
+    end
 end
\ No newline at end of file
@@ -1,14 +1,18 @@
 %lang starknet
 
-from starkware.starknet.common.syscalls import get_caller_address
+from starkware.starknet.common.syscalls import get_caller_address, get_contract_address, get_block_timestamp
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
+from starkware.cairo.common.hash_state import hash_init, hash_finalize, hash_update_single
 from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
 from starkware.starknet.common.syscalls import storage_read, storage_write
 from starkware.cairo.common.uint256 import (
     Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check
 )
 
+## Local Imports ##
+from contracts.interfaces.IAccount import IAccount
+
 ## @title Mock ERC20
 ## @description Practical implementation of an ERC20 token.
 ## @author andreas <andreas@nascent.xyz>
@@ -34,12 +38,14 @@ func constructor{
     decimals: felt, # 18
     total_supply: Uint256,
     owner: felt,
+    chain_id: felt
 ):
     _name.write(name)
     _symbol.write(symbol)
     _decimals.write(decimals)
     _total_supply.write(total_supply)
     _owner.write(owner)
+    _init_domain_separator(chain_id)
     return ()
 end
 
@@ -111,13 +117,20 @@ end
 ##             EIP 2612 STORE              ##
 #############################################
 
-## TODO: EIP-2612
+## Leads every permit hash ##
+const PERMIT_TYPEHASH = 'Permit'
+
+## Leads the domain separator, which binds permits to one chain and one token ##
+const DOMAIN_TYPEHASH = 'StarkNetDomain'
+
+@storage_var
+func _nonces(owner: felt) -> (nonce: felt):
+end
 
-#     bytes32 public constant PERMIT_TYPEHASH =
-#         keccak256("Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)");
-#     uint256 internal immutable INITIAL_CHAIN_ID;
-#     bytes32 internal immutable INITIAL_DOMAIN_SEPARATOR;
-#     mapping(address => uint256) public nonces;
+## Set at construction, StarkNet has no syscall for the chain id ##
+@storage_var
+func _domain_separator() -> (domain_separator: felt):
+end
 
 #############################################
 ##               CONSTRUCTOR               ##
@@ -265,6 +278,174 @@ func transfer_from{
     return (1) # Starknet's `true`
 end
 
+## Sends `amounts[i]` to `recipients[i]`, reading and writing the sender balance once ##
+@external
+func transfer_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipients_len: felt,
+    recipients: felt*,
+    amounts_len: felt,
+    amounts: Uint256*
+) -> (success: felt):
+    alloc_locals
+    assert recipients_len = amounts_len
+    let (local sender) = get_caller_address()
+    assert_not_zero(sender)
+
+    let (sender_balance: Uint256) = _balances.read(owner=sender)
+    let (new_sender_balance: Uint256) = _transfer_batch(
+        sender, sender_balance, recipients_len, recipients, amounts
+    )
+    _balances.write(sender, new_sender_balance)
+
+    return (1) # Starknet's `true`
+end
+
+# Internal helper function for transfer_batch, returns the sender's remaining balance
+func _transfer_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    sender: felt,
+    sender_balance: Uint256,
+    recipients_len: felt,
+    recipients: felt*,
+    amounts: Uint256*
+) -> (sender_balance: Uint256):
+    alloc_locals
+    if recipients_len == 0:
+        return (sender_balance)
+    end
+    let recipient = [recipients]
+    let amount = [amounts]
+
+    ## CHECKS ##
+    assert_not_zero(recipient)
+    uint256_check(amount)
+    let (enough_balance) = uint256_le(amount, sender_balance)
+    assert_not_zero(enough_balance)
+
+    ## A transfer to self leaves the balance untouched ##
+    if recipient == sender:
+        ## NO INTERACTIONS ##
+        return _transfer_batch(
+            sender, sender_balance, recipients_len - 1, recipients + 1, amounts + Uint256.SIZE
+        )
+    end
+
+    ## EFFECTS ##
+    ## Subtract from sender, written by the caller once the batch is done ##
+    let (local new_sender_balance: Uint256) = uint256_sub(sender_balance, amount)
+
+    ## Add to recipient ##
+    let (recipient_balance: Uint256) = _balances.read(owner=recipient)
+    let (new_recipient_balance, _: Uint256) = uint256_add(recipient_balance, amount)
+    _balances.write(recipient, new_recipient_balance)
+
+    ## NO INTERACTIONS ##
+
+    return _transfer_batch(
+        sender, new_sender_balance, recipients_len - 1, recipients + 1, amounts + Uint256.SIZE
+    )
+end
+
+## EIP-2612: approves `spender` with a signature of `owner`'s account ##
+## The account checks the signature over hash(PERMIT_TYPEHASH, domain_separator, owner, spender, amount, nonce, deadline) ##
+@external
+func permit{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    spender: felt,
+    amount: Uint256,
+    deadline: felt,
+    signature_len: felt,
+    signature: felt*
+) -> (success: felt):
+    alloc_locals
+
+    ## CHECKS ##
+    assert_not_zero(owner)
+    assert_not_zero(spender)
+    uint256_check(amount)
+    let (block_timestamp) = get_block_timestamp()
+    assert_le(block_timestamp, deadline)
+
+    let (local nonce) = _nonces.read(owner)
+    let (domain_separator) = _domain_separator.read()
+    let (hash) = hash_permit(domain_separator, owner, spender, amount, nonce, deadline)
+    IAccount.is_valid_signature(
+        contract_address=owner,
+        hash=hash,
+        signature_len=signature_len,
+        signature=signature
+    )
+
+    ## EFFECTS ##
+    _nonces.write(owner, nonce + 1)
+    _allowances.write(owner, spender, amount)
+
+    ## NO INTERACTIONS ##
+
+    return (1) # Starknet's `true`
+end
+
+func hash_permit{
+    pedersen_ptr: HashBuiltin*
+}(
+    domain_separator: felt,
+    owner: felt,
+    spender: felt,
+    amount: Uint256,
+    nonce: felt,
+    deadline: felt
+) -> (res: felt):
+    let hash_ptr = pedersen_ptr
+    with hash_ptr:
+        let (hash_state_ptr) = hash_init()
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, PERMIT_TYPEHASH)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, domain_separator)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, owner)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, spender)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, amount.low)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, amount.high)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, nonce)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, deadline)
+        let (res) = hash_finalize(hash_state_ptr)
+        let pedersen_ptr = hash_ptr
+        return (res=res)
+    end
+end
+
+## hash(DOMAIN_TYPEHASH, chain_id, token), so a permit only verifies on the chain and token it was signed for ##
+func _init_domain_separator{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    chain_id: felt
+):
+    alloc_locals
+    let (local token) = get_contract_address()
+    let hash_ptr = pedersen_ptr
+    with hash_ptr:
+        let (hash_state_ptr) = hash_init()
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, DOMAIN_TYPEHASH)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, chain_id)
+        let (hash_state_ptr) = hash_update_single(hash_state_ptr, token)
+        let (domain_separator) = hash_finalize(hash_state_ptr)
+        let pedersen_ptr = hash_ptr
+        _domain_separator.write(domain_separator)
+        return ()
+    end
+end
+
 ## INTERNAL TRANSFER LOGIC ##
 func _transfer{
     syscall_ptr: felt*,
@@ -367,3 +548,23 @@ func allowance{
     let (allowance: Uint256) = _allowances.read(owner=owner, spender=spender)
     return (allowance)
 end
+
+@view
+func nonces{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(owner: felt) -> (nonce: felt):
+    let (nonce) = _nonces.read(owner)
+    return (nonce)
+end
+
+@view
+func domain_separator{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (domain_separator: felt):
+    let (domain_separator) = _domain_separator.read()
+    return (domain_separator)
+end
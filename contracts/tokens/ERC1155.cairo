@@ -3,7 +3,7 @@
 from starkware.starknet.common.syscalls import get_caller_address
 from starkware.cairo.common.cairo_builtins import HashBuiltin
 from starkware.cairo.common.hash import hash2
-from starkware.cairo.common.math import assert_le, assert_nn_le, unsigned_div_rem, assert_not_zero
+from starkware.cairo.common.math import assert_le, assert_nn, assert_nn_le, unsigned_div_rem, assert_not_zero
 from starkware.starknet.common.syscalls import storage_read, storage_write
 from starkware.cairo.common.uint256 import (
     Uint256, uint256_add, uint256_sub, uint256_le, uint256_lt, uint256_check
@@ -46,6 +46,23 @@ end
 func OPERATORS(owner: felt, operator: felt) -> (approved: felt):
 end
 
+#############################################
+##                 EVENTS                  ##
+#############################################
+
+## Emitted once for every batch of `ids` moved from `sender` to `recipient` ##
+@event
+func TransferBatch(
+    operator: felt,
+    sender: felt,
+    recipient: felt,
+    ids_len: felt,
+    ids: felt*,
+    values_len: felt,
+    values: felt*
+):
+end
+
 #############################################
 ##               CONSTRUCTOR               ##
 #############################################
@@ -147,23 +164,50 @@ func safeBatchTransferFrom{
 
     assert _ids_len = _values_len
 
-    # TODO: recurse
+    # Move every balance in a single pass
+    _batchTransfer(_from, _to, _ids_len, _ids, _values)
 
-    # // Number of transfer to execute
-    # uint256 nTransfer = _ids.length;
+    ## Emit one event for the whole batch ##
+    TransferBatch.emit(caller, _from, _to, _ids_len, _ids, _values_len, _values)
 
-    # // Executing all transfers
-    # for (uint256 i = 0; i < nTransfer; i++) {
-    #   // Update storage balance of previous bin
-    #   balances[_from][_ids[i]] = balances[_from][_ids[i]].sub(_amounts[i]);
-    #   balances[_to][_ids[i]] = balances[_to][_ids[i]].add(_amounts[i]);
-    # }
+    return ()
+end
+
+# Internal helper function for safeBatchTransferFrom
+# Moves _values[i] of _ids[i] from _from to _to, in the order of the arrays
+func _batchTransfer{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    _from: felt,
+    _to: felt,
+    _len: felt,
+    _ids: felt*,
+    _values: felt*
+):
+    alloc_locals
+    if _len == 0:
+        return ()
+    end
 
-    # // Emit event
-    # emit TransferBatch(msg.sender, _from, _to, _ids, _amounts);
+    local id = [_ids]
+    local value = [_values]
+    assert_nn(value)
 
+    # Affect Sender's balance
+    let (initial_sender_balance: felt) = BALANCES.read(_from, id)
+    local new_sender_balance = initial_sender_balance - value
+    assert_nn(new_sender_balance)
+    BALANCES.write(_from, id, new_sender_balance)
 
-    return ()
+    # Affect Recipient's balance
+    let (initial_recp_balance: felt) = BALANCES.read(_to, id)
+    local new_recp_balance = initial_recp_balance + value
+    assert_nn(new_recp_balance)
+    BALANCES.write(_to, id, new_recp_balance)
+
+    return _batchTransfer(_from, _to, _len - 1, _ids + 1, _values + 1)
 end
 
 @external
@@ -182,7 +226,7 @@ func balanceOf{
 end
 
 
-@external
+@view
 func balanceOfBatch{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
@@ -204,51 +248,30 @@ func balanceOfBatch{
 
     # Allocate memory for balances array
     let (local balances: felt*) = alloc()
-    let (_) = _recurseBalances(
-        _owners_len,
-        _owners,
-        _ids_len,
-        _ids,
-        _owners_len, #index in _ids array
-        balances
-    )
-
-    # balances_len must equal _owners_len, otherwise our recursion failed
-    # assert balances_len = _owners_len
+    _recurseBalances(_owners_len, _owners, _ids, balances)
 
     return (_owners_len, balances)
 end
 
 # Internal helper function for balanceOfBatch
+# Writes the balance of (_owners[i], _ids[i]) to _balances[i] for the first _len pairs
 func _recurseBalances{
     syscall_ptr: felt*,
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(
-    _owners_len: felt,
+    _len: felt,
     _owners: felt*,
-    _ids_len: felt,
     _ids: felt*,
-    _index: felt,
     _balances: felt*
-) -> (
-    success: felt
 ):
-    alloc_locals
-    if _index == 0:
-        return (1)
-    else:
-        let (val) = BALANCES.read(_owners[_index], _ids[_index])
-        assert [_balances + _index] = val
-        return _recurseBalances(
-            _owners_len,
-            _owners,
-            _ids_len,
-            _ids,
-            _index - 1,
-            _balances
-        )
+    if _len == 0:
+        return ()
     end
+
+    let (balance) = BALANCES.read([_owners], [_ids])
+    assert [_balances] = balance
+    return _recurseBalances(_len - 1, _owners + 1, _ids + 1, _balances + 1)
 end
 
 @external
@@ -1,6 +1,9 @@
 %lang starknet
 
 from starkware.cairo.common.registers import get_fp_and_pc
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.memcpy import memcpy
+from starkware.cairo.common.math import assert_le, assert_nn
 from starkware.starknet.common.syscalls import get_contract_address
 from starkware.cairo.common.signature import verify_ecdsa_signature
 from starkware.cairo.common.cairo_builtins import HashBuiltin, SignatureBuiltin
@@ -9,6 +12,9 @@ from starkware.cairo.common.hash_state import (
     hash_init, hash_finalize, hash_update, hash_update_single
 )
 
+## Local Imports ##
+from contracts.interfaces.IAccount import CallArray
+
 ## @title Account
 ## @description A stripped down Account adapted from OpenZeppelin's [Account.cairo](https://github.com/OpenZeppelin/cairo-contracts/blob/main/contracts/Account.cairo).
 ## @author andreas <andreas@nascent.xyz>
@@ -182,6 +188,71 @@ func execute{
     return (response_len=response.retdata_size, response=response.retdata)
 end
 
+## Verifies one signature over a list of calls and dispatches them in order ##
+@external
+func execute_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr,
+    ecdsa_ptr: SignatureBuiltin*
+}(
+    call_array_len: felt,
+    call_array: CallArray*,
+    calldata_len: felt,
+    calldata: felt*,
+    nonce: felt
+) -> (response_len: felt, response: felt*):
+    alloc_locals
+
+    let (_address) = get_contract_address()
+    let (_current_nonce) = current_nonce.read()
+
+    ## CHECKS ##
+    let (hash) = hash_batch(_address, call_array_len, call_array, calldata_len, calldata, _current_nonce)
+    let (signature_len, signature) = get_tx_signature()
+    is_valid_signature(hash, signature_len, signature)
+
+    ## EFFECTS ##
+    current_nonce.write(_current_nonce + 1)
+
+    ## INTERACTIONS ##
+    let (local response: felt*) = alloc()
+    let (response_len) = execute_calls(call_array_len, call_array, calldata, response)
+
+    return (response_len=response_len, response=response)
+end
+
+## Calls each entry of `call_array`, appending the responses to `response` ##
+func execute_calls{
+    syscall_ptr: felt*
+}(
+    call_array_len: felt,
+    call_array: CallArray*,
+    calldata: felt*,
+    response: felt*
+) -> (response_len: felt):
+    alloc_locals
+    if call_array_len == 0:
+        return (response_len=0)
+    end
+
+    let (local retdata_size, local retdata) = call_contract(
+        contract_address=call_array.to,
+        function_selector=call_array.selector,
+        calldata_size=call_array.data_len,
+        calldata=calldata + call_array.data_offset
+    )
+    memcpy(response, retdata, retdata_size)
+
+    let (response_len) = execute_calls(
+        call_array_len - 1,
+        call_array + CallArray.SIZE,
+        calldata,
+        response + retdata_size
+    )
+    return (response_len=response_len + retdata_size)
+end
+
 func hash_message{
     pedersen_ptr: HashBuiltin*
 }(
@@ -228,4 +299,92 @@ func hash_calldata{
         let pedersen_ptr = hash_ptr
         return (res=res)
     end
-end
\ No newline at end of file
+end
+
+## Hashes (sender, hash(call hashes), nonce), where each call hash is hash(to, selector, hash(calldata)) ##
+## Fails when an entry's calldata doesn't lie within `calldata` ##
+func hash_batch{
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    sender: felt,
+    call_array_len: felt,
+    call_array: CallArray*,
+    calldata_len: felt,
+    calldata: felt*,
+    nonce: felt
+) -> (res: felt):
+    alloc_locals
+    let (local call_hashes: felt*) = alloc()
+    hash_calls(call_array_len, call_array, calldata_len, calldata, call_hashes)
+    let (local res_calls) = hash_calldata(call_hashes, call_array_len)
+    let hash_ptr = pedersen_ptr
+    with hash_ptr:
+        let (hash_state_ptr) = hash_init()
+        let (hash_state_ptr) = hash_update_single(
+            hash_state_ptr, sender)
+        let (hash_state_ptr) = hash_update_single(
+            hash_state_ptr, res_calls)
+        let (hash_state_ptr) = hash_update_single(
+            hash_state_ptr, nonce)
+        let (res) = hash_finalize(hash_state_ptr)
+        let pedersen_ptr = hash_ptr
+        return (res=res)
+    end
+end
+
+func hash_calls{
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    call_array_len: felt,
+    call_array: CallArray*,
+    calldata_len: felt,
+    calldata: felt*,
+    call_hashes: felt*
+):
+    if call_array_len == 0:
+        return ()
+    end
+
+    let (res) = hash_call(call_array, calldata_len, calldata)
+    assert [call_hashes] = res
+    return hash_calls(
+        call_array_len - 1,
+        call_array + CallArray.SIZE,
+        calldata_len,
+        calldata,
+        call_hashes + 1
+    )
+end
+
+func hash_call{
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    entry: CallArray*,
+    calldata_len: felt,
+    calldata: felt*
+) -> (res: felt):
+    alloc_locals
+    # execute_calls reads the same slice, so this keeps it within the calldata
+    assert_nn(entry.data_offset)
+    assert_nn(entry.data_len)
+    assert_le(entry.data_offset + entry.data_len, calldata_len)
+    let (local res_calldata) = hash_calldata(calldata + entry.data_offset, entry.data_len)
+    let hash_ptr = pedersen_ptr
+    with hash_ptr:
+        let (hash_state_ptr) = hash_init()
+        # first two members are 'to' and 'selector'
+        let (hash_state_ptr) = hash_update(
+            hash_state_ptr,
+            entry,
+            2
+        )
+        let (hash_state_ptr) = hash_update_single(
+            hash_state_ptr, res_calldata)
+        let (res) = hash_finalize(hash_state_ptr)
+        let pedersen_ptr = hash_ptr
+        return (res=res)
+    end
+end
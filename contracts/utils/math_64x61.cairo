@@ -1,5 +1,6 @@
 %lang starknet
 
+from starkware.cairo.common.alloc import alloc
 from starkware.cairo.common.math_cmp import is_le, is_not_zero
 from starkware.cairo.common.pow import pow
 from starkware.cairo.common.math import (
@@ -11,6 +12,12 @@ const BOUND = 2 ** 125
 const ONE = 1 * FRACT_PART
 const E = 6267931151224907085
 
+# Operations shared by the batched entry points
+const OP_MUL = 0
+const OP_EXP = 1
+const OP_LN = 2
+const OP_SQRT = 3
+
 func assert_64x61{range_check_ptr}(x : felt):
     assert_le(x, BOUND)
     assert_le(-BOUND, x)
@@ -63,23 +70,55 @@ func pow_fp{range_check_ptr}(x : felt, y : felt) -> (res : felt):
         return (ONE)
     end
 
+    # Integer powers of two are a shift of ONE
+    if x == 2 * ONE:
+        let (res_2) = _pow2_fp(exp_val)
+        if exp_sign == -1:
+            return div_fp(ONE, res_2)
+        end
+        return (res_2)
+    end
+
+    let (res_p) = _pow_fp_loop(x, exp_val, ONE)
+    assert_64x61(res_p)
+
     if exp_sign == -1:
-        let (num) = pow_fp(x, exp_val)
-        return div_fp(ONE, num)
+        return div_fp(ONE, res_p)
     end
 
-    let (half_exp, rem) = unsigned_div_rem(exp_val, 2)
-    let (half_pow) = pow_fp(x, half_exp)
-    let (res_p) = mul_fp(half_pow, half_pow)
+    return (res_p)
+end
+
+# Square-and-multiply over the bits of exp, least significant first
+# exp must be positive
+# Products are rounded with signed_div_rem, which bounds every intermediate by BOUND,
+# so only the final result needs the 64x61 range check
+func _pow_fp_loop{range_check_ptr}(base : felt, exp : felt, acc : felt) -> (res : felt):
+    alloc_locals
+    let (local half_exp, rem) = unsigned_div_rem(exp, 2)
 
     if rem == 0:
-        assert_64x61(res_p)
-        return (res_p)
-    else:
-        let (res) = mul_fp(res_p, x)
-        assert_64x61(res)
-        return (res)
+        let (base_sq, _) = signed_div_rem(base * base, FRACT_PART, BOUND)
+        return _pow_fp_loop(base_sq, half_exp, acc)
+    end
+
+    let (local acc_next, _) = signed_div_rem(acc * base, FRACT_PART, BOUND)
+
+    # Skip squaring the base past the most significant bit
+    if half_exp == 0:
+        return (acc_next)
     end
+
+    let (base_sq, _) = signed_div_rem(base * base, FRACT_PART, BOUND)
+    return _pow_fp_loop(base_sq, half_exp, acc_next)
+end
+
+# Calculates 2^n as a fixed point value, where n is a non-negative felt (int)
+# 2^63 is the largest power of two below BOUND
+func _pow2_fp{range_check_ptr}(n : felt) -> (res : felt):
+    assert_le(n, 63)
+    let (shift) = pow(2, n)
+    return (shift * ONE)
 end
 
 # Calculates the square root of a fixed point value
@@ -95,23 +134,40 @@ func sqrt_fp{range_check_ptr}(x : felt) -> (res : felt):
 end
 
 # Calculates the most significant bit where x is a fixed point value
-# TODO: use binary search to improve performance
+# i.e. the number of halvings it takes to bring x down to at most ONE,
+# found by binary search over the shift instead of halving one bit at a time
 func _msb{range_check_ptr}(x : felt) -> (res : felt):
-    alloc_locals
-
-    let (cmp) = is_le(x, FRACT_PART)
-
-    if cmp == 1:
+    # Inputs in [1, 2) need no probes, as in the halving version
+    let (fits) = is_le(x, FRACT_PART)
+    if fits == 1:
         return (0)
     end
 
-    let (div, _) = unsigned_div_rem(x, 2)
-    let (rest) = _msb(div)
-    local res = 1 + rest
-    assert_64x61(res)
+    let (x, res) = _msb_step(x, 0, 64, 2 ** 63)
+    let (x, res) = _msb_step(x, res, 32, 2 ** 31)
+    let (x, res) = _msb_step(x, res, 16, 2 ** 15)
+    let (x, res) = _msb_step(x, res, 8, 2 ** 7)
+    let (x, res) = _msb_step(x, res, 4, 2 ** 3)
+    let (x, res) = _msb_step(x, res, 2, 2 ** 1)
+    let (x, res) = _msb_step(x, res, 1, 2 ** 0)
     return (res)
 end
 
+# Shifts x right by `shift` bits when it still exceeds FRACT_PART after `shift - 1` bits,
+# i.e. when x // half_scale > FRACT_PART, so a probe that fits costs one is_le and no division
+# half_scale must be 2 ** (shift - 1)
+func _msb_step{range_check_ptr}(x : felt, acc : felt, shift : felt, half_scale : felt) -> (
+        x : felt, acc : felt):
+    let (fits) = is_le(x, (FRACT_PART + 1) * half_scale - 1)
+
+    if fits == 1:
+        return (x, acc)
+    end
+
+    let (shifted, _) = unsigned_div_rem(x, 2 * half_scale)
+    return (shifted, acc + shift)
+end
+
 # Calculates the binary exponent of x: 2^x
 @view
 func exp2_fp{range_check_ptr}(x : felt) -> (res : felt):
@@ -125,7 +181,7 @@ func exp2_fp{range_check_ptr}(x : felt) -> (res : felt):
 
     let (exp_value) = abs_value(x)
     let (int_part, frac_part) = unsigned_div_rem(exp_value, FRACT_PART)
-    let (int_res) = pow_fp(2 * ONE, int_part)
+    let (int_res) = _pow2_fp(int_part)
 
     # 1.069e-7 maximum error
     const a1 = 2305842762765193127
@@ -233,3 +289,70 @@ func log10_fp{range_check_ptr}(x : felt) -> (res : felt):
     let (product) = mul_fp(log10_x, log10_2)
     return (product)
 end
+
+# Multiplies x[i] by y[i] for every i, see mul_fp
+@view
+func mul_fp_batch{range_check_ptr}(x_len : felt, x : felt*, y_len : felt, y : felt*) -> (
+        res_len : felt, res : felt*):
+    alloc_locals
+    assert x_len = y_len
+    let (local res : felt*) = alloc()
+    _map_fp(OP_MUL, x_len, x, y, res)
+    return (x_len, res)
+end
+
+# Calculates e^x[i] for every i, see exp_fp
+@view
+func exp_fp_batch{range_check_ptr}(x_len : felt, x : felt*) -> (res_len : felt, res : felt*):
+    alloc_locals
+    let (local res : felt*) = alloc()
+    _map_fp(OP_EXP, x_len, x, x, res)
+    return (x_len, res)
+end
+
+# Calculates ln(x[i]) for every i, see ln_fp
+@view
+func ln_fp_batch{range_check_ptr}(x_len : felt, x : felt*) -> (res_len : felt, res : felt*):
+    alloc_locals
+    let (local res : felt*) = alloc()
+    _map_fp(OP_LN, x_len, x, x, res)
+    return (x_len, res)
+end
+
+# Calculates the square root of x[i] for every i, see sqrt_fp
+@view
+func sqrt_fp_batch{range_check_ptr}(x_len : felt, x : felt*) -> (res_len : felt, res : felt*):
+    alloc_locals
+    let (local res : felt*) = alloc()
+    _map_fp(OP_SQRT, x_len, x, x, res)
+    return (x_len, res)
+end
+
+# Writes op(x[i], y[i]) to res[i] for the first len elements
+# Unary operations ignore y
+func _map_fp{range_check_ptr}(op : felt, len : felt, x : felt*, y : felt*, res : felt*):
+    if len == 0:
+        return ()
+    end
+
+    let (value) = _apply_fp(op, [x], [y])
+    assert [res] = value
+    return _map_fp(op, len - 1, x + 1, y + 1, res + 1)
+end
+
+func _apply_fp{range_check_ptr}(op : felt, x : felt, y : felt) -> (res : felt):
+    if op == OP_MUL:
+        return mul_fp(x, y)
+    end
+
+    if op == OP_EXP:
+        return exp_fp(x)
+    end
+
+    if op == OP_LN:
+        return ln_fp(x)
+    end
+
+    assert op = OP_SQRT
+    return sqrt_fp(x)
+end
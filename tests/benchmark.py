@@ -0,0 +1,377 @@
+"""Execution resource benchmarks for the contract entry points.
+
+Every scenario deploys a contract, drives its entry points with representative inputs and
+records the Cairo steps, builtin usage and memory holes of each call.
+
+    python tests/benchmark.py                   # compare against the baseline
+    python tests/benchmark.py --update          # record a new baseline
+    python tests/benchmark.py --threshold 0.1   # allow steps to grow by up to 10%
+    python tests/benchmark.py erc20 math64x61   # only run the given scenarios
+
+Comparison fails when the step count of any entry point grows past the threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from starkware.starknet.testing.starknet import Starknet
+from utils import deploy, Signer, get_execution_resources, uint, str_to_felt, felt_to_64x61, FP_SCALE, MAX_UINT256, set_block_timestamp, CHAIN_ID
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks.json')
+DEFAULT_THRESHOLD = 0.05
+
+signer = Signer(123456789987654321)
+
+SCENARIOS = {}
+
+def scenario(name):
+    """Registers `async def fn(starknet, record)` as a benchmark scenario."""
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+def to_resources(execution_info):
+    usage = get_execution_resources(execution_info)
+    return {
+        'n_steps': usage.n_steps,
+        'builtins': dict(sorted(usage.builtin_instance_counter.items())),
+        'n_memory_holes': usage.n_memory_holes,
+    }
+
+#############################################
+##               SCENARIOS                 ##
+#############################################
+
+@scenario('math64x61')
+async def bench_math64x61(starknet, record):
+    fp_math = await deploy(starknet, "contracts/utils/math_64x61.cairo")
+    x = felt_to_64x61(3)
+    y = felt_to_64x61(7)
+
+    record('mul_fp', await fp_math.mul_fp(x, y).call())
+    record('div_fp', await fp_math.div_fp(x, y).call())
+    record('pow_fp', await fp_math.pow_fp(x, 39).call())
+    record('pow_fp(2, n)', await fp_math.pow_fp(felt_to_64x61(2), 39).call())
+    record('sqrt_fp', await fp_math.sqrt_fp(y).call())
+    record('exp2_fp', await fp_math.exp2_fp(x).call())
+    record('exp_fp', await fp_math.exp_fp(x).call())
+    record('log2_fp', await fp_math.log2_fp(y).call())
+    record('log2_fp(2^62)', await fp_math.log2_fp(2 ** 62 * FP_SCALE).call())
+    record('ln_fp', await fp_math.ln_fp(y).call())
+
+    xs = [ felt_to_64x61(i + 1) for i in range(100) ]
+    record('mul_fp_batch(100)', await fp_math.mul_fp_batch(xs, xs).call())
+    record('ln_fp_batch(100)', await fp_math.ln_fp_batch(xs).call())
+
+@scenario('account')
+async def bench_account(starknet, record):
+    owner = await deploy(
+        starknet,
+        "contracts/utils/Account.cairo",
+        constructor_calldata=[signer.public_key]
+    )
+    ownable = await deploy(
+        starknet,
+        "contracts/utils/Ownable.cairo",
+        constructor_calldata=[owner.contract_address]
+    )
+
+    record('execute', await signer.send_transaction(
+        owner, ownable.contract_address, 'transfer_ownership', [owner.contract_address]))
+    record('execute_batch(3)', await signer.send_transactions(owner, [
+        (ownable.contract_address, 'transfer_ownership', [owner.contract_address])
+        for _ in range(3)
+    ]))
+    record('get_nonce', await owner.get_nonce().call())
+
+@scenario('ownable')
+async def bench_ownable(starknet, record):
+    ownable = await deploy(starknet, "contracts/utils/Ownable.cairo", constructor_calldata=[1])
+
+    record('get_owner', await ownable.get_owner().invoke(caller_address=1))
+    record('transfer_ownership', await ownable.transfer_ownership(2).invoke(caller_address=1))
+
+@scenario('erc20')
+async def bench_erc20(starknet, record):
+    owner, friend = 1, 2
+    erc20 = await deploy(
+        starknet,
+        "contracts/mocks/MockERC20.cairo",
+        constructor_calldata=[
+            str_to_felt("Test Contract"),
+            str_to_felt("TEST"),
+            18,
+            *uint(1000),
+            owner,
+            CHAIN_ID
+        ]
+    )
+
+    record('mint', await erc20.mint(owner, uint(1000)).invoke(caller_address=owner))
+    record('transfer', await erc20.transfer(friend, uint(100)).invoke(caller_address=owner))
+    record('approve', await erc20.approve(friend, uint(100)).invoke(caller_address=owner))
+    record('transfer_from', await erc20.transfer_from(owner, friend, uint(100)).invoke(caller_address=friend))
+    recipients = list(range(100, 110))
+    record('transfer_batch(10)', await erc20.transfer_batch(recipients, [uint(10)] * len(recipients)).invoke(caller_address=owner))
+    record('balance_of', await erc20.balance_of(owner).call())
+
+async def bench_erc721(starknet, record, path, token_id):
+    owner, friend = 1, 2
+    erc721 = await deploy(
+        starknet,
+        path,
+        constructor_calldata=[
+            str_to_felt("Test Contract"),
+            str_to_felt("TEST"),
+            str_to_felt("ipfs://"),
+            str_to_felt("hashkek")
+        ]
+    )
+
+    record('mint', await erc721.mint(owner, token_id(1)).invoke())
+    await erc721.mint(owner, token_id(2)).invoke()
+    record('approve', await erc721.approve(friend, token_id(1)).invoke(caller_address=owner))
+    record('transfer_from', await erc721.transfer_from(owner, friend, token_id(1)).invoke(caller_address=friend))
+    record('transfer', await erc721.transfer(friend, token_id(2)).invoke(caller_address=owner))
+    record('set_approval_for_all', await erc721.set_approval_for_all(friend, 1).invoke(caller_address=owner))
+    record('owner_of', await erc721.owner_of(token_id(1)).call())
+    record('balance_of', await erc721.balance_of(friend).call())
+    record('burn', await erc721.burn(token_id(1)).invoke(caller_address=friend))
+    record('mint_batch(100)', await erc721.mint_batch(owner, token_id(1000), 100).invoke())
+    record('owner_of(batched)', await erc721.owner_of(token_id(1099)).call())
+    record('transfer(batched)', await erc721.transfer(friend, token_id(1050)).invoke(caller_address=owner))
+    record('tokens_of_owner(50)', await erc721.tokens_of_owner(owner, token_id(0), 50).call())
+    record('owners_of(100)', await erc721.owners_of([token_id(i) for i in range(1000, 1100)]).call())
+
+@scenario('erc721')
+async def bench_uint_erc721(starknet, record):
+    await bench_erc721(starknet, record, "tests/mocks/MockERC721.cairo", uint)
+
+@scenario('nerc721')
+async def bench_felt_erc721(starknet, record):
+    await bench_erc721(starknet, record, "tests/mocks/MockNERC721.cairo", lambda token_id: token_id)
+
+@scenario('erc1155')
+async def bench_erc1155(starknet, record):
+    owner, recipient = 1, 2
+    erc1155 = await deploy(
+        starknet,
+        "tests/mocks/MockERC1155.cairo",
+        constructor_calldata=[str_to_felt("Test Contract"), str_to_felt("TEST"), 18, *uint(0)]
+    )
+    ids = list(range(1, 11))
+    for token_id in ids:
+        await erc1155.mint(owner, token_id, 100).invoke()
+
+    record('safeTransferFrom', await erc1155.safeTransferFrom(owner, recipient, 1, 1, 0).invoke(caller_address=owner))
+    record('safeBatchTransferFrom(10)', await erc1155.safeBatchTransferFrom(
+        owner, recipient, ids, [1] * len(ids), 0).invoke(caller_address=owner))
+    record('balanceOf', await erc1155.balanceOf(owner, 1).call())
+
+@scenario('staking')
+async def bench_staking(starknet, record):
+    token_owner, user = 1, 2
+    tokens = []
+    for symbol in ["STK", "RWD"]:
+        tokens.append(await deploy(
+            starknet,
+            "contracts/mocks/MockERC20.cairo",
+            constructor_calldata=[str_to_felt("Test Token"), str_to_felt(symbol), 18, *uint(0), token_owner, CHAIN_ID]
+        ))
+    staking_token, reward_token = tokens
+    staking_rewards = await deploy(
+        starknet,
+        "contracts/defi/StakingRewards.cairo",
+        constructor_calldata=[token_owner, staking_token.contract_address, reward_token.contract_address]
+    )
+    await reward_token.mint(staking_rewards.contract_address, uint(10 ** 9)).invoke(caller_address=token_owner)
+    await staking_token.mint(user, uint(1000)).invoke(caller_address=token_owner)
+    await staking_token.approve(staking_rewards.contract_address, MAX_UINT256).invoke(caller_address=user)
+    await staking_rewards.setRewardRate(uint(10)).invoke(caller_address=token_owner)
+    await staking_rewards.stake(uint(100)).invoke(caller_address=user)
+
+    set_block_timestamp(starknet, 10)
+    record('stake', await staking_rewards.stake(uint(100)).invoke(caller_address=user))
+    set_block_timestamp(starknet, 20)
+    record('withdraw', await staking_rewards.withdraw(uint(50)).invoke(caller_address=user))
+    set_block_timestamp(starknet, 30)
+    record('getReward', await staking_rewards.getReward().invoke(caller_address=user))
+    record('earned', await staking_rewards.earned(user).call())
+
+    users = list(range(100, 110))
+    await staking_token.mint(user, uint(1000)).invoke(caller_address=token_owner)
+    record('stakeFor(10)', await staking_rewards.stakeFor(users, [uint(10)] * len(users)).invoke(caller_address=user))
+    for delegator in users:
+        await staking_rewards.setRewardDelegate(user).invoke(caller_address=delegator)
+    set_block_timestamp(starknet, 40)
+    record('claimMany(10)', await staking_rewards.claimMany(users).invoke(caller_address=user))
+
+@scenario('oracle')
+async def bench_oracle(starknet, record):
+    owner, eth, btc, window, start = 1, 11, 12, 60, 1000
+    oracle = await deploy(
+        starknet,
+        "contracts/defi/ChainlinkPriceOracle.cairo",
+        constructor_calldata=[owner, window]
+    )
+    aggregators = []
+    for answer in [3000 * 10 ** 8, 40000 * 10 ** 18]:
+        aggregator = await deploy(starknet, "tests/mocks/MockAggregatorV3.cairo")
+        await aggregator.setRoundData(uint(1), uint(answer), uint(start), uint(start), uint(1)).invoke()
+        aggregators.append(aggregator)
+    eth_aggregator, btc_aggregator = aggregators
+    set_block_timestamp(starknet, start)
+
+    record('setFeed', await oracle.setFeed(eth, eth_aggregator.contract_address, 8).invoke(caller_address=owner))
+    await oracle.setFeed(btc, btc_aggregator.contract_address, 18).invoke(caller_address=owner)
+    record('getLatestPrice(miss)', await oracle.getLatestPrice(eth).invoke())
+    record('updatePrice', await oracle.updatePrice(eth).invoke())
+    record('getLatestPrice(hit)', await oracle.getLatestPrice(eth).invoke())
+    record('getCachedPrice', await oracle.getCachedPrice(eth).call())
+    record('getLatestPrices(3)', await oracle.getLatestPrices([eth, btc, eth]).invoke())
+    record('getFeed', await oracle.getFeed(eth).call())
+    record('stalenessWindow', await oracle.stalenessWindow().call())
+    record('setStalenessWindow', await oracle.setStalenessWindow(window).invoke(caller_address=owner))
+    record('getOwner', await oracle.getOwner().call())
+    record('transferOwnership', await oracle.transferOwnership(owner).invoke(caller_address=owner))
+
+@scenario('exchange')
+async def bench_exchange(starknet, record):
+    strategy, fee = 1, 30
+    exchange = await deploy(
+        starknet,
+        "contracts/defi/MultiExchange.cairo",
+        constructor_calldata=[0, 0]
+    )
+    tokens = list(range(100, 111))
+
+    record('initialize', await exchange.initialize().invoke())
+    record('createPair', await exchange.createPair(0, tokens[1], tokens[0], 0, 0, strategy, fee, 0).invoke())
+    for token in tokens[2:]:
+        await exchange.createPair(0, token, tokens[0], 0, 0, strategy, fee, 0).invoke()
+    record('getPair', await exchange.getPair(tokens[0], tokens[1], strategy, fee).call())
+    record('getPairById', await exchange.getPairById(1).call())
+    record('getPairIds(10)', await exchange.getPairIds([
+        (token, tokens[0], strategy, fee) for token in tokens[1:]
+    ]).call())
+
+@scenario('lending_pool')
+async def bench_lending_pool(starknet, record):
+    owner, user, a_token, start = 1, 2, 222, 1000
+    pool = await deploy(
+        starknet,
+        "contracts/defi/LendingPool/LendingPool.cairo",
+        constructor_calldata=[owner]
+    )
+    token = await deploy(
+        starknet,
+        "contracts/mocks/MockERC20.cairo",
+        constructor_calldata=[str_to_felt("Test Token"), str_to_felt("TEST"), 18, *uint(0), owner, CHAIN_ID]
+    )
+    reserve = token.contract_address
+    await token.mint(user, uint(10 ** 18)).invoke(caller_address=owner)
+    await token.approve(pool.contract_address, MAX_UINT256).invoke(caller_address=user)
+    set_block_timestamp(starknet, start)
+
+    record('initReserve', await pool.initReserve(reserve, a_token, felt_to_64x61(1) // 10 ** 6).invoke(caller_address=owner))
+    record('deposit(first)', await pool.deposit(reserve, uint(10 ** 12), uint(0)).invoke(caller_address=user))
+    set_block_timestamp(starknet, start + 3600)
+    record('deposit', await pool.deposit(reserve, uint(10 ** 12), uint(0)).invoke(caller_address=user))
+    record('getReserveData', await pool.getReserveData(reserve).call())
+    record('getReserveNormalizedIncome', await pool.getReserveNormalizedIncome(reserve).call())
+    record('balanceOf', await pool.balanceOf(reserve, user).call())
+    record('scaledBalanceOf', await pool.scaledBalanceOf(reserve, user).call())
+    record('totalScaledSupply', await pool.totalScaledSupply(reserve).call())
+    record('getReserveATokenAddress', await pool.getReserveATokenAddress(reserve).call())
+    record('getReserveIsActive', await pool.getReserveIsActive(reserve).call())
+    record('getReserveIsFreezed', await pool.getReserveIsFreezed(reserve).call())
+    record('setReserveIsFreezed', await pool.setReserveIsFreezed(reserve, 1).invoke(caller_address=owner))
+    record('setReserveIsActive', await pool.setReserveIsActive(reserve, 0).invoke(caller_address=owner))
+
+#############################################
+##                 RUNNER                  ##
+#############################################
+
+async def run(names):
+    results = {}
+    for name in names:
+        # Starknet.deploy salts contract addresses from the global random, and the steps
+        # of address comparisons depend on the addresses, so seed it for repeatable counts
+        random.seed(name)
+        starknet = await Starknet.empty()
+        entries = results[name] = {}
+
+        def record(entry, execution_info):
+            entries[entry] = to_resources(execution_info)
+
+        await SCENARIOS[name](starknet, record)
+    return results
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, results):
+    baseline = load_baseline(path) or {}
+    baseline.update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare(baseline, results, threshold):
+    """Prints every entry point against the baseline and returns the ones that regressed."""
+    regressions = []
+    for name, entries in results.items():
+        for entry, resources in entries.items():
+            label = '%s.%s' % (name, entry)
+            previous = baseline.get(name, {}).get(entry)
+            if previous is None:
+                print('%-40s %8d steps (new)' % (label, resources['n_steps']))
+                continue
+
+            delta = (resources['n_steps'] - previous['n_steps']) / previous['n_steps']
+            print('%-40s %8d steps (%+.1f%%)' % (label, resources['n_steps'], delta * 100))
+            if resources['builtins'] != previous['builtins']:
+                print('%-40s builtins %s -> %s' % ('', previous['builtins'], resources['builtins']))
+            if delta > threshold:
+                regressions.append(label)
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the execution resources of every contract entry point.')
+    parser.add_argument('scenarios', nargs='*', help='scenarios to run, all of %s by default' % sorted(SCENARIOS))
+    parser.add_argument('--update', action='store_true', help='record the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative growth in steps before failing')
+    args = parser.parse_args(argv)
+
+    unknown = [ name for name in args.scenarios if name not in SCENARIOS ]
+    if unknown:
+        parser.error('unknown scenarios %s' % unknown)
+
+    results = asyncio.run(run(args.scenarios or list(SCENARIOS)))
+
+    if args.update:
+        save_baseline(args.baseline, results)
+        print('recorded %d scenarios in %s' % (len(results), args.baseline))
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print('no baseline at %s, record one with --update' % args.baseline)
+        return 1
+
+    regressions = compare(baseline, results, args.threshold)
+    if regressions:
+        print('steps grew by more than %.1f%% in: %s' % (args.threshold * 100, ', '.join(regressions)))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
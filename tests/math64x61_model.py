@@ -0,0 +1,242 @@
+"""Vectorized reference model of contracts/utils/math_64x61.cairo.
+
+Reproduces the exact fixed point semantics of the contract, including felt wraparound,
+the floor rounding of signed_div_rem, the range checks and the polynomial coefficients,
+so that large batches of inputs can be fuzzed offline and only the interesting points
+run against the contract.
+
+Every public function takes felts as python ints, int arrays or numpy object arrays and
+returns a pair of arrays:
+    res - the felt returned by the contract, or None where the call fails
+    ok  - a boolean mask of the inputs for which the contract call succeeds
+
+The model only depends on numpy so it can be used without cairo-lang.
+"""
+import math
+import numpy as np
+
+PRIME = 2 ** 251 + 17 * 2 ** 192 + 1
+RC_BOUND = 2 ** 128
+
+INT_PART = 2 ** 64
+FRACT_PART = 2 ** 61
+BOUND = 2 ** 125
+ONE = 1 * FRACT_PART
+
+# Coefficients a6 ... a2 of exp2_fp, a1 is added after the last multiplication
+EXP2_COEFFICIENTS = [
+    4372943086487302,
+    20620759886412153,
+    128818789015678071,
+    553724477747739017,
+    1598306039479152907,
+]
+EXP2_A1 = 2305842762765193127
+
+# Coefficients a9 ... a2 of log2_fp, a1 is added after the last multiplication
+LOG2_COEFFICIENTS = [
+    -20957604075893688,
+    285568853383421422,
+    -1725595270316167421,
+    6084599848616517800,
+    -13866034373723777071,
+    21412023763986120774,
+    -23074885139408336243,
+    18803698872658890801,
+]
+LOG2_A1 = -7898418853509069178
+
+EXP_MOD = 3326628274461080623
+LN_2 = 1598288580650331957
+LOG10_2 = 694127911065419642
+
+# (shift, half_scale) of every _msb_step, in order
+MSB_STEPS = [(64, 2 ** 63), (32, 2 ** 31), (16, 2 ** 15), (8, 2 ** 7), (4, 2 ** 3), (2, 2 ** 1), (1, 2 ** 0)]
+
+_isqrt = np.frompyfunc(math.isqrt, 1, 1)
+
+#############################################
+##        CAIRO COMMON LIBRARY MODEL       ##
+#############################################
+
+def _array(x):
+    return np.asarray(x, dtype=object)
+
+def _mask(x):
+    return np.asarray(x, dtype=bool)
+
+def _select(cond, a, b):
+    return np.where(_mask(cond), _array(a), _array(b))
+
+def _as_int(value):
+    value = _array(value) % PRIME
+    return _select(value < PRIME // 2, value, value - PRIME)
+
+def _assert_le(a, b):
+    return _mask((_array(b) - a) % PRIME < RC_BOUND)
+
+def _is_nn(a):
+    a = _array(a) % PRIME
+    positive = _mask(a < RC_BOUND)
+    negative = _mask((-a - 1) % PRIME < RC_BOUND)
+    return _select(positive, 1, 0), positive | negative
+
+def _is_le(a, b):
+    return _is_nn(_array(b) - a)
+
+def _abs_value(value):
+    res = np.abs(_as_int(value))
+    return res, _mask(res < RC_BOUND)
+
+def _sign(value):
+    value = _as_int(value)
+    res = _select(value > 0, 1, _select(value < 0, -1, 0))
+    return res, _mask(np.abs(value) < RC_BOUND)
+
+def _unsigned_div_rem(value, div):
+    value = _array(value) % PRIME
+    q = value // div
+    return q, value - q * div, _mask(q < RC_BOUND)
+
+def _signed_div_rem(value, div, bound):
+    div = _array(div)
+    div_ok = _mask((div > 0) & (div <= PRIME // RC_BOUND))
+    q = _as_int(value) // _select(div_ok, div, 1)
+    return q, div_ok & _mask((q >= -bound) & (q < bound))
+
+def _sqrt(value):
+    value = _array(value) % PRIME
+    ok = _mask(value < 2 ** 250)
+    return _isqrt(_select(ok, value, 0)), ok
+
+def _pow2(n, max_n):
+    ok = _assert_le(n, max_n)
+    return 2 ** _select(ok, n, 0), ok
+
+def _finish(res, ok):
+    ok = np.broadcast_to(_mask(ok), np.shape(res))
+    return np.where(ok, _array(res) % PRIME, None), ok
+
+#############################################
+##          MATH_64X61 INTERNALS           ##
+#############################################
+
+def _assert_64x61(x):
+    return _assert_le(x, BOUND) & _assert_le(-BOUND, x)
+
+def _horner(coefficients, last, z):
+    ok = True
+    res = _array(0)
+    for coefficient in coefficients:
+        res, ok_mul = _mul_fp(res + coefficient, z)
+        ok = ok & ok_mul
+    return res + last, ok
+
+def _mul_fp(x, y):
+    res, ok = _signed_div_rem(_array(x) * y, FRACT_PART, BOUND)
+    return res, ok & _assert_64x61(res)
+
+def _div_fp(x, y):
+    div, ok_abs = _abs_value(y)
+    div_sign, ok_sign = _sign(y)
+    res_u, ok_div = _signed_div_rem(_array(x) * FRACT_PART, div, BOUND)
+    return res_u * div_sign, ok_abs & ok_sign & ok_div & _assert_64x61(res_u)
+
+def _pow2_fp(n):
+    shift, ok = _pow2(n, 63)
+    return shift * ONE, ok
+
+def _sqrt_fp(x):
+    root, ok_root = _sqrt(x)
+    res, ok_div = _signed_div_rem(root * FRACT_PART, math.isqrt(FRACT_PART), BOUND)
+    return res, ok_root & ok_div & _assert_64x61(res)
+
+def _msb(x):
+    ok = True
+    res = _array(0)
+    for shift, half_scale in MSB_STEPS:
+        q, _, ok_q = _unsigned_div_rem(x, half_scale)
+        fits, ok_fits = _is_le(q, FRACT_PART)
+        shifted, _, ok_shifted = _unsigned_div_rem(q, 2)
+        fits = _mask(fits == 1)
+        x = _select(fits, x, shifted)
+        res = _select(fits, res, res + shift)
+        ok = ok & ok_q & ok_fits & (fits | ok_shifted)
+    return res, ok
+
+def _exp2_fp(x):
+    exp_sign, ok_sign = _sign(x)
+    exp_value, ok_abs = _abs_value(x)
+    int_part, frac_part, ok_split = _unsigned_div_rem(exp_value, FRACT_PART)
+    int_res, ok_int = _pow2_fp(int_part)
+    frac_res, ok_frac = _horner(EXP2_COEFFICIENTS, EXP2_A1, frac_part)
+
+    res_u, ok_u = _mul_fp(int_res, frac_res)
+    res_i, ok_i = _div_fp(ONE, res_u)
+
+    negative = _mask(exp_sign == -1)
+    res = _select(negative, res_i, res_u)
+    ok = ok_abs & ok_split & ok_int & ok_frac & ok_u & (~negative | ok_i) & _assert_64x61(res)
+    zero = _mask(exp_sign == 0)
+    return _select(zero, ONE, res), ok_sign & (zero | ok)
+
+def _exp_fp(x):
+    bin_exp, ok_mul = _mul_fp(x, EXP_MOD)
+    res, ok = _exp2_fp(bin_exp)
+    return res, ok_mul & ok
+
+# log2_fp for x > ONE, after the checks for ONE and fractions
+def _log2_int(x):
+    x_over_two, _, ok_half = _unsigned_div_rem(x, 2)
+    b, ok_msb = _msb(x_over_two)
+    norm, _, ok_norm = _unsigned_div_rem(x, 2 ** b)
+    norm_res, ok_poly = _horner(LOG2_COEFFICIENTS, LOG2_A1, norm)
+    ok_int = _assert_le(b, INT_PART) & _assert_le(-INT_PART, b)
+    res = b * ONE + norm_res
+    return res, ok_half & ok_msb & ok_norm & ok_poly & ok_int & _assert_64x61(res)
+
+def _log2_fp(x):
+    x = _array(x) % PRIME
+    is_one = _mask(x == ONE)
+    is_frac, ok_frac = _is_le(x, FRACT_PART - 1)
+    is_frac = _mask(is_frac == 1)
+
+    # Fractions recurse on the inverse, which is always greater than ONE
+    # Negative inputs recurse forever, the contract call never succeeds
+    inv, ok_inv = _div_fp(ONE, x)
+    positive = _mask(_as_int(x) > 0)
+    res_int, ok_int = _log2_int(_select(is_frac, inv, x))
+
+    res = _select(is_frac, -res_int, res_int)
+    ok = ok_frac & ok_int & (~is_frac | (ok_inv & positive))
+    return _select(is_one, 0, res), is_one | ok
+
+def _ln_fp(x):
+    log2_x, ok_log = _log2_fp(x)
+    res, ok_mul = _mul_fp(log2_x, LN_2)
+    return res, ok_log & ok_mul
+
+#############################################
+##                  MODEL                  ##
+#############################################
+
+def mul_fp(x, y):
+    return _finish(*_mul_fp(x, y))
+
+def div_fp(x, y):
+    return _finish(*_div_fp(x, y))
+
+def sqrt_fp(x):
+    return _finish(*_sqrt_fp(x))
+
+def exp2_fp(x):
+    return _finish(*_exp2_fp(x))
+
+def exp_fp(x):
+    return _finish(*_exp_fp(x))
+
+def log2_fp(x):
+    return _finish(*_log2_fp(x))
+
+def ln_fp(x):
+    return _finish(*_ln_fp(x))
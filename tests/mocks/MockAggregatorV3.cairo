@@ -0,0 +1,72 @@
+%lang starknet
+
+from starkware.cairo.common.cairo_builtins import HashBuiltin
+from starkware.cairo.common.uint256 import Uint256
+
+## @title Mock AggregatorV3
+## @description A Chainlink V3 aggregator whose latest round is set by the tests.
+## @author andreas <andreas@nascent.xyz>
+
+#############################################
+##                 STORAGE                 ##
+#############################################
+
+struct RoundData:
+    member roundId: Uint256
+    member answer: Uint256
+    member startedAt: Uint256
+    member updatedAt: Uint256
+    member answeredInRound: Uint256
+end
+
+@storage_var
+func LATEST_ROUND() -> (round: RoundData):
+end
+
+#############################################
+##             AGGREGATOR LOGIC            ##
+#############################################
+
+@external
+func setRoundData{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    roundId: Uint256,
+    answer: Uint256,
+    startedAt: Uint256,
+    updatedAt: Uint256,
+    answeredInRound: Uint256
+):
+    LATEST_ROUND.write(RoundData(
+        roundId=roundId,
+        answer=answer,
+        startedAt=startedAt,
+        updatedAt=updatedAt,
+        answeredInRound=answeredInRound
+    ))
+    return ()
+end
+
+@view
+func latestRoundData{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}() -> (
+    roundId: Uint256,
+    answer: Uint256,
+    startedAt: Uint256,
+    updatedAt: Uint256,
+    answeredInRound: Uint256
+):
+    let (round) = LATEST_ROUND.read()
+    return (
+        roundId=round.roundId,
+        answer=round.answer,
+        startedAt=round.startedAt,
+        updatedAt=round.updatedAt,
+        answeredInRound=round.answeredInRound
+    )
+end
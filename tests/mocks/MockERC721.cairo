@@ -2,9 +2,13 @@
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin, SignatureBuiltin, BitwiseBuiltin
 from starkware.starknet.common.syscalls import get_caller_address
-from starkware.cairo.common.math import assert_not_zero
+from starkware.cairo.common.math import assert_not_zero, assert_le, assert_nn, assert_nn_le, unsigned_div_rem
+from starkware.cairo.common.math_cmp import is_le
 from starkware.cairo.common.bitwise import bitwise_or
-from starkware.cairo.common.uint256 import Uint256, uint256_sub, uint256_add
+from starkware.cairo.common.alloc import alloc
+from starkware.cairo.common.uint256 import (
+    Uint256, uint256_sub, uint256_add, uint256_check, uint256_eq, uint256_lt, uint256_le
+)
 
 ## @title ERC721
 ## @description A minimalistic implementation of ERC721 Token Standard.
@@ -29,6 +33,18 @@ struct tokenURI:
     member token_id : Uint256
 end
 
+# consecutive ids held by one owner, enumerated together
+struct OwnedRun:
+    member start : Uint256
+    member length : felt
+end
+
+## Largest number of consecutive ids minted by one _mint_batch, which bounds the owner search ##
+const MAX_BATCH_SIZE = 128
+
+## Owner of burned tokens, so owner searches stop at them ##
+const BURNED = -1
+
 #############################################
 ##                METADATA                 ##
 #############################################
@@ -73,10 +89,36 @@ end
 func _owners(token_id: Uint256) -> (owner: felt):
 end
 
+## Consecutive ids owned from the start of a batch run, unset for single tokens ##
+## Only the first id of a run has an entry in _owners ##
+@storage_var
+func _run_lengths(token_id: Uint256) -> (length: felt):
+end
+
+## Set for every MAX_BATCH_SIZE wide bucket of ids holding the start of a batch run ##
+@storage_var
+func _batch_buckets(bucket: Uint256) -> (batched: felt):
+end
+
 @storage_var
 func _balances(owner: felt) -> (balance: Uint256):
 end
 
+## The runs of ids of each owner, at indexes 0 to its run count - 1 ##
+## Each run starts at an id with an entry in _owners, so a batch mint is a single run ##
+@storage_var
+func _owned_runs(owner: felt, index: felt) -> (run: OwnedRun):
+end
+
+@storage_var
+func _owned_run_count(owner: felt) -> (count: felt):
+end
+
+## Index of each run in its owner's _owned_runs, keyed by its first id ##
+@storage_var
+func _owned_runs_index(start: Uint256) -> (index: felt):
+end
+
 @storage_var
 func _token_approvals(token_id: Uint256) -> (approved: felt):
 end
@@ -120,9 +162,10 @@ func approve{
     spender: felt,
     token_id: Uint256
 ):
-    let (caller) = get_caller_address()
+    alloc_locals
+    let (local caller) = get_caller_address()
 
-    let (owner) = _owners.read(token_id)
+    let (local owner) = _owner_of(token_id)
     if caller == owner:
         tempvar caller_is_owner = 1
     else:
@@ -168,19 +211,23 @@ func transfer{
     recipient: felt,
     token_id: Uint256
 ):
-    let (sender) = get_caller_address()
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local sender) = get_caller_address()
+    let (local owner, local start: Uint256, local distance) = _ownership_of(token_id)
     assert sender = owner
     assert_not_zero(recipient)
+    _detach_from_run(token_id, owner, start, distance)
 
     let (owner_balance) = _balances.read(sender)
     let (new_owner_balance: Uint256) = uint256_sub(owner_balance, Uint256(1,0))
+    _balances.write(sender, new_owner_balance)
+    _remove_token_from_owner_enumeration(sender, token_id, start, distance)
 
-    let (recipient_balance) = _balances.read(recipient)
+    # Read after the sender's write, so a transfer to self keeps the balance
+    let (local recipient_balance: Uint256) = _balances.read(recipient)
     let (new_recipient_balance, _: Uint256) = uint256_add(recipient_balance, Uint256(1,0))
-
-    _balances.write(sender, new_owner_balance)
     _balances.write(recipient, new_recipient_balance)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     _owners.write(token_id, recipient)
 
@@ -203,8 +250,9 @@ func transfer_from{
     recipient: felt,
     token_id: Uint256
 ):
-    let (caller) = get_caller_address()
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local caller) = get_caller_address()
+    let (local owner, local start: Uint256, local distance) = _ownership_of(token_id)
 
     assert sender = owner # wrong sender
 
@@ -229,14 +277,18 @@ func transfer_from{
     let (can_transfer) = bitwise_or(can_transfer1, is_approved_for_all)
     assert can_transfer = 1
 
+    _detach_from_run(token_id, owner, start, distance)
+
     let (owner_balance) = _balances.read(sender)
     let (new_owner_balance: Uint256) = uint256_sub(owner_balance, Uint256(1,0))
+    _balances.write(sender, new_owner_balance)
+    _remove_token_from_owner_enumeration(sender, token_id, start, distance)
 
-    let (recipient_balance) = _balances.read(recipient)
+    # Read after the sender's write, so a transfer to self keeps the balance
+    let (local recipient_balance: Uint256) = _balances.read(recipient)
     let (new_recipient_balance, _: Uint256) = uint256_add(recipient_balance, Uint256(1,0))
-
-    _balances.write(sender, new_owner_balance)
     _balances.write(recipient, new_recipient_balance)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     _owners.write(token_id, recipient)
 
@@ -274,6 +326,21 @@ func burn{
     _burn(token_id)
     return ()
 end
+
+@external
+func mint_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipient: felt,
+    start_id: Uint256,
+    quantity: felt
+):
+    _mint_batch(recipient, start_id, quantity)
+    return ()
+end
+
 #############################################
 ##             INTERNAL LOGIC              ##
 #############################################
@@ -286,13 +353,15 @@ func _mint{
     recipient: felt,
     token_id: Uint256
 ):
+    alloc_locals
     assert_not_zero(recipient) #invalid recipient
-    let (token_owner) = _owners.read(token_id)
+    let (token_owner) = _owner_of(token_id)
     assert token_owner = 0 #already minted
 
-    let (current_balance) = _balances.read(owner=recipient)
+    let (current_balance: Uint256) = _balances.read(owner=recipient)
     let (new_balance, _: Uint256) = uint256_add(current_balance, Uint256(1,0))
     _balances.write(recipient, new_balance)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     let (current_supply) = _total_supply.read()
     let (new_supply, _: Uint256) = uint256_add(current_supply, Uint256(1,0))
@@ -310,23 +379,329 @@ func _burn{
 }(
     token_id: Uint256
 ):
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local owner, local start: Uint256, local distance) = _ownership_of(token_id)
     assert_not_zero(owner) #not minted
+    _detach_from_run(token_id, owner, start, distance)
 
     let (current_balance) = _balances.read(owner)
     let (new_balance: Uint256) = uint256_sub(current_balance, Uint256(1,0))
     _balances.write(owner, new_balance)
+    _remove_token_from_owner_enumeration(owner, token_id, start, distance)
 
     let (current_supply) = _total_supply.read()
     let (new_supply: Uint256) = uint256_sub(current_supply, Uint256(1,0))
     _total_supply.write(new_supply)
 
-    _owners.write(token_id, 0)
+    _owners.write(token_id, BURNED)
     _token_approvals.write(token_id, 0)
 
     return ()
 end
 
+## Mints `quantity` consecutive ids from `start_id`, in the style of ERC721A ##
+## Only the first id is written to _owners, the rest resolve to it through _ownership_of ##
+## Ids of burned tokens can only be minted again one at a time ##
+## The ids are enumerated as one run, so the storage writes don't grow with `quantity` ##
+func _mint_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipient: felt,
+    start_id: Uint256,
+    quantity: felt
+):
+    alloc_locals
+    assert_not_zero(recipient) #invalid recipient
+    assert_nn_le(quantity - 1, MAX_BATCH_SIZE - 1)
+    uint256_check(start_id)
+    # Runs don't cross into the next high word
+    assert_le(start_id.low + quantity, 2 ** 128)
+
+    # None of the ids has an owner entry, and no earlier run reaches start_id
+    let (_, _, last_owner) = _find_run_start(Uint256(start_id.low + quantity - 1, start_id.high), 0, quantity)
+    assert last_owner = 0 #already minted
+    let (start_owner) = _owner_of(start_id)
+    assert start_owner = 0 #already minted
+
+    _owners.write(start_id, recipient)
+    if quantity != 1:
+        _run_lengths.write(start_id, quantity)
+        let (bucket, _) = unsigned_div_rem(start_id.low, MAX_BATCH_SIZE)
+        _batch_buckets.write(Uint256(bucket, start_id.high), 1)
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    else:
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    end
+
+    let (current_balance: Uint256) = _balances.read(owner=recipient)
+    let (new_balance, _: Uint256) = uint256_add(current_balance, Uint256(quantity, 0))
+    _balances.write(recipient, new_balance)
+    _add_run_to_owner_enumeration(recipient, start_id, quantity)
+
+    let (current_supply) = _total_supply.read()
+    let (new_supply, _: Uint256) = uint256_add(current_supply, Uint256(quantity, 0))
+    _total_supply.write(new_supply)
+
+    return ()
+end
+
+# Appends the `length` consecutive ids from `start` to the runs of `owner`
+# The caller accounts for them in _balances
+func _add_run_to_owner_enumeration{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    start: Uint256,
+    length: felt
+):
+    let (count) = _owned_run_count.read(owner)
+    _owned_runs.write(owner, count, OwnedRun(start, length))
+    _owned_runs_index.write(start, count)
+    _owned_run_count.write(owner, count + 1)
+    return ()
+end
+
+# Removes token_id, `distance` ids into the run of `owner` from `start`
+# The ids before it keep their slot, the ids after it become a run of their own
+# and when neither is left the last run moves into the slot
+func _remove_token_from_owner_enumeration{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    token_id: Uint256,
+    start: Uint256,
+    distance: felt
+):
+    alloc_locals
+    let (local index) = _owned_runs_index.read(start)
+    let (run: OwnedRun) = _owned_runs.read(owner, index)
+    local rest = run.length - distance - 1
+    local next_id: Uint256 = Uint256(token_id.low + 1, token_id.high)
+
+    if distance != 0:
+        _owned_runs.write(owner, index, OwnedRun(start, distance))
+        if rest != 0:
+            _add_run_to_owner_enumeration(owner, next_id, rest)
+            return ()
+        end
+        return ()
+    end
+
+    if rest != 0:
+        _owned_runs.write(owner, index, OwnedRun(next_id, rest))
+        _owned_runs_index.write(next_id, index)
+        return ()
+    end
+
+    let (count) = _owned_run_count.read(owner)
+    local last_index = count - 1
+    if index != last_index:
+        let (last_run: OwnedRun) = _owned_runs.read(owner, last_index)
+        _owned_runs.write(owner, index, last_run)
+        _owned_runs_index.write(last_run.start, index)
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    else:
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    end
+    _owned_run_count.write(owner, last_index)
+    return ()
+end
+
+# Writes `length` tokens of `owner` to token_ids, skipping the first `skip`
+# from the run at `index`
+func _tokens_of_owner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    index: felt,
+    skip: felt,
+    length: felt,
+    token_ids: Uint256*
+):
+    alloc_locals
+    if length == 0:
+        return ()
+    end
+    let (local run: OwnedRun) = _owned_runs.read(owner, index)
+    let (past_run) = is_le(run.length, skip)
+    if past_run == 1:
+        return _tokens_of_owner(owner, index + 1, skip - run.length, length, token_ids)
+    end
+
+    let (local taken) = _page_length(Uint256(run.length - skip, 0), length)
+    _run_ids(Uint256(run.start.low + skip, run.start.high), taken, token_ids)
+    return _tokens_of_owner(owner, index + 1, 0, length - taken, token_ids + taken * Uint256.SIZE)
+end
+
+# Writes the `length` consecutive ids from token_id to token_ids
+func _run_ids(
+    token_id: Uint256,
+    length: felt,
+    token_ids: Uint256*
+):
+    if length == 0:
+        return ()
+    end
+    assert token_ids.low = token_id.low
+    assert token_ids.high = token_id.high
+    return _run_ids(Uint256(token_id.low + 1, token_id.high), length - 1, token_ids + Uint256.SIZE)
+end
+
+# Resolves the owner of token_id, with the start of its run and its distance from it
+# Returns a 0 owner for ids that were never minted or were burned
+func _ownership_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: Uint256
+) -> (
+    owner: felt,
+    start: Uint256,
+    distance: felt
+):
+    alloc_locals
+    let (owner) = _owners.read(token_id)
+    if owner == BURNED:
+        return (0, token_id, 0)
+    end
+    if owner != 0:
+        return (owner, token_id, 0)
+    end
+    if token_id.low == 0:
+        return (0, token_id, 0)
+    end
+
+    # Only search back when a batch run may cover the id
+    let (batched) = _is_batched(token_id)
+    if batched == 0:
+        return (0, token_id, 0)
+    end
+
+    let (local start: Uint256, local distance, local run_owner) = _find_run_start(Uint256(token_id.low - 1, token_id.high), 1, MAX_BATCH_SIZE - 1)
+    if run_owner == BURNED:
+        return (0, token_id, 0)
+    end
+    if run_owner == 0:
+        return (0, token_id, 0)
+    end
+    let (length) = _run_lengths.read(start)
+    let (in_run) = is_le(distance + 1, length)
+    if in_run == 0:
+        return (0, token_id, 0)
+    end
+    return (run_owner, start, distance)
+end
+
+func _owner_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: Uint256
+) -> (
+    owner: felt
+):
+    let (owner, _, _) = _ownership_of(token_id)
+    return (owner)
+end
+
+# Walks back from token_id, over at most `window` ids, to the nearest id with an owner entry
+func _find_run_start{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: Uint256,
+    distance: felt,
+    window: felt
+) -> (
+    start: Uint256,
+    distance: felt,
+    owner: felt
+):
+    let (owner) = _owners.read(token_id)
+    if owner != 0:
+        return (token_id, distance, owner)
+    end
+    if window == 1:
+        return (token_id, distance, 0)
+    end
+    if token_id.low == 0:
+        return (token_id, distance, 0)
+    end
+    return _find_run_start(Uint256(token_id.low - 1, token_id.high), distance + 1, window - 1)
+end
+
+# Whether a batch run may cover token_id, runs cover at most MAX_BATCH_SIZE ids
+# so their start is in the bucket of token_id or the one before
+func _is_batched{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: Uint256
+) -> (
+    batched: felt
+):
+    alloc_locals
+    uint256_check(token_id)
+    let (local bucket, _) = unsigned_div_rem(token_id.low, MAX_BATCH_SIZE)
+    let (batched) = _batch_buckets.read(Uint256(bucket, token_id.high))
+    if batched == 1:
+        return (batched)
+    end
+    if bucket == 0:
+        return (batched=0)
+    end
+    let (batched) = _batch_buckets.read(Uint256(bucket - 1, token_id.high))
+    return (batched)
+end
+
+# Before token_id changes hands, moves the rest of its run to an owner entry of its own
+func _detach_from_run{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: Uint256,
+    owner: felt,
+    start: Uint256,
+    distance: felt
+):
+    alloc_locals
+    let (local length) = _run_lengths.read(start)
+    let (next_in_run) = is_le(distance + 2, length)
+    if next_in_run == 0:
+        return ()
+    end
+
+    local next_id: Uint256 = Uint256(token_id.low + 1, token_id.high)
+    let (next_owner) = _owners.read(next_id)
+    if next_owner != 0:
+        return ()
+    end
+    _owners.write(next_id, owner)
+    _run_lengths.write(next_id, length - distance - 1)
+    return ()
+end
+
 #############################################
 ##                ACCESSORS                ##
 #############################################
@@ -378,7 +753,7 @@ func owner_of{
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(token_id: Uint256) -> (owner: felt):
-    let (owner) = _owners.read(token_id)
+    let (owner) = _owner_of(token_id)
     return (owner)
 end
 
@@ -411,3 +786,215 @@ func is_approved_for_all{
     let (approved) = _is_approved_for_all.read(owner, operator)
     return (approved)
 end
+
+@view
+func token_of_owner_by_index{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(owner: felt, index: Uint256) -> (token_id: Uint256):
+    alloc_locals
+    uint256_check(index)
+    let (count: Uint256) = _balances.read(owner)
+    let (in_range) = uint256_lt(index, count)
+    assert in_range = 1
+    # Balances stay far below 2 ** 128
+    assert index.high = 0
+    let (local token_ids: Uint256*) = alloc()
+    _tokens_of_owner(owner, 0, index.low, 1, token_ids)
+    return ([token_ids])
+end
+
+## Returns the enumerated tokens of `owner` from `offset`, at most `limit` of them ##
+## Walks the runs of `owner` up to the page, so it costs one read per run rather than per id ##
+@view
+func tokens_of_owner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    offset: Uint256,
+    limit: felt
+) -> (
+    token_ids_len: felt,
+    token_ids: Uint256*
+):
+    alloc_locals
+    uint256_check(offset)
+    assert_nn(limit)
+    let (local token_ids: Uint256*) = alloc()
+
+    let (local count: Uint256) = _balances.read(owner)
+    let (past_end) = uint256_le(count, offset)
+    if past_end == 1:
+        return (0, token_ids)
+    end
+
+    # Balances stay far below 2 ** 128
+    assert offset.high = 0
+    let (remaining: Uint256) = uint256_sub(count, offset)
+    let (local length) = _page_length(remaining, limit)
+    _tokens_of_owner(owner, 0, offset.low, length, token_ids)
+    return (length, token_ids)
+end
+
+# Number of tokens a page holds when `remaining` tokens are left
+func _page_length{range_check_ptr}(
+    remaining: Uint256,
+    limit: felt
+) -> (
+    length: felt
+):
+    if remaining.high != 0:
+        return (limit)
+    end
+    let (fits) = is_le(remaining.low, limit)
+    if fits == 1:
+        return (remaining.low)
+    end
+    return (limit)
+end
+
+#############################################
+##               BULK VIEWS                ##
+#############################################
+
+## Resolves owner_of for every id, 0 for ids that were never minted or were burned ##
+@view
+func owners_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: Uint256*
+) -> (
+    owners_len: felt,
+    owners: felt*
+):
+    alloc_locals
+    let (local owners: felt*) = alloc()
+    # 2 ** 128 is not a valid low word, so no id is mistaken for the next one
+    _owners_of(token_ids_len, token_ids, owners, Uint256(2 ** 128, 0), 0, 0)
+    return (token_ids_len, owners)
+end
+
+@view
+func approvals_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: Uint256*
+) -> (
+    approvals_len: felt,
+    approvals: felt*
+):
+    alloc_locals
+    let (local approvals: felt*) = alloc()
+    _approvals_of(token_ids_len, token_ids, approvals)
+    return (token_ids_len, approvals)
+end
+
+## Reads the base uri once for all the ids ##
+@view
+func token_uris{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: Uint256*
+) -> (
+    token_uris_len: felt,
+    token_uris: tokenURI*
+):
+    alloc_locals
+    let (local token_uris: tokenURI*) = alloc()
+    let (base_uri: baseURI) = _base_uri.read()
+    _token_uris(token_ids_len, token_ids, token_uris, base_uri)
+    return (token_ids_len, token_uris)
+end
+
+# Internal helper function for owners_of
+# When ids follow each other, the run covering the previous id resolves the next one
+# without searching back: `run_owner` owns the ids before `run_end`, the low word of the
+# first id after the run, which never crosses into another high word
+func _owners_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: Uint256*,
+    owners: felt*,
+    next_id: Uint256,
+    run_owner: felt,
+    run_end: felt
+):
+    alloc_locals
+    if token_ids_len == 0:
+        return ()
+    end
+    let token_id = [token_ids]
+
+    let (entry) = _owners.read(token_id)
+    if entry == BURNED:
+        assert [owners] = 0
+        return _owners_of(token_ids_len - 1, token_ids + Uint256.SIZE, owners + 1, Uint256(token_id.low + 1, token_id.high), 0, 0)
+    end
+    if entry != 0:
+        assert [owners] = entry
+        let (length) = _run_lengths.read(token_id)
+        return _owners_of(token_ids_len - 1, token_ids + Uint256.SIZE, owners + 1, Uint256(token_id.low + 1, token_id.high), entry, token_id.low + length)
+    end
+
+    let (consecutive) = uint256_eq(token_id, next_id)
+    if consecutive == 1:
+        let (in_run) = is_le(token_id.low + 1, run_end)
+        assert [owners] = in_run * run_owner
+        return _owners_of(token_ids_len - 1, token_ids + Uint256.SIZE, owners + 1, Uint256(token_id.low + 1, token_id.high), run_owner, run_end)
+    end
+
+    let (local owner, local start: Uint256, _) = _ownership_of(token_id)
+    assert [owners] = owner
+    let (length) = _run_lengths.read(start)
+    return _owners_of(token_ids_len - 1, token_ids + Uint256.SIZE, owners + 1, Uint256(token_id.low + 1, token_id.high), owner, start.low + length)
+end
+
+# Internal helper function for approvals_of
+func _approvals_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: Uint256*,
+    approvals: felt*
+):
+    if token_ids_len == 0:
+        return ()
+    end
+    let (approved) = _token_approvals.read([token_ids])
+    assert [approvals] = approved
+    return _approvals_of(token_ids_len - 1, token_ids + Uint256.SIZE, approvals + 1)
+end
+
+# Internal helper function for token_uris
+func _token_uris(
+    token_ids_len: felt,
+    token_ids: Uint256*,
+    token_uris: tokenURI*,
+    base_uri: baseURI
+):
+    if token_ids_len == 0:
+        return ()
+    end
+    assert token_uris.prefix = base_uri.prefix
+    assert token_uris.suffix = base_uri.suffix
+    assert token_uris.token_id.low = token_ids.low
+    assert token_uris.token_id.high = token_ids.high
+    return _token_uris(token_ids_len - 1, token_ids + Uint256.SIZE, token_uris + tokenURI.SIZE, base_uri)
+end
@@ -2,8 +2,10 @@
 
 from starkware.cairo.common.cairo_builtins import HashBuiltin, SignatureBuiltin, BitwiseBuiltin
 from starkware.starknet.common.syscalls import get_caller_address
-from starkware.cairo.common.math import assert_not_zero
+from starkware.cairo.common.math import assert_not_zero, assert_le, assert_nn, assert_nn_le, unsigned_div_rem
+from starkware.cairo.common.math_cmp import is_le
 from starkware.cairo.common.bitwise import bitwise_or
+from starkware.cairo.common.alloc import alloc
 
 ## @title N-ERC721
 ## @description A minimalistic implementation of ERC721 Token Standard using only felts.
@@ -27,6 +29,18 @@ struct tokenURI:
     member token_id : felt
 end
 
+# consecutive ids held by one owner, enumerated together
+struct OwnedRun:
+    member start : felt
+    member length : felt
+end
+
+## Largest number of consecutive ids minted by one _mint_batch, which bounds the owner search ##
+const MAX_BATCH_SIZE = 128
+
+## Owner of burned tokens, so owner searches stop at them ##
+const BURNED = -1
+
 #############################################
 ##                METADATA                 ##
 #############################################
@@ -71,10 +85,36 @@ end
 func _owners(token_id: felt) -> (owner: felt):
 end
 
+## Consecutive ids owned from the start of a batch run, unset for single tokens ##
+## Only the first id of a run has an entry in _owners ##
+@storage_var
+func _run_lengths(token_id: felt) -> (length: felt):
+end
+
+## Set for every MAX_BATCH_SIZE wide bucket of ids holding the start of a batch run ##
+@storage_var
+func _batch_buckets(bucket: felt) -> (batched: felt):
+end
+
 @storage_var
 func _balances(owner: felt) -> (balance: felt):
 end
 
+## The runs of ids of each owner, at indexes 0 to its run count - 1 ##
+## Each run starts at an id with an entry in _owners, so a batch mint is a single run ##
+@storage_var
+func _owned_runs(owner: felt, index: felt) -> (run: OwnedRun):
+end
+
+@storage_var
+func _owned_run_count(owner: felt) -> (count: felt):
+end
+
+## Index of each run in its owner's _owned_runs, keyed by its first id ##
+@storage_var
+func _owned_runs_index(start: felt) -> (index: felt):
+end
+
 @storage_var
 func _token_approvals(token_id: felt) -> (res: felt):
 end
@@ -118,9 +158,10 @@ func approve{
     spender: felt,
     token_id: felt
 ):
-    let (caller) = get_caller_address()
+    alloc_locals
+    let (local caller) = get_caller_address()
 
-    let (owner) = _owners.read(token_id)
+    let (local owner) = _owner_of(token_id)
     if caller == owner:
         tempvar caller_is_owner = 1
     else:
@@ -166,16 +207,21 @@ func transfer{
     recipient: felt,
     token_id: felt
 ):
-    let (sender) = get_caller_address()
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local sender) = get_caller_address()
+    let (local owner, local start: felt, local distance) = _ownership_of(token_id)
     assert sender = owner
     assert_not_zero(recipient)
+    _detach_from_run(token_id, owner, start, distance)
 
-    let (owner_balance) = _balances.read(sender)
-    let (recipient_balance) = _balances.read(recipient)
-
+    let (local owner_balance) = _balances.read(sender)
     _balances.write(sender, owner_balance - 1)
+    _remove_token_from_owner_enumeration(sender, token_id, start, distance)
+
+    # Read after the sender's write, so a transfer to self keeps the balance
+    let (local recipient_balance) = _balances.read(recipient)
     _balances.write(recipient, recipient_balance + 1)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     _owners.write(token_id, recipient)
 
@@ -198,8 +244,9 @@ func transfer_from{
     recipient: felt,
     token_id: felt
 ):
-    let (caller) = get_caller_address()
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local caller) = get_caller_address()
+    let (local owner, local start: felt, local distance) = _ownership_of(token_id)
 
     assert sender = owner # wrong sender
 
@@ -224,11 +271,16 @@ func transfer_from{
     let (can_transfer) = bitwise_or(can_transfer1, is_approved_for_all)
     assert can_transfer = 1
 
-    let (owner_balance) = _balances.read(sender)
-    let (recipient_balance) = _balances.read(recipient)
+    _detach_from_run(token_id, owner, start, distance)
 
+    let (local owner_balance) = _balances.read(sender)
     _balances.write(sender, owner_balance - 1)
+    _remove_token_from_owner_enumeration(sender, token_id, start, distance)
+
+    # Read after the sender's write, so a transfer to self keeps the balance
+    let (local recipient_balance) = _balances.read(recipient)
     _balances.write(recipient, recipient_balance + 1)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     _owners.write(token_id, recipient)
 
@@ -267,6 +319,20 @@ func burn{
     return ()
 end
 
+@external
+func mint_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipient: felt,
+    start_id: felt,
+    quantity: felt
+):
+    _mint_batch(recipient, start_id, quantity)
+    return ()
+end
+
 #############################################
 ##             INTERNAL LOGIC              ##
 #############################################
@@ -279,12 +345,14 @@ func _mint{
     recipient: felt,
     token_id: felt
 ):
+    alloc_locals
     assert_not_zero(recipient) #invalid recipient
-    let (token_owner) = _owners.read(token_id)
+    let (token_owner) = _owner_of(token_id)
     assert token_owner = 0 #already minted
 
-    let (current_balance) = _balances.read(recipient)
+    let (local current_balance) = _balances.read(recipient)
     _balances.write(recipient, current_balance + 1)
+    _add_run_to_owner_enumeration(recipient, token_id, 1)
 
     let (current_supply) = _total_supply.read()
     _total_supply.write(current_supply + 1)
@@ -301,21 +369,326 @@ func _burn{
 }(
     token_id: felt
 ):
-    let (owner) = _owners.read(token_id)
+    alloc_locals
+    let (local owner, local start: felt, local distance) = _ownership_of(token_id)
     assert_not_zero(owner) #not minted
+    _detach_from_run(token_id, owner, start, distance)
 
-    let (current_owner_balance) = _balances.read(owner)
+    let (local current_owner_balance) = _balances.read(owner)
     _balances.write(owner, current_owner_balance - 1)
+    _remove_token_from_owner_enumeration(owner, token_id, start, distance)
 
     let (current_supply) = _total_supply.read()
     _total_supply.write(current_supply - 1)
 
-    _owners.write(token_id, 0)
+    _owners.write(token_id, BURNED)
     _token_approvals.write(token_id, 0)
 
     return ()
 end
 
+## Mints `quantity` consecutive ids from `start_id`, in the style of ERC721A ##
+## Only the first id is written to _owners, the rest resolve to it through _ownership_of ##
+## Ids of burned tokens can only be minted again one at a time ##
+## The ids are enumerated as one run, so the storage writes don't grow with `quantity` ##
+func _mint_batch{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    recipient: felt,
+    start_id: felt,
+    quantity: felt
+):
+    alloc_locals
+    assert_not_zero(recipient) #invalid recipient
+    assert_nn_le(quantity - 1, MAX_BATCH_SIZE - 1)
+    # Batched ids fit in 128 bits so their bucket can be computed
+    assert_nn_le(start_id + quantity, 2 ** 128)
+
+    # None of the ids has an owner entry, and no earlier run reaches start_id
+    let (_, _, last_owner) = _find_run_start(start_id + quantity - 1, 0, quantity)
+    assert last_owner = 0 #already minted
+    let (start_owner) = _owner_of(start_id)
+    assert start_owner = 0 #already minted
+
+    _owners.write(start_id, recipient)
+    if quantity != 1:
+        _run_lengths.write(start_id, quantity)
+        let (bucket, _) = unsigned_div_rem(start_id, MAX_BATCH_SIZE)
+        _batch_buckets.write(bucket, 1)
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    else:
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    end
+
+    let (local current_balance) = _balances.read(recipient)
+    _balances.write(recipient, current_balance + quantity)
+    _add_run_to_owner_enumeration(recipient, start_id, quantity)
+
+    let (current_supply) = _total_supply.read()
+    _total_supply.write(current_supply + quantity)
+
+    return ()
+end
+
+# Appends the `length` consecutive ids from `start` to the runs of `owner`
+# The caller accounts for them in _balances
+func _add_run_to_owner_enumeration{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    start: felt,
+    length: felt
+):
+    let (count) = _owned_run_count.read(owner)
+    _owned_runs.write(owner, count, OwnedRun(start, length))
+    _owned_runs_index.write(start, count)
+    _owned_run_count.write(owner, count + 1)
+    return ()
+end
+
+# Removes token_id, `distance` ids into the run of `owner` from `start`
+# The ids before it keep their slot, the ids after it become a run of their own
+# and when neither is left the last run moves into the slot
+func _remove_token_from_owner_enumeration{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    token_id: felt,
+    start: felt,
+    distance: felt
+):
+    alloc_locals
+    let (local index) = _owned_runs_index.read(start)
+    let (run: OwnedRun) = _owned_runs.read(owner, index)
+    local rest = run.length - distance - 1
+
+    if distance != 0:
+        _owned_runs.write(owner, index, OwnedRun(start, distance))
+        if rest != 0:
+            _add_run_to_owner_enumeration(owner, token_id + 1, rest)
+            return ()
+        end
+        return ()
+    end
+
+    if rest != 0:
+        _owned_runs.write(owner, index, OwnedRun(token_id + 1, rest))
+        _owned_runs_index.write(token_id + 1, index)
+        return ()
+    end
+
+    let (count) = _owned_run_count.read(owner)
+    local last_index = count - 1
+    if index != last_index:
+        let (last_run: OwnedRun) = _owned_runs.read(owner, last_index)
+        _owned_runs.write(owner, index, last_run)
+        _owned_runs_index.write(last_run.start, index)
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    else:
+        tempvar syscall_ptr = syscall_ptr
+        tempvar pedersen_ptr = pedersen_ptr
+        tempvar range_check_ptr = range_check_ptr
+    end
+    _owned_run_count.write(owner, last_index)
+    return ()
+end
+
+# Writes `length` tokens of `owner` to token_ids, skipping the first `skip`
+# from the run at `index`
+func _tokens_of_owner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    index: felt,
+    skip: felt,
+    length: felt,
+    token_ids: felt*
+):
+    alloc_locals
+    if length == 0:
+        return ()
+    end
+    let (local run: OwnedRun) = _owned_runs.read(owner, index)
+    let (past_run) = is_le(run.length, skip)
+    if past_run == 1:
+        return _tokens_of_owner(owner, index + 1, skip - run.length, length, token_ids)
+    end
+
+    let (local taken) = _page_length(run.length - skip, length)
+    _run_ids(run.start + skip, taken, token_ids)
+    return _tokens_of_owner(owner, index + 1, 0, length - taken, token_ids + taken)
+end
+
+# Writes the `length` consecutive ids from token_id to token_ids
+func _run_ids(
+    token_id: felt,
+    length: felt,
+    token_ids: felt*
+):
+    if length == 0:
+        return ()
+    end
+    assert [token_ids] = token_id
+    return _run_ids(token_id + 1, length - 1, token_ids + 1)
+end
+
+# Resolves the owner of token_id, with the start of its run and its distance from it
+# Returns a 0 owner for ids that were never minted or were burned
+func _ownership_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: felt
+) -> (
+    owner: felt,
+    start: felt,
+    distance: felt
+):
+    alloc_locals
+    let (owner) = _owners.read(token_id)
+    if owner == BURNED:
+        return (0, token_id, 0)
+    end
+    if owner != 0:
+        return (owner, token_id, 0)
+    end
+    if token_id == 0:
+        return (0, token_id, 0)
+    end
+
+    # Only search back when a batch run may cover the id
+    let (batched) = _is_batched(token_id)
+    if batched == 0:
+        return (0, token_id, 0)
+    end
+
+    let (local start: felt, local distance, local run_owner) = _find_run_start(token_id - 1, 1, MAX_BATCH_SIZE - 1)
+    if run_owner == BURNED:
+        return (0, token_id, 0)
+    end
+    if run_owner == 0:
+        return (0, token_id, 0)
+    end
+    let (length) = _run_lengths.read(start)
+    let (in_run) = is_le(distance + 1, length)
+    if in_run == 0:
+        return (0, token_id, 0)
+    end
+    return (run_owner, start, distance)
+end
+
+func _owner_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: felt
+) -> (
+    owner: felt
+):
+    let (owner, _, _) = _ownership_of(token_id)
+    return (owner)
+end
+
+# Walks back from token_id, over at most `window` ids, to the nearest id with an owner entry
+func _find_run_start{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: felt,
+    distance: felt,
+    window: felt
+) -> (
+    start: felt,
+    distance: felt,
+    owner: felt
+):
+    let (owner) = _owners.read(token_id)
+    if owner != 0:
+        return (token_id, distance, owner)
+    end
+    if window == 1:
+        return (token_id, distance, 0)
+    end
+    if token_id == 0:
+        return (token_id, distance, 0)
+    end
+    return _find_run_start(token_id - 1, distance + 1, window - 1)
+end
+
+# Whether a batch run may cover token_id, runs cover at most MAX_BATCH_SIZE ids
+# so their start is in the bucket of token_id or the one before
+func _is_batched{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: felt
+) -> (
+    batched: felt
+):
+    alloc_locals
+    # Batched ids fit in 128 bits
+    let (small_id) = is_le(token_id, 2 ** 128)
+    if small_id == 0:
+        return (batched=0)
+    end
+    let (local bucket, _) = unsigned_div_rem(token_id, MAX_BATCH_SIZE)
+    let (batched) = _batch_buckets.read(bucket)
+    if batched == 1:
+        return (batched)
+    end
+    if bucket == 0:
+        return (batched=0)
+    end
+    let (batched) = _batch_buckets.read(bucket - 1)
+    return (batched)
+end
+
+# Before token_id changes hands, moves the rest of its run to an owner entry of its own
+func _detach_from_run{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_id: felt,
+    owner: felt,
+    start: felt,
+    distance: felt
+):
+    alloc_locals
+    let (local length) = _run_lengths.read(start)
+    let (next_in_run) = is_le(distance + 2, length)
+    if next_in_run == 0:
+        return ()
+    end
+
+    local next_id: felt = token_id + 1
+    let (next_owner) = _owners.read(next_id)
+    if next_owner != 0:
+        return ()
+    end
+    _owners.write(next_id, owner)
+    _run_lengths.write(next_id, length - distance - 1)
+    return ()
+end
+
 #############################################
 ##                ACCESSORS                ##
 #############################################
@@ -367,7 +740,7 @@ func owner_of{
     pedersen_ptr: HashBuiltin*,
     range_check_ptr
 }(token_id: felt) -> (owner: felt):
-    let (owner) = _owners.read(token_id)
+    let (owner) = _owner_of(token_id)
     return (owner)
 end
 
@@ -401,3 +774,201 @@ func is_approved_for_all{
     return (approved)
 end
 
+@view
+func token_of_owner_by_index{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(owner: felt, index: felt) -> (token_id: felt):
+    alloc_locals
+    let (count) = _balances.read(owner)
+    assert_nn_le(index, count - 1)
+    let (local token_ids: felt*) = alloc()
+    _tokens_of_owner(owner, 0, index, 1, token_ids)
+    return ([token_ids])
+end
+
+## Returns the enumerated tokens of `owner` from `offset`, at most `limit` of them ##
+## Walks the runs of `owner` up to the page, so it costs one read per run rather than per id ##
+@view
+func tokens_of_owner{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    owner: felt,
+    offset: felt,
+    limit: felt
+) -> (
+    token_ids_len: felt,
+    token_ids: felt*
+):
+    alloc_locals
+    assert_nn(offset)
+    assert_nn(limit)
+    let (local token_ids: felt*) = alloc()
+
+    let (local count) = _balances.read(owner)
+    let (past_end) = is_le(count, offset)
+    if past_end == 1:
+        return (0, token_ids)
+    end
+
+    let (local length) = _page_length(count - offset, limit)
+    _tokens_of_owner(owner, 0, offset, length, token_ids)
+    return (length, token_ids)
+end
+
+# Number of tokens a page holds when `remaining` tokens are left
+func _page_length{range_check_ptr}(
+    remaining: felt,
+    limit: felt
+) -> (
+    length: felt
+):
+    let (fits) = is_le(remaining, limit)
+    if fits == 1:
+        return (remaining)
+    end
+    return (limit)
+end
+
+#############################################
+##               BULK VIEWS                ##
+#############################################
+
+## Resolves owner_of for every id, 0 for ids that were never minted or were burned ##
+@view
+func owners_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: felt*
+) -> (
+    owners_len: felt,
+    owners: felt*
+):
+    alloc_locals
+    let (local owners: felt*) = alloc()
+    # -1 is never covered by a run, so starting with no run resolves it exactly
+    _owners_of(token_ids_len, token_ids, owners, -1, 0, 0)
+    return (token_ids_len, owners)
+end
+
+@view
+func approvals_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: felt*
+) -> (
+    approvals_len: felt,
+    approvals: felt*
+):
+    alloc_locals
+    let (local approvals: felt*) = alloc()
+    _approvals_of(token_ids_len, token_ids, approvals)
+    return (token_ids_len, approvals)
+end
+
+## Reads the base uri once for all the ids ##
+@view
+func token_uris{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: felt*
+) -> (
+    token_uris_len: felt,
+    token_uris: tokenURI*
+):
+    alloc_locals
+    let (local token_uris: tokenURI*) = alloc()
+    let (base_uri: baseURI) = _base_uri.read()
+    _token_uris(token_ids_len, token_ids, token_uris, base_uri)
+    return (token_ids_len, token_uris)
+end
+
+# Internal helper function for owners_of
+# When ids follow each other, the run covering the previous id resolves the next one
+# without searching back: `run_owner` owns the ids before `run_end`, the first id after the run
+func _owners_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: felt*,
+    owners: felt*,
+    next_id: felt,
+    run_owner: felt,
+    run_end: felt
+):
+    alloc_locals
+    if token_ids_len == 0:
+        return ()
+    end
+    let token_id = [token_ids]
+
+    let (entry) = _owners.read(token_id)
+    if entry == BURNED:
+        assert [owners] = 0
+        return _owners_of(token_ids_len - 1, token_ids + 1, owners + 1, token_id + 1, 0, 0)
+    end
+    if entry != 0:
+        assert [owners] = entry
+        let (length) = _run_lengths.read(token_id)
+        return _owners_of(token_ids_len - 1, token_ids + 1, owners + 1, token_id + 1, entry, token_id + length)
+    end
+
+    if token_id == next_id:
+        let (in_run) = is_le(token_id + 1, run_end)
+        assert [owners] = in_run * run_owner
+        return _owners_of(token_ids_len - 1, token_ids + 1, owners + 1, token_id + 1, run_owner, run_end)
+    end
+
+    let (local owner, local start: felt, _) = _ownership_of(token_id)
+    assert [owners] = owner
+    let (length) = _run_lengths.read(start)
+    return _owners_of(token_ids_len - 1, token_ids + 1, owners + 1, token_id + 1, owner, start + length)
+end
+
+# Internal helper function for approvals_of
+func _approvals_of{
+    syscall_ptr: felt*,
+    pedersen_ptr: HashBuiltin*,
+    range_check_ptr
+}(
+    token_ids_len: felt,
+    token_ids: felt*,
+    approvals: felt*
+):
+    if token_ids_len == 0:
+        return ()
+    end
+    let (approved) = _token_approvals.read([token_ids])
+    assert [approvals] = approved
+    return _approvals_of(token_ids_len - 1, token_ids + 1, approvals + 1)
+end
+
+# Internal helper function for token_uris
+func _token_uris(
+    token_ids_len: felt,
+    token_ids: felt*,
+    token_uris: tokenURI*,
+    base_uri: baseURI
+):
+    if token_ids_len == 0:
+        return ()
+    end
+    assert token_uris.prefix = base_uri.prefix
+    assert token_uris.suffix = base_uri.suffix
+    assert token_uris.token_id = [token_ids]
+    return _token_uris(token_ids_len - 1, token_ids + 1, token_uris + tokenURI.SIZE, base_uri)
+end
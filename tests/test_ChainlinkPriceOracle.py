@@ -0,0 +1,142 @@
+import pytest
+import asyncio
+from starkware.starknet.testing.starknet import Starknet
+from utils import deploy, fork, uint, assert_revert, set_block_timestamp
+
+OWNER = 1
+ETH = 11
+BTC = 12
+WINDOW = 60
+START = 1000
+PRICE = 3000 * 10 ** 8
+
+@pytest.fixture(scope='module')
+def event_loop():
+    return asyncio.new_event_loop()
+
+@pytest.fixture(scope='module')
+async def oracle_init():
+    starknet = await Starknet.empty()
+    oracle = await deploy(
+        starknet,
+        "contracts/defi/ChainlinkPriceOracle.cairo",
+        constructor_calldata=[OWNER, WINDOW]
+    )
+    eth_aggregator = await deploy(starknet, "tests/mocks/MockAggregatorV3.cairo")
+    btc_aggregator = await deploy(starknet, "tests/mocks/MockAggregatorV3.cairo")
+    await oracle.setFeed(ETH, eth_aggregator.contract_address, 8).invoke(caller_address=OWNER)
+    await oracle.setFeed(BTC, btc_aggregator.contract_address, 18).invoke(caller_address=OWNER)
+
+    await set_round(eth_aggregator, 1, PRICE, START)
+    await set_round(btc_aggregator, 1, 40000 * 10 ** 18, START)
+    set_block_timestamp(starknet, START)
+    return starknet, oracle, eth_aggregator
+
+@pytest.fixture
+def oracle_factory(oracle_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*oracle_init)
+
+async def set_round(aggregator, round_id, answer, updated_at):
+    await aggregator.setRoundData(uint(round_id), uint(answer), uint(updated_at), uint(updated_at), uint(round_id)).invoke()
+
+@pytest.mark.asyncio
+async def test_update_price(oracle_factory):
+    _, oracle, _ = oracle_factory
+    await oracle.updatePrice(ETH).invoke()
+
+    expected_data = await oracle.getCachedPrice(ETH).call()
+    assert expected_data.result.data == (uint(3000), uint(1), START)
+
+@pytest.mark.asyncio
+async def test_cached_price_requires_update(oracle_factory):
+    _, oracle, _ = oracle_factory
+
+    # Nothing has been cached yet
+    await assert_revert(oracle.getCachedPrice(ETH).call())
+
+@pytest.mark.asyncio
+async def test_cached_price_staleness(oracle_factory):
+    starknet, oracle, aggregator = oracle_factory
+    await oracle.updatePrice(ETH).invoke()
+
+    # The cache ignores new rounds until it is refreshed
+    await set_round(aggregator, 2, 2 * PRICE, START + 30)
+    set_block_timestamp(starknet, START + WINDOW)
+    expected_data = await oracle.getCachedPrice(ETH).call()
+    assert expected_data.result.data.price == uint(3000)
+
+    set_block_timestamp(starknet, START + WINDOW + 1)
+    await assert_revert(oracle.getCachedPrice(ETH).call())
+
+    await oracle.updatePrice(ETH).invoke()
+    expected_data = await oracle.getCachedPrice(ETH).call()
+    assert expected_data.result.data == (uint(6000), uint(2), START + 30)
+
+@pytest.mark.asyncio
+async def test_latest_price_cache_hit_and_miss(oracle_factory):
+    starknet, oracle, aggregator = oracle_factory
+
+    # Miss: the first read goes to the aggregator
+    execution_info = await oracle.getLatestPrice(ETH).invoke()
+    assert execution_info.result.price == uint(3000)
+    assert len(execution_info.internal_calls) == 1
+
+    # Hit: later reads within the window are served from storage
+    await set_round(aggregator, 2, 2 * PRICE, START + 30)
+    set_block_timestamp(starknet, START + WINDOW)
+    execution_info = await oracle.getLatestPrice(ETH).invoke()
+    assert execution_info.result.price == uint(3000)
+    assert len(execution_info.internal_calls) == 0
+
+    # Miss: the cached price went stale
+    set_block_timestamp(starknet, START + WINDOW + 1)
+    execution_info = await oracle.getLatestPrice(ETH).invoke()
+    assert execution_info.result.price == uint(6000)
+    assert len(execution_info.internal_calls) == 1
+
+#############################################
+##             Feed Registry               ##
+#############################################
+
+@pytest.mark.asyncio
+async def test_set_feed(oracle_factory):
+    _, oracle, aggregator = oracle_factory
+
+    expected_feed = await oracle.getFeed(ETH).call()
+    assert expected_feed.result.feed == (aggregator.contract_address, 8, 10 ** 8)
+
+    # Only the owner manages feeds
+    await assert_revert(oracle.setFeed(ETH, aggregator.contract_address, 6).invoke(caller_address=2))
+    await assert_revert(oracle.setFeed(ETH, aggregator.contract_address, 39).invoke(caller_address=OWNER))
+    # Negative decimals wrap around the field rather than scale the price down
+    await assert_revert(oracle.setFeed(ETH, aggregator.contract_address, -1).invoke(caller_address=OWNER))
+    await assert_revert(oracle.setStalenessWindow(0).invoke(caller_address=2))
+
+@pytest.mark.asyncio
+async def test_set_feed_clears_cache(oracle_factory):
+    _, oracle, aggregator = oracle_factory
+    await oracle.updatePrice(ETH).invoke()
+
+    await oracle.setFeed(ETH, aggregator.contract_address, 6).invoke(caller_address=OWNER)
+    await assert_revert(oracle.getCachedPrice(ETH).call())
+
+    execution_info = await oracle.getLatestPrice(ETH).invoke()
+    assert execution_info.result.price == uint(300000)
+
+@pytest.mark.asyncio
+async def test_unknown_asset(oracle_factory):
+    _, oracle, _ = oracle_factory
+    await assert_revert(oracle.getLatestPrice(13).invoke())
+
+@pytest.mark.asyncio
+async def test_get_latest_prices(oracle_factory):
+    _, oracle, _ = oracle_factory
+    await oracle.updatePrice(BTC).invoke()
+
+    # Cached and uncached assets, scaled by their own decimals
+    expected_prices = await oracle.getLatestPrices([ETH, BTC, ETH]).call()
+    assert expected_prices.result.prices == [uint(3000), uint(40000), uint(3000)]
+
+    expected_prices = await oracle.getLatestPrices([]).call()
+    assert expected_prices.result.prices == []
@@ -0,0 +1,197 @@
+import pytest
+import asyncio
+import random
+from starkware.starknet.testing.starknet import Starknet
+from utils import deploy, fork, assert_revert, str_to_felt, uint, get_execution_resources
+
+OWNER = 1
+OPERATOR = 2
+RECIPIENT = 3
+
+@pytest.fixture(scope='module')
+def event_loop():
+    return asyncio.new_event_loop()
+
+@pytest.fixture(scope='module')
+async def erc1155_init():
+    starknet = await Starknet.empty()
+    erc1155 = await deploy(
+        starknet,
+        "tests/mocks/MockERC1155.cairo",
+        constructor_calldata=[
+            str_to_felt("Test Contract"),
+            str_to_felt("TEST"),
+            18,
+            *uint(0)
+        ]
+    )
+    return starknet, erc1155
+
+@pytest.fixture
+def erc1155_factory(erc1155_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*erc1155_init)
+
+async def mint_ids(erc1155, ids, value):
+    for token_id in ids:
+        await erc1155.mint(OWNER, token_id, value).invoke()
+
+@pytest.mark.asyncio
+async def test_safe_transfer_from(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await erc1155.mint(OWNER, 1, 100).invoke()
+    await erc1155.safeTransferFrom(OWNER, RECIPIENT, 1, 40, 0).invoke(caller_address=OWNER)
+
+    expected_balance = await erc1155.balanceOf(OWNER, 1).call()
+    assert expected_balance.result.balance == 60
+    expected_balance = await erc1155.balanceOf(RECIPIENT, 1).call()
+    assert expected_balance.result.balance == 40
+
+#############################################
+##         Batch Transfer Tests            ##
+#############################################
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    ids = list(range(1, 21))
+    values = [ token_id * 2 for token_id in ids ]
+    await mint_ids(erc1155, ids, 100)
+
+    execution_info = await erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, ids, values, 0).invoke(caller_address=OWNER)
+
+    for token_id, value in zip(ids, values):
+        expected_balance = await erc1155.balanceOf(OWNER, token_id).call()
+        assert expected_balance.result.balance == 100 - value
+        expected_balance = await erc1155.balanceOf(RECIPIENT, token_id).call()
+        assert expected_balance.result.balance == value
+
+    # A single event for the whole batch
+    assert len(execution_info.main_call_events) == 1
+    event = execution_info.main_call_events[0]
+    assert (event.operator, event.sender, event.recipient) == (OWNER, OWNER, RECIPIENT)
+    assert event.ids == ids
+    assert event.values == values
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_repeated_id(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await erc1155.mint(OWNER, 1, 100).invoke()
+    await erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, [1, 1, 1], [10, 20, 30], 0).invoke(caller_address=OWNER)
+
+    expected_balance = await erc1155.balanceOf(OWNER, 1).call()
+    assert expected_balance.result.balance == 40
+    expected_balance = await erc1155.balanceOf(RECIPIENT, 1).call()
+    assert expected_balance.result.balance == 60
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_operator(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await mint_ids(erc1155, [1, 2], 100)
+
+    await assert_revert(
+        erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, [1, 2], [5, 5], 0).invoke(caller_address=OPERATOR)
+    )
+
+    await erc1155.setApprovalForAll(OPERATOR, 1).invoke(caller_address=OWNER)
+    await erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, [1, 2], [5, 5], 0).invoke(caller_address=OPERATOR)
+
+    expected_balance = await erc1155.balanceOf(RECIPIENT, 2).call()
+    assert expected_balance.result.balance == 5
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_insufficient_balance(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await mint_ids(erc1155, [1, 2], 10)
+
+    await assert_revert(
+        erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, [1, 2], [5, 11], 0).invoke(caller_address=OWNER)
+    )
+
+    # Nothing moved, including the ids before the failing one
+    expected_balance = await erc1155.balanceOf(OWNER, 1).call()
+    assert expected_balance.result.balance == 10
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_length_mismatch(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await mint_ids(erc1155, [1, 2], 10)
+
+    await assert_revert(
+        erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, [1, 2], [5], 0).invoke(caller_address=OWNER)
+    )
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_zero_recipient(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await mint_ids(erc1155, [1], 10)
+
+    await assert_revert(
+        erc1155.safeBatchTransferFrom(OWNER, 0, [1], [5], 0).invoke(caller_address=OWNER)
+    )
+
+@pytest.mark.asyncio
+async def test_safe_batch_transfer_from_steps(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    ids = list(range(1, 11))
+    await mint_ids(erc1155, ids, 100)
+
+    single_steps = 0
+    for token_id in ids:
+        execution_info = await erc1155.safeTransferFrom(OWNER, RECIPIENT, token_id, 1, 0).invoke(caller_address=OWNER)
+        single_steps += get_execution_resources(execution_info).n_steps
+
+    execution_info = await erc1155.safeBatchTransferFrom(OWNER, RECIPIENT, ids, [1] * len(ids), 0).invoke(caller_address=OWNER)
+    assert get_execution_resources(execution_info).n_steps < single_steps
+
+#############################################
+##         Batch Balance Tests             ##
+#############################################
+
+@pytest.mark.asyncio
+async def test_balance_of_batch(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    owners = [ OWNER, OPERATOR, RECIPIENT ]
+    for i, owner in enumerate(owners):
+        for token_id in range(1, 21):
+            await erc1155.mint(owner, token_id, token_id * 10 + i).invoke()
+
+    # Includes repeated pairs and ids nobody holds
+    rng = random.Random(0)
+    pairs = [ (rng.choice(owners), rng.randint(0, 25)) for _ in range(400) ]
+    query_owners = [ owner for owner, _ in pairs ]
+    query_ids = [ token_id for _, token_id in pairs ]
+
+    # Owner i was minted token_id * 10 + i of ids 1 through 20
+    balances = [
+        token_id * 10 + owners.index(owner) if 1 <= token_id <= 20 else 0
+        for owner, token_id in pairs
+    ]
+
+    expected_balances = await erc1155.balanceOfBatch(query_owners, query_ids).call()
+    assert expected_balances.result.balances == balances
+
+    # Every pair also matches the scalar view. Views are invoked on the test's fork
+    # since call() copies the whole state each time
+    scalar_balances = []
+    for owner, token_id in pairs:
+        expected_balance = await erc1155.balanceOf(owner, token_id).invoke()
+        scalar_balances.append(expected_balance.result.balance)
+    assert expected_balances.result.balances == scalar_balances
+
+@pytest.mark.asyncio
+async def test_balance_of_batch_first_pair(erc1155_factory):
+    _, erc1155 = erc1155_factory
+    await erc1155.mint(OWNER, 1, 7).invoke()
+
+    expected_balances = await erc1155.balanceOfBatch([OWNER], [1]).call()
+    assert expected_balances.result.balances == [7]
+
+    expected_balances = await erc1155.balanceOfBatch([], []).call()
+    assert expected_balances.result.balances == []
+
+@pytest.mark.asyncio
+async def test_balance_of_batch_length_mismatch(erc1155_factory):
+    _, erc1155 = erc1155_factory
+
+    await assert_revert(erc1155.balanceOfBatch([OWNER, OWNER], [1]).call())
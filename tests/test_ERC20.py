@@ -1,43 +1,57 @@
 import pytest
 import asyncio
 from starkware.starknet.testing.starknet import Starknet
-from utils import Signer, assert_invoked_revert, assert_revert, uint, uint_add, str_to_felt, MAX_UINT256
+from utils import (
+    deploy, fork, Signer, assert_invoked_revert, assert_revert, set_block_timestamp,
+    uint, uint_add, str_to_felt, hash_domain_separator, MAX_UINT256, CHAIN_ID
+)
 
 signer = Signer(123456789987654321)
 friend_signer = Signer(69420)
 
+DEADLINE = 1000
+
 @pytest.fixture(scope='module')
 def event_loop():
     return asyncio.new_event_loop()
 
-# @pytest.fixture(scope='module')
-async def erc20_factory():
+@pytest.fixture(scope='module')
+async def erc20_init():
     starknet = await Starknet.empty()
-    owner = await starknet.deploy(
+    owner = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[signer.public_key]
     )
 
-    friend = await starknet.deploy(
+    friend = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[friend_signer.public_key]
     )
 
-    erc20 = await starknet.deploy(
+    erc20 = await deploy(
+        starknet,
         "contracts/mocks/MockERC20.cairo",
         constructor_calldata=[
             str_to_felt("Test Contract"),
             str_to_felt("TEST"),
             18,
             *uint(1000),
-            owner.contract_address
+            owner.contract_address,
+            CHAIN_ID
         ]
     )
     return starknet, erc20, owner, friend
 
+@pytest.fixture
+def erc20_factory(erc20_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*erc20_init)
+
 @pytest.mark.asyncio
-async def test_constructor():
-    _, erc20, _, _ = await erc20_factory()
+async def test_constructor(erc20_factory):
+    _, erc20, _, _ = erc20_factory
     expected_name = await erc20.name().call()
     assert expected_name.result.name == str_to_felt("Test Contract")
     expected_symbol = await erc20.symbol().call()
@@ -52,8 +66,8 @@ async def test_constructor():
 #############################################
 
 @pytest.mark.asyncio
-async def test_mint():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_mint(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     amount = uint(69420)
     await erc20.mint(owner.contract_address, amount).invoke(caller_address=owner.contract_address)
     await erc20.mint(friend.contract_address, amount).invoke(caller_address=owner.contract_address)
@@ -63,8 +77,8 @@ async def test_mint():
     assert expected_balance.result.balance == amount
 
 @pytest.mark.asyncio
-async def test_owner():
-    _, erc20, owner, _ = await erc20_factory()
+async def test_owner(erc20_factory):
+    _, erc20, owner, _ = erc20_factory
     expected_owner = await erc20.owner().call()
     assert expected_owner.result.owner == owner.contract_address
 
@@ -77,8 +91,8 @@ async def test_owner():
 ###############
 
 @pytest.mark.asyncio
-async def test_approve_from_caller():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_approve_from_caller(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     mint_amount = uint(1000)
     approved_amount = uint(500)
     # Mint tokens
@@ -90,8 +104,8 @@ async def test_approve_from_caller():
     assert executed_info.result.allowance == approved_amount
 
 @pytest.mark.asyncio
-async def test_approve_none_minted():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_approve_none_minted(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     amount = uint(69420)
     await erc20.approve(friend.contract_address, amount).invoke(owner.contract_address)
     # Check if the user is approved
@@ -101,8 +115,8 @@ async def test_approve_none_minted():
     assert executed_info.result.allowance == uint(0)
 
 @pytest.mark.asyncio
-async def test_fail_approve_zero_spender():
-    _, erc20, owner, _ = await erc20_factory()
+async def test_fail_approve_zero_spender(erc20_factory):
+    _, erc20, owner, _ = erc20_factory
     amount = uint(69420)
     await erc20.mint(owner.contract_address, amount).invoke(caller_address=owner.contract_address)
     await assert_invoked_revert(erc20.approve(0, amount), owner.contract_address)
@@ -112,8 +126,8 @@ async def test_fail_approve_zero_spender():
 ##########################
 
 @pytest.mark.asyncio
-async def test_increase_allowance():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_increase_allowance(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     half = uint(500)
     amount = uint(1000)
     # Approve the user to spend the tokens
@@ -133,8 +147,8 @@ async def test_increase_allowance():
     assert executed_info.result.allowance == uint(0)
 
 @pytest.mark.asyncio
-async def test_fail_increase_allowance_overflow():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_fail_increase_allowance_overflow(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     amount = MAX_UINT256
     # overflow_amount adds (1, 0) to (2**128 - 1, 2**128 - 1)
     overflow_amount = uint(1)
@@ -147,8 +161,8 @@ async def test_fail_increase_allowance_overflow():
 
 
 @pytest.mark.asyncio
-async def test_increase_allowance_zero_spender():
-    _, erc20, owner, _ = await erc20_factory()
+async def test_increase_allowance_zero_spender(erc20_factory):
+    _, erc20, owner, _ = erc20_factory
     await assert_invoked_revert(erc20.increase_allowance(0, uint(1)), owner.contract_address)
 
 ##########################
@@ -156,8 +170,8 @@ async def test_increase_allowance_zero_spender():
 ##########################
 
 @pytest.mark.asyncio
-async def test_decrease_allowance():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_decrease_allowance(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     amount = uint(1000)
     # Approve the user to spend the tokens
     await erc20.approve(friend.contract_address, uint(500)).invoke(caller_address=owner.contract_address)
@@ -174,15 +188,15 @@ async def test_decrease_allowance():
     assert executed_info.result.allowance == uint(0)
 
 @pytest.mark.asyncio
-async def test_fail_decrease_allowance_underflow():
-    _, erc20, owner, friend = await erc20_factory()
+async def test_fail_decrease_allowance_underflow(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
     ## Overflows - will try to subtract 1 from 0
     await assert_invoked_revert(erc20.decrease_allowance(friend.contract_address, uint(1)), owner.contract_address)
 
 
 @pytest.mark.asyncio
-async def test_fail_decrease_allowance_zero_spender():
-    _, erc20, owner, _ = await erc20_factory()
+async def test_fail_decrease_allowance_zero_spender(erc20_factory):
+    _, erc20, owner, _ = erc20_factory
     await assert_invoked_revert(erc20.decrease_allowance(0, uint(0)), owner.contract_address)
 
 ################
@@ -192,3 +206,181 @@ async def test_fail_decrease_allowance_zero_spender():
 #####################
 ## transfer_from() ##
 #####################
+
+######################
+## transfer_batch() ##
+######################
+
+@pytest.mark.asyncio
+async def test_transfer_batch(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    recipients = [friend.contract_address, 333, 444, friend.contract_address]
+    amounts = [uint(100), uint(200), uint(300), uint(50)]
+    await erc20.mint(owner.contract_address, uint(1000)).invoke(caller_address=owner.contract_address)
+    executed = await erc20.transfer_batch(recipients, amounts).invoke(caller_address=owner.contract_address)
+    assert executed.result.success == 1
+
+    for account, balance in [(owner.contract_address, 350), (friend.contract_address, 150), (333, 200), (444, 300)]:
+        executed_info = await erc20.balance_of(account).call()
+        assert executed_info.result.balance == uint(balance)
+
+@pytest.mark.asyncio
+async def test_transfer_batch_to_self(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    await erc20.mint(owner.contract_address, uint(1000)).invoke(caller_address=owner.contract_address)
+    await erc20.transfer_batch(
+        [owner.contract_address, friend.contract_address], [uint(1000), uint(400)]
+    ).invoke(caller_address=owner.contract_address)
+
+    executed_info = await erc20.balance_of(owner.contract_address).call()
+    assert executed_info.result.balance == uint(600)
+    executed_info = await erc20.balance_of(friend.contract_address).call()
+    assert executed_info.result.balance == uint(400)
+
+@pytest.mark.asyncio
+async def test_transfer_batch_reads_sender_once(erc20_factory):
+    starknet, erc20, owner, _ = erc20_factory
+    recipients = list(range(100, 120))
+    await erc20.mint(owner.contract_address, uint(1000)).invoke(caller_address=owner.contract_address)
+    execution_info = await starknet.state.invoke_raw(
+        erc20.contract_address, 'transfer_batch',
+        [len(recipients), *recipients, len(recipients), *uint(1) * len(recipients)],
+        owner.contract_address
+    )
+    call_info = execution_info.call_info
+    # Every balance, the sender's included, is read once and written once,
+    # and storage_read_values also logs the value each write replaces
+    batch_reads = len(call_info.storage_read_values)
+    assert batch_reads == 2 * len(call_info.storage_accessed_addresses)
+
+    executed_info = await erc20.balance_of(owner.contract_address).call()
+    assert executed_info.result.balance == uint(1000 - len(recipients))
+
+    # Paying the same recipients one transfer at a time re-reads the sender every time
+    single_reads = 0
+    for recipient in recipients:
+        execution_info = await starknet.state.invoke_raw(
+            erc20.contract_address, 'transfer', [recipient, *uint(1)], owner.contract_address
+        )
+        single_reads += len(execution_info.call_info.storage_read_values)
+    assert batch_reads < single_reads
+
+@pytest.mark.asyncio
+async def test_fail_transfer_batch_insufficient_balance(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    await erc20.mint(owner.contract_address, uint(1000)).invoke(caller_address=owner.contract_address)
+    # The second transfer overdraws what the first one left
+    await assert_invoked_revert(
+        erc20.transfer_batch([friend.contract_address, 333], [uint(600), uint(401)]), owner.contract_address)
+
+@pytest.mark.asyncio
+async def test_fail_transfer_batch_invalid_input(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    await erc20.mint(owner.contract_address, uint(1000)).invoke(caller_address=owner.contract_address)
+    # Mismatched lengths
+    await assert_invoked_revert(
+        erc20.transfer_batch([friend.contract_address, 333], [uint(1)]), owner.contract_address)
+    # Zero recipient
+    await assert_invoked_revert(
+        erc20.transfer_batch([friend.contract_address, 0], [uint(1), uint(1)]), owner.contract_address)
+
+##############
+## permit() ##
+##############
+
+@pytest.mark.asyncio
+async def test_permit(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE)
+    # Anyone can submit the permit
+    executed = await erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke(caller_address=friend.contract_address)
+    assert executed.result.success == 1
+
+    executed_info = await erc20.allowance(owner.contract_address, friend.contract_address).call()
+    assert executed_info.result.allowance == amount
+    executed_info = await erc20.nonces(owner.contract_address).call()
+    assert executed_info.result.nonce == 1
+
+@pytest.mark.asyncio
+async def test_permit_and_transfer_from_in_one_transaction(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    await erc20.mint(owner.contract_address, amount).invoke(caller_address=owner.contract_address)
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE)
+    # The spender submits the permit and spends it without a separate approve from the owner
+    await friend_signer.send_transactions(friend, [
+        (erc20.contract_address, 'permit', [
+            owner.contract_address, friend.contract_address, *amount, DEADLINE, len(signature), *signature
+        ]),
+        (erc20.contract_address, 'transfer_from', [owner.contract_address, friend.contract_address, *amount])
+    ])
+
+    executed_info = await erc20.balance_of(owner.contract_address).call()
+    assert executed_info.result.balance == uint(0)
+    executed_info = await erc20.balance_of(friend.contract_address).call()
+    assert executed_info.result.balance == amount
+    executed_info = await erc20.allowance(owner.contract_address, friend.contract_address).call()
+    assert executed_info.result.allowance == uint(0)
+
+@pytest.mark.asyncio
+async def test_fail_permit_after_deadline(erc20_factory):
+    starknet, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE)
+    set_block_timestamp(starknet, DEADLINE + 1)
+    await assert_revert(erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke())
+
+@pytest.mark.asyncio
+async def test_fail_permit_replay(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE)
+    await erc20.permit(owner.contract_address, friend.contract_address, amount, DEADLINE, signature).invoke()
+    await erc20.decrease_allowance(friend.contract_address, amount).invoke(caller_address=owner.contract_address)
+    # The nonce was consumed
+    await assert_revert(erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke())
+
+@pytest.mark.asyncio
+async def test_fail_permit_invalid_signature(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    # Signed by the wrong key
+    signature = friend_signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE)
+    await assert_revert(erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke())
+    # Signed for another amount
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, uint(1), 0, DEADLINE)
+    await assert_revert(erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke())
+
+@pytest.mark.asyncio
+async def test_domain_separator(erc20_factory):
+    _, erc20, _, _ = erc20_factory
+    executed_info = await erc20.domain_separator().call()
+    assert executed_info.result.domain_separator == hash_domain_separator(CHAIN_ID, erc20.contract_address)
+
+@pytest.mark.asyncio
+async def test_fail_permit_for_another_chain(erc20_factory):
+    _, erc20, owner, friend = erc20_factory
+    amount = uint(500)
+    signature = signer.sign_permit(
+        erc20.contract_address, owner.contract_address, friend.contract_address, amount, 0, DEADLINE,
+        chain_id=CHAIN_ID + 1)
+    await assert_revert(erc20.permit(
+        owner.contract_address, friend.contract_address, amount, DEADLINE, signature
+    ).invoke())
@@ -0,0 +1,205 @@
+import pytest
+import asyncio
+from starkware.starknet.testing.starknet import Starknet
+from utils import deploy, fork, assert_revert, set_block_timestamp, felt_to_64x61, get_execution_resources, uint, str_to_felt, MAX_UINT256, FP_SCALE, CHAIN_ID
+
+OWNER = 1
+USER = 2
+ATOKEN = 222
+RATE = felt_to_64x61(1) // 10 ** 6
+START = 1000
+
+@pytest.fixture(scope='module')
+def event_loop():
+    return asyncio.new_event_loop()
+
+@pytest.fixture(scope='module')
+async def pool_init():
+    starknet = await Starknet.empty()
+    pool = await deploy(
+        starknet,
+        "contracts/defi/LendingPool/LendingPool.cairo",
+        constructor_calldata=[OWNER]
+    )
+    token = await deploy(
+        starknet,
+        "contracts/mocks/MockERC20.cairo",
+        constructor_calldata=[
+            str_to_felt("Test Token"),
+            str_to_felt("TEST"),
+            18,
+            *uint(0),
+            OWNER,
+            CHAIN_ID
+        ]
+    )
+    set_block_timestamp(starknet, START)
+    await pool.initReserve(token.contract_address, ATOKEN, RATE).invoke(caller_address=OWNER)
+    return starknet, pool, token
+
+@pytest.fixture
+def pool_factory(pool_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*pool_init)
+
+async def fund(pool, token, user, amount):
+    await token.mint(user, uint(amount)).invoke(caller_address=OWNER)
+    await token.approve(pool.contract_address, MAX_UINT256).invoke(caller_address=user)
+
+def accrue(index, elapsed):
+    # Linear interest with the truncation of mul_fp
+    return index * (FP_SCALE + RATE * elapsed) // FP_SCALE
+
+@pytest.mark.asyncio
+async def test_init_reserve(pool_factory):
+    _, pool, token = pool_factory
+    reserve = token.contract_address
+
+    reserve_data = await pool.getReserveData(reserve).call()
+    assert reserve_data.result == (ATOKEN, felt_to_64x61(1), RATE, START, 1, 0)
+
+    a_token = await pool.getReserveATokenAddress(reserve).call()
+    assert a_token.result.reserve == ATOKEN
+    is_active = await pool.getReserveIsActive(reserve).call()
+    assert is_active.result.active == 1
+    is_freezed = await pool.getReserveIsFreezed(reserve).call()
+    assert is_freezed.result.freezed == 0
+
+@pytest.mark.asyncio
+async def test_init_reserve_only_once(pool_factory):
+    _, pool, token = pool_factory
+    reserve = token.contract_address
+    await assert_revert(pool.initReserve(reserve, ATOKEN, RATE).invoke(caller_address=OWNER))
+
+@pytest.mark.asyncio
+async def test_init_reserve_only_owner(pool_factory):
+    _, pool, token = pool_factory
+    reserve = token.contract_address
+    await assert_revert(pool.initReserve(reserve + 1, ATOKEN, RATE).invoke(caller_address=2))
+    await assert_revert(pool.setReserveIsFreezed(reserve, 1).invoke(caller_address=2))
+    await assert_revert(pool.setReserveIsActive(reserve, 0).invoke(caller_address=2))
+
+@pytest.mark.asyncio
+async def test_reserve_flags(pool_factory):
+    _, pool, token = pool_factory
+    reserve = token.contract_address
+
+    # Flags are packed with the timestamp and updated independently
+    await pool.setReserveIsFreezed(reserve, 1).invoke(caller_address=OWNER)
+    reserve_data = await pool.getReserveData(reserve).call()
+    assert reserve_data.result == (ATOKEN, felt_to_64x61(1), RATE, START, 1, 1)
+
+    await pool.setReserveIsActive(reserve, 0).invoke(caller_address=OWNER)
+    reserve_data = await pool.getReserveData(reserve).call()
+    assert reserve_data.result == (ATOKEN, felt_to_64x61(1), RATE, START, 0, 1)
+
+    await pool.setReserveIsFreezed(reserve, 0).invoke(caller_address=OWNER)
+    is_active = await pool.getReserveIsActive(reserve).call()
+    assert is_active.result.active == 0
+    is_freezed = await pool.getReserveIsFreezed(reserve).call()
+    assert is_freezed.result.freezed == 0
+
+    # Flags are booleans
+    await assert_revert(pool.setReserveIsFreezed(reserve, 2).invoke(caller_address=OWNER))
+
+@pytest.mark.asyncio
+async def test_reserve_flags_read_one_slot(pool_factory):
+    starknet, pool, token = pool_factory
+    # The flags share their slot with the index and timestamp, so the deposit guard reads one slot
+    for selector in ['getReserveIsActive', 'getReserveIsFreezed']:
+        execution_info = await starknet.state.invoke_raw(
+            pool.contract_address, selector, [token.contract_address], OWNER
+        )
+        assert len(execution_info.call_info.storage_read_values) == 1
+
+#############################################
+##                Deposits                 ##
+#############################################
+
+@pytest.mark.asyncio
+async def test_deposit(pool_factory):
+    starknet, pool, token = pool_factory
+    await fund(pool, token, USER, 10 ** 6)
+
+    set_block_timestamp(starknet, START + 1000)
+    execution_info = await pool.deposit(token.contract_address, uint(10 ** 6), uint(0)).invoke(caller_address=USER)
+    assert execution_info.main_call_events[0] == (token.contract_address, USER, uint(10 ** 6), uint(0), START + 1000)
+
+    pool_balance = await token.balance_of(pool.contract_address).call()
+    assert pool_balance.result.balance == uint(10 ** 6)
+
+    # The index accrued before the deposit, which is scaled down by it
+    index = accrue(FP_SCALE, 1000)
+    reserve_data = await pool.getReserveData(token.contract_address).call()
+    assert reserve_data.result == (ATOKEN, index, RATE, START + 1000, 1, 0)
+    scaled_balance = await pool.scaledBalanceOf(token.contract_address, USER).call()
+    assert scaled_balance.result.scaledBalance == 10 ** 6 * FP_SCALE // index
+    total_scaled_supply = await pool.totalScaledSupply(token.contract_address).call()
+    assert total_scaled_supply.result.scaledSupply == scaled_balance.result.scaledBalance
+
+@pytest.mark.asyncio
+async def test_deposit_reads_each_slot_once(pool_factory):
+    starknet, pool, token = pool_factory
+    await fund(pool, token, USER, 10 ** 6)
+
+    execution_info = await starknet.state.invoke_raw(
+        pool.contract_address, 'deposit', [token.contract_address, *uint(10 ** 6), *uint(0)], USER
+    )
+    call_info = execution_info.call_info
+    # The reserve state, its rate, the user's scaled balance and the scaled supply
+    assert len(call_info.storage_accessed_addresses) == 4
+    # storage_read_values also logs the value each of the three writes replaces, the rate isn't written
+    assert len(call_info.storage_read_values) == 4 + 3
+
+@pytest.mark.asyncio
+async def test_deposit_accrues_interest(pool_factory):
+    starknet, pool, token = pool_factory
+    await fund(pool, token, USER, 10 ** 12)
+    await pool.deposit(token.contract_address, uint(10 ** 12), uint(0)).invoke(caller_address=USER)
+
+    # Interest accrues without touching the depositor
+    set_block_timestamp(starknet, START + 10 ** 4)
+    index = accrue(FP_SCALE, 10 ** 4)
+    expected_index = await pool.getReserveNormalizedIncome(token.contract_address).call()
+    assert expected_index.result.liquidityIndex == index
+    balance = await pool.balanceOf(token.contract_address, USER).call()
+    assert balance.result.balance == 10 ** 12 * index // FP_SCALE
+
+    # Later deposits compound on the updated index
+    await fund(pool, token, USER, 10 ** 12)
+    await pool.deposit(token.contract_address, uint(10 ** 12), uint(0)).invoke(caller_address=USER)
+    set_block_timestamp(starknet, START + 2 * 10 ** 4)
+    index = accrue(index, 10 ** 4)
+    expected_index = await pool.getReserveNormalizedIncome(token.contract_address).call()
+    assert expected_index.result.liquidityIndex == index
+
+@pytest.mark.asyncio
+async def test_deposit_guards(pool_factory):
+    _, pool, token = pool_factory
+    await fund(pool, token, USER, 10 ** 6)
+
+    await assert_revert(pool.deposit(token.contract_address, uint(0), uint(0)).invoke(caller_address=USER))
+    await assert_revert(pool.deposit(token.contract_address, (0, 1), uint(0)).invoke(caller_address=USER))
+    await assert_revert(pool.deposit(ATOKEN, uint(10), uint(0)).invoke(caller_address=USER))
+
+    await pool.setReserveIsFreezed(token.contract_address, 1).invoke(caller_address=OWNER)
+    await assert_revert(pool.deposit(token.contract_address, uint(10), uint(0)).invoke(caller_address=USER))
+
+    await pool.setReserveIsFreezed(token.contract_address, 0).invoke(caller_address=OWNER)
+    await pool.setReserveIsActive(token.contract_address, 0).invoke(caller_address=OWNER)
+    await assert_revert(pool.deposit(token.contract_address, uint(10), uint(0)).invoke(caller_address=USER))
+
+@pytest.mark.asyncio
+async def test_deposit_cost_independent_of_depositors(pool_factory):
+    starknet, pool, token = pool_factory
+
+    steps = []
+    for i in range(10):
+        user = 100 + i
+        await fund(pool, token, user, 10 ** 6)
+        set_block_timestamp(starknet, START + i + 1)
+        execution_info = await pool.deposit(token.contract_address, uint(10 ** 6), uint(0)).invoke(caller_address=user)
+        steps.append(get_execution_resources(execution_info).n_steps)
+
+    # Steps differ by a few with the values the range checks see, but don't grow with the depositors
+    assert max(steps) - min(steps) < 32
@@ -1,8 +1,11 @@
 import pytest
 import asyncio
 import math
+import random
+import numpy as np
+import math64x61_model as model
 from starkware.starknet.testing.starknet import Starknet
-from utils import Signer, felt_to_64x61, PRIME, is_fp_close
+from utils import deploy, Signer, felt_to_64x61, PRIME, PRIME_HALF, FP_SCALE, is_fp_close, get_execution_resources
 
 signer = Signer(123456789987654321)
 friend_signer = Signer(69420)
@@ -14,7 +17,8 @@ def event_loop():
 @pytest.fixture(scope='module')
 async def math64x61_factory():
     starknet = await Starknet.empty()
-    math = await starknet.deploy(
+    math = await deploy(
+        starknet,
         "contracts/utils/math_64x61.cairo",
     )
     return starknet, math
@@ -44,8 +48,8 @@ async def test_division(math64x61_factory):
 async def test_pow(math64x61_factory):
     (_, fp_math ) =  math64x61_factory
 
-    xs = [ 4, 4, 4, 1024, 2 ** 16 - 1 , 4 , 64, -10, -10, -10 ]
-    ys = [ 0, 1, 2, 3, 3 , -2, -3, 1, 2, 3 ]
+    xs = [ 4, 4, 4, 1024, 2 ** 16 - 1 , 4 , 64, -10, -10, -10, 2, 2, 2, 3 ]
+    ys = [ 0, 1, 2, 3, 3 , -2, -3, 1, 2, 3, 0, 63, -5, 39 ]
 
     for i in range(len(xs)):
         x = xs[i]
@@ -58,6 +62,16 @@ async def test_pow(math64x61_factory):
         else:
             assert res.result[0]  == target
 
+@pytest.mark.asyncio
+async def test_pow_overflow(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    # 2^64 and 3^41 are both past the 64x61 bound
+    with pytest.raises(Exception):
+        await fp_math.pow_fp(felt_to_64x61(2), 64).invoke()
+    with pytest.raises(Exception):
+        await fp_math.pow_fp(felt_to_64x61(3), 41).invoke()
+
 @pytest.mark.asyncio
 async def test_sqrt(math64x61_factory):
     (_, fp_math ) =  math64x61_factory
@@ -94,6 +108,28 @@ async def test_binary_log(math64x61_factory):
         else:
             assert is_fp_close(res.result[0],target)
 
+# log2_fp steps per input with the halving-recursion _msb it replaced, measured on cairo-lang 0.7.0
+HALVING_MSB_LOG2_STEPS = { 2: 740, 2 ** 8: 1292, 2 ** 32: 3056, 2 ** 62: 5251 }
+
+@pytest.mark.asyncio
+async def test_binary_log_steps(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+    steps = {}
+
+    for x in HALVING_MSB_LOG2_STEPS:
+        res = await fp_math.log2_fp(felt_to_64x61(x)).invoke()
+        assert is_fp_close(res.result[0], felt_to_64x61(math.log2(x)))
+        steps[x] = get_execution_resources(res).n_steps
+
+    # _msb(ONE) exits before probing, like the halving version did
+    assert steps[2] <= HALVING_MSB_LOG2_STEPS[2]
+    # Past a few bits the seven fixed probes beat halving one bit at a time
+    for x in [2 ** 8, 2 ** 32, 2 ** 62]:
+        assert steps[x] < HALVING_MSB_LOG2_STEPS[x]
+    assert steps[2 ** 62] * 4 < HALVING_MSB_LOG2_STEPS[2 ** 62]
+    # and the cost stays nearly flat across magnitudes
+    assert max(steps.values()) - steps[2 ** 8] < 100
+
 @pytest.mark.asyncio
 async def test_natural_log(math64x61_factory):
     (_, fp_math ) =  math64x61_factory
@@ -120,4 +156,107 @@ async def test_log_10(math64x61_factory):
         if target < 0:
             assert is_fp_close(res.result[0]- PRIME,target)
         else:
-            assert is_fp_close(res.result[0],target)
\ No newline at end of file
+            assert is_fp_close(res.result[0],target)
+
+def from_felt(felt):
+    # a negative fp number is represented as {actual number + PRIME}
+    return felt - PRIME if felt > PRIME_HALF else felt
+
+@pytest.mark.asyncio
+async def test_multiplication_batch(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    rng = random.Random(0)
+    xs = [ rng.randint(-2 ** 92, 2 ** 92) for _ in range(200) ]
+    ys = [ rng.randint(-2 ** 92, 2 ** 92) for _ in range(200) ]
+
+    res = await fp_math.mul_fp_batch([ x % PRIME for x in xs ], [ y % PRIME for y in ys ]).invoke()
+
+    assert [ from_felt(r) for r in res.result.res ] == [ (x * y) // FP_SCALE for x, y in zip(xs, ys) ]
+
+@pytest.mark.asyncio
+async def test_sqrt_batch(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    xs = [ 1 + i * 0.37 for i in range(200) ]
+
+    res = await fp_math.sqrt_fp_batch([ int(felt_to_64x61(x)) for x in xs ]).invoke()
+
+    for x, r in zip(xs, res.result.res):
+        assert is_fp_close(r, felt_to_64x61(math.sqrt(x)))
+
+@pytest.mark.asyncio
+async def test_exp_batch(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    xs = [ -10 + i * 0.1 for i in range(200) ]
+
+    res = await fp_math.exp_fp_batch([ int(felt_to_64x61(x)) % PRIME for x in xs ]).invoke()
+
+    for x, r in zip(xs, res.result.res):
+        assert math.isclose(from_felt(r), felt_to_64x61(math.exp(x)), rel_tol=1e-6, abs_tol=2 ** 40)
+
+@pytest.mark.asyncio
+async def test_natural_log_batch(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    xs = [ 0.05 + i * 0.5 for i in range(200) ]
+
+    res = await fp_math.ln_fp_batch([ int(felt_to_64x61(x)) for x in xs ]).invoke()
+
+    for x, r in zip(xs, res.result.res):
+        assert math.isclose(from_felt(r), felt_to_64x61(math.log(x)), rel_tol=1e-6, abs_tol=2 ** 40)
+
+def model_inputs(model_fn, *inputs):
+    # keeps only the inputs the contract call succeeds on, with the expected results
+    res, ok = model_fn(*inputs)
+    return [ list(np.asarray(x, dtype=object)[ok]) for x in inputs ], list(res[ok])
+
+@pytest.mark.asyncio
+async def test_batch_matches_model(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    rng = random.Random(0)
+    xs = [ rng.randint(-2 ** 63, 2 ** 63) % PRIME for _ in range(300) ]
+    ys = [ rng.randint(-2 ** 63, 2 ** 63) % PRIME for _ in range(300) ]
+    small = [ rng.randint(-20 * FP_SCALE, 20 * FP_SCALE) % PRIME for _ in range(300) ]
+    positive = [ rng.randint(1, 2 ** 63) for _ in range(300) ]
+
+    ([ mul_x, mul_y ], expected) = model_inputs(model.mul_fp, xs, ys)
+    res = await fp_math.mul_fp_batch(mul_x, mul_y).invoke()
+    assert res.result.res == expected
+
+    ([ exp_x ], expected) = model_inputs(model.exp_fp, small)
+    res = await fp_math.exp_fp_batch(exp_x).invoke()
+    assert res.result.res == expected
+
+    ([ ln_x ], expected) = model_inputs(model.ln_fp, positive)
+    res = await fp_math.ln_fp_batch(ln_x).invoke()
+    assert res.result.res == expected
+
+    ([ sqrt_x ], expected) = model_inputs(model.sqrt_fp, positive)
+    res = await fp_math.sqrt_fp_batch(sqrt_x).invoke()
+    assert res.result.res == expected
+
+@pytest.mark.asyncio
+async def test_scalar_matches_model(math64x61_factory):
+    (_, fp_math ) =  math64x61_factory
+
+    rng = random.Random(1)
+    xs = [ rng.randint(-20 * FP_SCALE, 20 * FP_SCALE) % PRIME for _ in range(10) ]
+    ys = [ rng.randint(-2 ** 63, 2 ** 63) % PRIME for _ in range(10) ]
+
+    (div_res, _) = model.div_fp(xs, ys)
+    (exp2_res, _) = model.exp2_fp(xs)
+    (log2_res, log2_ok) = model.log2_fp(xs)
+
+    for i in range(len(xs)):
+        res = await fp_math.div_fp(xs[i], ys[i]).invoke()
+        assert res.result[0] == div_res[i]
+
+        res = await fp_math.exp2_fp(xs[i]).invoke()
+        assert res.result[0] == exp2_res[i]
+
+        if log2_ok[i]:
+            res = await fp_math.log2_fp(xs[i]).invoke()
+            assert res.result[0] == log2_res[i]
@@ -0,0 +1,86 @@
+import pytest
+import asyncio
+from starkware.starknet.testing.starknet import Starknet
+from utils import deploy, fork, assert_revert
+
+TOKEN_A = 111
+TOKEN_B = 222
+TOKEN_C = 333
+STRATEGY = 1
+FEE = 30
+
+@pytest.fixture(scope='module')
+def event_loop():
+    return asyncio.new_event_loop()
+
+@pytest.fixture(scope='module')
+async def exchange_init():
+    starknet = await Starknet.empty()
+    exchange = await deploy(
+        starknet,
+        "contracts/defi/MultiExchange.cairo",
+        constructor_calldata=[0, 1]
+    )
+    return starknet, exchange
+
+@pytest.fixture
+def exchange_factory(exchange_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*exchange_init)
+
+async def create_pair(exchange, token_a, token_b, strategy=STRATEGY, fee=FEE):
+    return await exchange.createPair(0, token_a, token_b, 0, 0, strategy, fee, 0).invoke()
+
+@pytest.mark.asyncio
+async def test_create_pair(exchange_factory):
+    _, exchange = exchange_factory
+    executed_info = await create_pair(exchange, TOKEN_B, TOKEN_A)
+    assert executed_info.result.id == 1
+
+    # Tokens are stored in canonical order
+    expected_pair = await exchange.getPairById(1).call()
+    assert expected_pair.result.pair == (TOKEN_A, TOKEN_B, STRATEGY, FEE)
+
+    # And resolve in either order
+    expected_id = await exchange.getPair(TOKEN_A, TOKEN_B, STRATEGY, FEE).call()
+    assert expected_id.result.id == 1
+    expected_id = await exchange.getPair(TOKEN_B, TOKEN_A, STRATEGY, FEE).call()
+    assert expected_id.result.id == 1
+
+@pytest.mark.asyncio
+async def test_create_pair_duplicate(exchange_factory):
+    _, exchange = exchange_factory
+    await create_pair(exchange, TOKEN_A, TOKEN_B)
+
+    await assert_revert(create_pair(exchange, TOKEN_A, TOKEN_B))
+    await assert_revert(create_pair(exchange, TOKEN_B, TOKEN_A))
+
+    # A different strategy or fee is a different pair
+    executed_info = await create_pair(exchange, TOKEN_B, TOKEN_A, fee=FEE + 1)
+    assert executed_info.result.id == 2
+    executed_info = await create_pair(exchange, TOKEN_B, TOKEN_A, strategy=STRATEGY + 1)
+    assert executed_info.result.id == 3
+
+@pytest.mark.asyncio
+async def test_create_pair_identical_tokens(exchange_factory):
+    _, exchange = exchange_factory
+    await assert_revert(create_pair(exchange, TOKEN_A, TOKEN_A))
+
+@pytest.mark.asyncio
+async def test_get_pair_ids(exchange_factory):
+    _, exchange = exchange_factory
+    await create_pair(exchange, TOKEN_A, TOKEN_B)
+    await create_pair(exchange, TOKEN_C, TOKEN_B)
+    await create_pair(exchange, TOKEN_A, TOKEN_C, fee=5)
+
+    expected_ids = await exchange.getPairIds([
+        (TOKEN_B, TOKEN_A, STRATEGY, FEE),
+        (TOKEN_A, TOKEN_C, STRATEGY, FEE),
+        (TOKEN_B, TOKEN_C, STRATEGY, FEE),
+        (TOKEN_C, TOKEN_A, STRATEGY, 5),
+        (TOKEN_A, TOKEN_B, STRATEGY + 1, FEE),
+    ]).call()
+    assert expected_ids.result.ids == [1, 0, 2, 3, 0]
+
+    expected_ids = await exchange.getPairIds([]).call()
+    assert expected_ids.result.ids == []
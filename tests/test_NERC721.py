@@ -1,10 +1,13 @@
 import pytest
 import asyncio
 from starkware.starknet.testing.starknet import Starknet
-from utils import Signer, uint, str_to_felt
+from starkware.starknet.public.abi import get_selector_from_name
+from utils import deploy, fork, Signer, uint, str_to_felt, get_storage, to_call_array, hash_batch
 
-owner_signer = Signer(123456789987654321)
-friend_signer = Signer(69420)
+MAX_BATCH_SIZE = 128
+
+owner_signer = Signer(123456789987654321, track_nonces=True)
+friend_signer = Signer(69420, track_nonces=True)
 
 
 @pytest.fixture(scope='module')
@@ -12,19 +15,23 @@ def event_loop():
     return asyncio.new_event_loop()
 
 
-async def ownable_factory():
+@pytest.fixture(scope='module')
+async def ownable_init():
     starknet = await Starknet.empty()
-    owner = await starknet.deploy(
+    owner = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[owner_signer.public_key]
     )
 
-    friend = await starknet.deploy(
+    friend = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[friend_signer.public_key]
     )
 
-    erc721 = await starknet.deploy(
+    erc721 = await deploy(
+        starknet,
         "tests/mocks/MockNERC721.cairo",
         constructor_calldata=[
             str_to_felt("Test Contract"),
@@ -35,10 +42,15 @@ async def ownable_factory():
     )
     return starknet, erc721, owner, friend
 
+@pytest.fixture
+def ownable_factory(ownable_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*ownable_init)
+
 
 @pytest.mark.asyncio
-async def test_constructor():
-    _, erc721, _, _ = await ownable_factory()
+async def test_constructor(ownable_factory):
+    _, erc721, _, _ = ownable_factory
     expected_name = await erc721.name().call()
     assert expected_name.result.name == str_to_felt("Test Contract")
     expected_symbol = await erc721.symbol().call()
@@ -50,8 +62,8 @@ async def test_constructor():
 
 
 @pytest.mark.asyncio
-async def test_mint():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_mint(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     expected_owner = await erc721.owner_of(0).call()
     assert expected_owner.result.owner == owner.contract_address
@@ -59,8 +71,8 @@ async def test_mint():
     assert expected_balance.result.balance == 1
 
 @pytest.mark.asyncio
-async def test_burn():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_burn(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'burn', [0])
     expected_owner = await erc721.owner_of(0).call()
@@ -69,16 +81,16 @@ async def test_burn():
     assert expected_balance.result.balance == 0
 
 @pytest.mark.asyncio
-async def test_approve():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_approve(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
     expected_spender = await erc721.get_approved(0).call()
     assert expected_spender.result.spender == friend.contract_address
 
 @pytest.mark.asyncio
-async def test_approve_burn():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_approve_burn(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
     await owner_signer.send_transaction(owner, erc721.contract_address, 'burn', [0])
@@ -86,15 +98,15 @@ async def test_approve_burn():
     assert expected_spender.result.spender == 0
 
 @pytest.mark.asyncio
-async def test_approve_all():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_approve_all(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await owner_signer.send_transaction(owner, erc721.contract_address, 'set_approval_for_all', [friend.contract_address, 1])
     expected_approval = await erc721.is_approved_for_all(owner.contract_address, friend.contract_address,).call()
     assert expected_approval.result.approved == 1
 
 @pytest.mark.asyncio
-async def test_transfer_from():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_transfer_from(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
     await friend_signer.send_transaction(friend, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
@@ -109,8 +121,8 @@ async def test_transfer_from():
     assert expected_balance_to.result.balance == 1
 
 @pytest.mark.asyncio
-async def test_transfer_from_self():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_transfer_from_self(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
 
@@ -124,8 +136,8 @@ async def test_transfer_from_self():
     assert expected_balance_to.result.balance == 1
 
 @pytest.mark.asyncio
-async def test_transfer_from_approve_all():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_transfer_from_approve_all(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'set_approval_for_all', [friend.contract_address, 1])
     await friend_signer.send_transaction(friend, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
@@ -140,68 +152,412 @@ async def test_transfer_from_approve_all():
     assert expected_balance_to.result.balance == 1
 
 @pytest.mark.asyncio
-async def test_fail_mint_to_zero():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_fail_mint_to_zero(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     with pytest.raises(Exception):
         await erc721.mint(0, 0).invoke()
 
 @pytest.mark.asyncio
-async def test_fail_double_mint():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_fail_double_mint(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     with pytest.raises(Exception):
         await erc721.mint(owner.contract_address, 0).invoke()
 
 @pytest.mark.asyncio
-async def test_fail_burn_unminted():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_fail_burn_unminted(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     with pytest.raises(Exception):
         await owner_signer.send_transaction(owner, erc721.contract_address, 'burn', [0])
 
 @pytest.mark.asyncio
-async def test_fail_double_burn():
-    _, erc721, owner, _ = await ownable_factory()
+async def test_fail_double_burn(ownable_factory):
+    _, erc721, owner, _ = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     await owner_signer.send_transaction(owner, erc721.contract_address, 'burn', [0])
     with pytest.raises(Exception):
         await owner_signer.send_transaction(owner, erc721.contract_address, 'burn', [0])
 
 @pytest.mark.asyncio
-async def test_fail_approve_unminted():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_approve_unminted(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     with pytest.raises(Exception):
         await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
 
 @pytest.mark.asyncio
-async def test_fail_approve_unauthorized():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_approve_unauthorized(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     with pytest.raises(Exception):
         await friend_signer.send_transaction(friend, erc721.contract_address, 'approve', [666, 0])
 
 @pytest.mark.asyncio
-async def test_fail_transfer_from_unowned():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_transfer_from_unowned(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     with pytest.raises(Exception):
         await owner_signer.send_transaction(owner, erc721.contract_address, 'transfer_from', [69, 420, 0])
 
 @pytest.mark.asyncio
-async def test_fail_transfer_from_wrong_from():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_transfer_from_wrong_from(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     with pytest.raises(Exception):
         await friend_signer.send_transaction(friend, erc721.contract_address, 'transfer_from', [69, 420, 0])
 
 @pytest.mark.asyncio
-async def test_fail_transfer_from_to_zero():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_transfer_from_to_zero(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
     with pytest.raises(Exception):
         await owner_signer.send_transaction(owner, erc721.contract_address, 'transfer_from', [owner.contract_address, 0, 0])
     
 @pytest.mark.asyncio
-async def test_fail_transfer_from_not_owner():
-    _, erc721, owner, friend = await ownable_factory()
+async def test_fail_transfer_from_not_owner(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
+    await erc721.mint(owner.contract_address, 0).invoke()
+    with pytest.raises(Exception):
+        await friend_signer.send_transaction(friend, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
+
+@pytest.mark.asyncio
+async def test_tracked_nonce_resync(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
+    await erc721.mint(owner.contract_address, 0).invoke()
+    await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
+    # Advance the account nonce behind the tracking signer's back
+    await Signer(123456789987654321).send_transaction(owner, erc721.contract_address, 'approve', [666, 0])
+    await owner_signer.send_transaction(owner, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
+
+    expected_owner = await erc721.owner_of(0).call()
+    assert expected_owner.result.owner == 666
+    expected_nonce = await owner.get_nonce().call()
+    assert expected_nonce.result.res == 3
+
+@pytest.mark.asyncio
+async def test_tracked_explicit_nonce_not_retried(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
+    await erc721.mint(owner.contract_address, 0).invoke()
+    await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [friend.contract_address, 0])
+
+    # A replayed nonce fails instead of being resent with the current one
+    with pytest.raises(Exception):
+        await owner_signer.send_transaction(owner, erc721.contract_address, 'approve', [666, 0], nonce=0)
+
+    expected_spender = await erc721.get_approved(0).call()
+    assert expected_spender.result.spender == friend.contract_address
+    expected_nonce = await owner.get_nonce().call()
+    assert expected_nonce.result.res == 1
+
+@pytest.mark.asyncio
+async def test_batch_approve_transfer_from(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
+    await erc721.mint(owner.contract_address, 0).invoke()
+    await erc721.mint(owner.contract_address, 1).invoke()
+    await owner_signer.send_transactions(owner, [
+        (erc721.contract_address, 'approve', [friend.contract_address, 0]),
+        (erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 1])
+    ])
+
+    expected_spender = await erc721.get_approved(0).call()
+    assert expected_spender.result.spender == friend.contract_address
+    expected_owner = await erc721.owner_of(1).call()
+    assert expected_owner.result.owner == 666
+    # One signature and one nonce bump for the whole batch
+    expected_nonce = await owner.get_nonce().call()
+    assert expected_nonce.result.res == 1
+
+@pytest.mark.asyncio
+async def test_fail_batch_call_past_calldata(ownable_factory):
+    _, erc721, owner, friend = ownable_factory
     await erc721.mint(owner.contract_address, 0).invoke()
+    calls = [(erc721.contract_address, get_selector_from_name('approve'), [friend.contract_address, 0])]
+    call_array, calldata = to_call_array(calls)
+    nonce = await owner_signer.get_nonce(owner)
+    sig_r, sig_s = owner_signer.sign(hash_batch(owner.contract_address, calls, nonce))
+
+    # The entry claims one more felt than the calldata holds
+    to, selector, data_offset, data_len = call_array[0]
+    with pytest.raises(Exception):
+        await owner.execute_batch(
+            [(to, selector, data_offset, data_len + 1)], calldata, nonce
+        ).invoke(signature=[sig_r, sig_s])
+
+    expected_spender = await erc721.get_approved(0).call()
+    assert expected_spender.result.spender == 0
+
+#############################################
+##             Batch Minting               ##
+#############################################
+
+HOLDER = 111
+OTHER = 222
+
+async def assert_owners(erc721, owners):
+    for token_id, owner in owners.items():
+        expected_owner = await erc721.owner_of(token_id).call()
+        assert expected_owner.result.owner == owner
+
+@pytest.mark.asyncio
+async def test_mint_batch(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+
+    await assert_owners(erc721, { 9: 0, 10: HOLDER, 12: HOLDER, 14: HOLDER, 15: 0 })
+    expected_balance = await erc721.balance_of(HOLDER).call()
+    assert expected_balance.result.balance == 5
+    expected_supply = await erc721.total_supply().call()
+    assert expected_supply.result.total_supply == 5
+
+@pytest.mark.asyncio
+async def test_mint_batch_max_size(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 1000, MAX_BATCH_SIZE).invoke()
+    await assert_owners(erc721, {
+        999: 0,
+        1000: HOLDER,
+        1000 + MAX_BATCH_SIZE - 1: HOLDER,
+        1000 + MAX_BATCH_SIZE: 0,
+        1000 + 2 * MAX_BATCH_SIZE - 1: 0
+    })
+
+@pytest.mark.asyncio
+async def test_mint_batch_transfer(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+
+    # The rest of the run stays with the holder, from the middle, start and end
+    await erc721.transfer(OTHER, 12).invoke(caller_address=HOLDER)
+    await erc721.transfer(OTHER, 10).invoke(caller_address=HOLDER)
+    await erc721.transfer(OTHER, 14).invoke(caller_address=HOLDER)
+    await assert_owners(erc721, { 10: OTHER, 11: HOLDER, 12: OTHER, 13: HOLDER, 14: OTHER, 15: 0 })
+
+    expected_balance = await erc721.balance_of(HOLDER).call()
+    assert expected_balance.result.balance == 2
+    expected_balance = await erc721.balance_of(OTHER).call()
+    assert expected_balance.result.balance == 3
+
+    # Transferred ids can move on independently
+    await erc721.transfer(HOLDER, 12).invoke(caller_address=OTHER)
+    await erc721.transfer_from(HOLDER, OTHER, 11).invoke(caller_address=HOLDER)
+    await assert_owners(erc721, { 11: OTHER, 12: HOLDER, 13: HOLDER })
+
+@pytest.mark.asyncio
+async def test_mint_batch_burn(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+
+    await erc721.burn(12).invoke()
+    await erc721.burn(10).invoke()
+    await assert_owners(erc721, { 10: 0, 11: HOLDER, 12: 0, 13: HOLDER, 14: HOLDER })
+    expected_supply = await erc721.total_supply().call()
+    assert expected_supply.result.total_supply == 3
+
+    # Burned ids can be minted again one at a time
+    await erc721.mint(OTHER, 12).invoke()
+    await assert_owners(erc721, { 12: OTHER, 13: HOLDER })
+
+@pytest.mark.asyncio
+async def test_fail_mint_batch_overlap(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+    await erc721.mint(HOLDER, 20).invoke()
+
+    with pytest.raises(Exception):
+        await erc721.mint(OTHER, 14).invoke()
+    with pytest.raises(Exception):
+        await erc721.mint_batch(OTHER, 6, 5).invoke()
+    with pytest.raises(Exception):
+        await erc721.mint_batch(OTHER, 14, 3).invoke()
+    with pytest.raises(Exception):
+        await erc721.mint_batch(OTHER, 15, 10).invoke()
+
+    # Right after the run is free
+    await erc721.mint_batch(OTHER, 15, 5).invoke()
+    await assert_owners(erc721, { 14: HOLDER, 15: OTHER, 19: OTHER, 20: HOLDER })
+
+@pytest.mark.asyncio
+async def test_fail_mint_batch_size(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    with pytest.raises(Exception):
+        await erc721.mint_batch(HOLDER, 10, 0).invoke()
+    with pytest.raises(Exception):
+        await erc721.mint_batch(HOLDER, 10, MAX_BATCH_SIZE + 1).invoke()
+    with pytest.raises(Exception):
+        await erc721.mint_batch(0, 10, 5).invoke()
+
+#############################################
+##             Owner Enumeration           ##
+#############################################
+
+async def assert_tokens_of_owner(erc721, owner, token_ids):
+    expected_tokens = await erc721.tokens_of_owner(owner, 0, len(token_ids) + 1).call()
+    assert expected_tokens.result.token_ids == token_ids
+    for index, token_id in enumerate(token_ids):
+        expected_token = await erc721.token_of_owner_by_index(owner, index).call()
+        assert expected_token.result.token_id == token_id
+
+@pytest.mark.asyncio
+async def test_enumeration(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    for token_id in [1, 2, 3]:
+        await erc721.mint(HOLDER, token_id).invoke()
+    await assert_tokens_of_owner(erc721, HOLDER, [1, 2, 3])
+
+    # The last token moves into the slot of the removed one
+    await erc721.transfer(OTHER, 1).invoke(caller_address=HOLDER)
+    await assert_tokens_of_owner(erc721, HOLDER, [3, 2])
+    await assert_tokens_of_owner(erc721, OTHER, [1])
+
+    await erc721.burn(2).invoke()
+    await assert_tokens_of_owner(erc721, HOLDER, [3])
+
+    # A transfer to self leaves the balance and the tokens as they were
+    await erc721.transfer_from(HOLDER, HOLDER, 3).invoke(caller_address=HOLDER)
+    await assert_tokens_of_owner(erc721, HOLDER, [3])
+    expected_balance = await erc721.balance_of(HOLDER).call()
+    assert expected_balance.result.balance == 1
+
+@pytest.mark.asyncio
+async def test_enumeration_mint_batch(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+    await erc721.mint(HOLDER, 20).invoke()
+    await assert_tokens_of_owner(erc721, HOLDER, [10, 11, 12, 13, 14, 20])
+
+    await erc721.transfer(OTHER, 11).invoke(caller_address=HOLDER)
+    await assert_tokens_of_owner(erc721, HOLDER, [10, 20, 12, 13, 14])
+    await assert_tokens_of_owner(erc721, OTHER, [11])
+
+@pytest.mark.asyncio
+async def test_mint_batch_enumerated_like_balance(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+    await erc721.mint(HOLDER, 20).invoke()
+    await erc721.transfer(OTHER, 11).invoke(caller_address=HOLDER)
+
+    # A transfer to self moves the id to the end, the rest of its run keeps the slot
+    await erc721.transfer_from(HOLDER, HOLDER, 12).invoke(caller_address=HOLDER)
+    await erc721.burn(13).invoke()
+    await assert_tokens_of_owner(erc721, HOLDER, [10, 20, 14, 12])
+
+    # Batched ids are enumerated from the mint, so the views agree with balance_of
+    for owner in [HOLDER, OTHER]:
+        expected_tokens = await erc721.tokens_of_owner(owner, 0, 10).call()
+        expected_balance = await erc721.balance_of(owner).call()
+        assert expected_balance.result.balance == len(expected_tokens.result.token_ids)
+
+@pytest.mark.asyncio
+async def test_enumeration_splits_runs(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+
+    # The ids after a transferred one become a run of their own
+    await erc721.transfer(OTHER, 12).invoke(caller_address=HOLDER)
+    await assert_tokens_of_owner(erc721, HOLDER, [10, 11, 13, 14])
+
+    # The rest of a run keeps its slot when its first id goes
+    await erc721.transfer(OTHER, 13).invoke(caller_address=HOLDER)
+    await erc721.burn(10).invoke()
+    await assert_tokens_of_owner(erc721, HOLDER, [11, 14])
+
+    # The last run moves into the slot of an emptied one
+    await erc721.transfer(OTHER, 11).invoke(caller_address=HOLDER)
+    await assert_tokens_of_owner(erc721, HOLDER, [14])
+    await assert_tokens_of_owner(erc721, OTHER, [12, 13, 11])
+
+@pytest.mark.asyncio
+async def test_mint_batch_storage_independent_of_quantity(ownable_init):
+    written = []
+    for quantity in [2, MAX_BATCH_SIZE]:
+        starknet, erc721 = fork(*ownable_init[:2])
+        before = get_storage(starknet, erc721)
+        await erc721.mint_batch(HOLDER, 1024, quantity).invoke()
+        after = get_storage(starknet, erc721)
+        # Slots only read are accessed too, so count the ones whose value changed
+        written.append(sum(1 for address, value in after.items() if value != before.get(address, 0)))
+
+    # Ownership and enumeration are both written once per run
+    assert written[0] == written[1]
+
+@pytest.mark.asyncio
+async def test_tokens_of_owner_pages(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+
+    for offset, limit, token_ids in [
+        (0, 2, [10, 11]),
+        (2, 2, [12, 13]),
+        (4, 2, [14]),
+        (5, 2, []),
+        (9, 2, []),
+        (1, 0, []),
+    ]:
+        expected_tokens = await erc721.tokens_of_owner(HOLDER, offset, limit).call()
+        assert expected_tokens.result.token_ids == token_ids
+
+@pytest.mark.asyncio
+async def test_fail_token_of_owner_by_index_out_of_range(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 10, 5).invoke()
+    with pytest.raises(Exception):
+        await erc721.token_of_owner_by_index(HOLDER, 5).call()
     with pytest.raises(Exception):
-        await friend_signer.send_transaction(friend, erc721.contract_address, 'transfer_from', [owner.contract_address, 666, 0])
\ No newline at end of file
+        await erc721.token_of_owner_by_index(OTHER, 0).call()
+
+#############################################
+##               Bulk Views                ##
+#############################################
+
+SPENDER = 333
+
+@pytest.mark.asyncio
+async def test_bulk_views_match_scalar_views(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    await erc721.mint_batch(HOLDER, 1000, MAX_BATCH_SIZE).invoke()
+    await erc721.mint_batch(OTHER, 1000 + MAX_BATCH_SIZE, MAX_BATCH_SIZE).invoke()
+    await erc721.mint_batch(HOLDER, 1000 + 2 * MAX_BATCH_SIZE, 64).invoke()
+    await erc721.mint(OTHER, 5000).invoke()
+    await erc721.transfer(OTHER, 1010).invoke(caller_address=HOLDER)
+    await erc721.transfer(HOLDER, 1200).invoke(caller_address=OTHER)
+    await erc721.burn(1020).invoke()
+    await erc721.burn(1000 + MAX_BATCH_SIZE).invoke()
+    await erc721.approve(SPENDER, 1005).invoke(caller_address=HOLDER)
+    await erc721.approve(SPENDER, 1300).invoke(caller_address=HOLDER)
+
+    # Replays the mints, transfers and burns above
+    owners = {}
+    owners.update({ token_id: HOLDER for token_id in range(1000, 1000 + MAX_BATCH_SIZE) })
+    owners.update({ token_id: OTHER for token_id in range(1000 + MAX_BATCH_SIZE, 1000 + 2 * MAX_BATCH_SIZE) })
+    owners.update({ token_id: HOLDER for token_id in range(1000 + 2 * MAX_BATCH_SIZE, 1000 + 2 * MAX_BATCH_SIZE + 64) })
+    owners.update({ 5000: OTHER, 1010: OTHER, 1200: HOLDER, 1020: 0, 1000 + MAX_BATCH_SIZE: 0 })
+    approvals = { 1005: SPENDER, 1300: SPENDER }
+
+    # Consecutive runs of ids, with some out of order ones and never minted ones
+    token_ids = list(range(990, 1340)) + [5000, 1010, 1250, 4999, 1020, 1021]
+    expected_owners = await erc721.owners_of(token_ids).call()
+    assert expected_owners.result.owners == [owners.get(token_id, 0) for token_id in token_ids]
+    expected_approvals = await erc721.approvals_of(token_ids).call()
+    assert expected_approvals.result.approvals == [approvals.get(token_id, 0) for token_id in token_ids]
+    expected_token_uris = await erc721.token_uris(token_ids).call()
+    assert expected_token_uris.result.token_uris == [
+        (str_to_felt("ipfs://"), str_to_felt("hashkek"), token_id) for token_id in token_ids
+    ]
+
+    # Every id against the scalar views too. Views are invoked on the test's fork
+    # since call() copies the whole state each time
+    for i, token_id in enumerate(token_ids):
+        expected_owner = await erc721.owner_of(token_id).invoke()
+        assert expected_owners.result.owners[i] == expected_owner.result.owner
+        expected_approval = await erc721.get_approved(token_id).invoke()
+        assert expected_approvals.result.approvals[i] == expected_approval.result.spender
+        expected_token_uri = await erc721.token_uri(token_id).invoke()
+        assert expected_token_uris.result.token_uris[i] == expected_token_uri.result.token_uri
+
+@pytest.mark.asyncio
+async def test_bulk_views_empty(ownable_factory):
+    _, erc721, _, _ = ownable_factory
+    expected_owners = await erc721.owners_of([]).call()
+    assert expected_owners.result.owners == []
+    expected_approvals = await erc721.approvals_of([]).call()
+    assert expected_approvals.result.approvals == []
+    expected_token_uris = await erc721.token_uris([]).call()
+    assert expected_token_uris.result.token_uris == []
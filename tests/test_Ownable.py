@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 from starkware.starknet.testing.starknet import Starknet
-from utils import Signer
+from utils import deploy, fork, Signer, PooledSigner
 
 signer = Signer(123456789987654321)
 
@@ -12,12 +12,14 @@ def event_loop():
 @pytest.fixture(scope='module')
 async def ownable_factory():
     starknet = await Starknet.empty()
-    owner = await starknet.deploy(
+    owner = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[signer.public_key]
     )
 
-    ownable = await starknet.deploy(
+    ownable = await deploy(
+        starknet,
         "contracts/utils/Ownable.cairo",
         constructor_calldata=[owner.contract_address]
     )
@@ -36,4 +38,35 @@ async def test_transfer_ownership(ownable_factory):
     new_owner = 123
     await signer.send_transaction(owner, ownable.contract_address, 'transfer_ownership', [new_owner])
     executed_info = await ownable.get_owner().call()
-    assert executed_info.result == (new_owner,)
\ No newline at end of file
+    assert executed_info.result == (new_owner,)
+
+@pytest.mark.asyncio
+async def test_presigned_transactions(ownable_factory):
+    _, ownable, owner = ownable_factory
+    # transfer_ownership isn't access controlled, so the account can keep calling it
+    async with PooledSigner(123456789987654321) as pooled_signer:
+        presigned = await pooled_signer.presign_transactions(owner, [
+            (ownable.contract_address, 'transfer_ownership', [new_owner])
+            for new_owner in range(1, 5)
+        ])
+        await pooled_signer.send_presigned(owner, presigned)
+    executed_info = await ownable.get_owner().call()
+    assert executed_info.result == (4,)
+
+@pytest.mark.asyncio
+async def test_fork_is_independent(ownable_factory):
+    starknet, ownable, owner = ownable_factory
+    executed_info = await ownable.get_owner().call()
+    original_owner = executed_info.result.owner
+
+    _, forked_ownable = fork(starknet, ownable)
+    await forked_ownable.transfer_ownership(111).invoke(caller_address=owner.contract_address)
+    executed_info = await forked_ownable.get_owner().call()
+    assert executed_info.result.owner == 111
+    executed_info = await ownable.get_owner().call()
+    assert executed_info.result.owner == original_owner
+
+    # And the other way around
+    await ownable.transfer_ownership(222).invoke(caller_address=owner.contract_address)
+    executed_info = await forked_ownable.get_owner().call()
+    assert executed_info.result.owner == 111
@@ -1,9 +1,10 @@
 import pytest
 import asyncio
 from starkware.starknet.testing.starknet import Starknet
-from utils import Signer, uint, str_to_felt, MAX_UINT256
+from utils import deploy, fork, Signer, uint, str_to_felt, MAX_UINT256, assert_revert, set_block_timestamp, get_execution_resources, CHAIN_ID
 
 signer = Signer(123456789987654321)
+other_signer = Signer(987654321123456789)
 
 
 @pytest.fixture(scope='module')
@@ -14,14 +15,17 @@ def event_loop():
 @pytest.fixture(scope='module')
 async def ownable_factory():
     starknet = await Starknet.empty()
-    owner = await starknet.deploy(
+    owner = await deploy(
+        starknet,
         "contracts/utils/Account.cairo",
         constructor_calldata=[signer.public_key]
     )
 
-    staking_rewards = await starknet.deploy(
+    staking_rewards = await deploy(
+        starknet,
         "contracts/defi/StakingRewards.cairo",
         constructor_calldata=[
+            owner.contract_address,
             1,
             2
         ]
@@ -31,7 +35,9 @@ async def ownable_factory():
 
 @pytest.mark.asyncio
 async def test_constructor(ownable_factory):
-    _, staking_rewards, _ = ownable_factory
+    _, staking_rewards, owner = ownable_factory
+    exp_owner = await staking_rewards.getOwner().call()
+    assert exp_owner.result.owner == owner.contract_address
     exp_staking_token = await staking_rewards.stakingToken().call()
     assert exp_staking_token.result.token == 1
     exp_reward_token = await staking_rewards.rewardToken().call()
@@ -39,21 +45,24 @@ async def test_constructor(ownable_factory):
 
 
 @pytest.mark.asyncio
-async def test_set_staking_token(ownable_factory):
-    _, staking_rewards, owner = ownable_factory
-    new_staking_token = 3
-    await signer.send_transaction(owner, staking_rewards.contract_address, 'setStakingToken', [new_staking_token])
-    executed_info = await staking_rewards.stakingToken().call()
-    assert executed_info.result.token == new_staking_token
+async def test_tokens_fixed_at_construction(ownable_factory):
+    starknet, staking_rewards, owner = ownable_factory
+    other = await deploy(
+        starknet,
+        "contracts/utils/Account.cairo",
+        constructor_calldata=[other_signer.public_key]
+    )
 
+    # Neither the owner nor anyone else can repoint the tokens after construction
+    for account, account_signer in [(owner, signer), (other, other_signer)]:
+        for selector in ['setStakingToken', 'setRewardToken']:
+            with pytest.raises(Exception):
+                await account_signer.send_transaction(account, staking_rewards.contract_address, selector, [3])
 
-@pytest.mark.asyncio
-async def test_set_reward_token(ownable_factory):
-    _, staking_rewards, owner = ownable_factory
-    new_reward_token = 3
-    await signer.send_transaction(owner, staking_rewards.contract_address, 'setRewardToken', [new_reward_token])
-    executed_info = await staking_rewards.rewardToken().call()
-    assert executed_info.result.token == new_reward_token
+    exp_staking_token = await staking_rewards.stakingToken().call()
+    assert exp_staking_token.result.token == 1
+    exp_reward_token = await staking_rewards.rewardToken().call()
+    assert exp_reward_token.result.token == 2
 
 
 @pytest.mark.asyncio
@@ -65,3 +74,318 @@ async def test_set_reward_rate(ownable_factory):
     await signer.send_transaction(owner, staking_rewards.contract_address, 'setRewardRate', [*new_rate])
     updated_rate = await staking_rewards.rewardRate().call()
     assert updated_rate.result.rate == new_rate
+
+    # Only the owner re-rates accrual
+    await assert_revert(staking_rewards.setRewardRate(uint(4)).invoke(caller_address=123))
+
+
+#############################################
+##           Reward Accounting             ##
+#############################################
+
+OWNER = 9
+TOKEN_OWNER = 10
+USER_A = 11
+USER_B = 12
+RATE = 10
+START = 1000
+
+
+async def deploy_token(starknet, symbol):
+    return await deploy(
+        starknet,
+        "contracts/mocks/MockERC20.cairo",
+        constructor_calldata=[
+            str_to_felt("Test Token"),
+            str_to_felt(symbol),
+            18,
+            *uint(0),
+            TOKEN_OWNER,
+            CHAIN_ID
+        ]
+    )
+
+
+@pytest.fixture(scope='module')
+async def staking_init():
+    starknet = await Starknet.empty()
+    staking_token = await deploy_token(starknet, "STK")
+    reward_token = await deploy_token(starknet, "RWD")
+    staking_rewards = await deploy(
+        starknet,
+        "contracts/defi/StakingRewards.cairo",
+        constructor_calldata=[
+            OWNER,
+            staking_token.contract_address,
+            reward_token.contract_address
+        ]
+    )
+
+    await reward_token.mint(staking_rewards.contract_address, uint(10 ** 9)).invoke(caller_address=TOKEN_OWNER)
+    for user in [USER_A, USER_B]:
+        await staking_token.mint(user, uint(1000)).invoke(caller_address=TOKEN_OWNER)
+        await staking_token.approve(staking_rewards.contract_address, MAX_UINT256).invoke(caller_address=user)
+
+    set_block_timestamp(starknet, START)
+    await staking_rewards.setRewardRate(uint(RATE)).invoke(caller_address=OWNER)
+    return starknet, staking_rewards, staking_token, reward_token
+
+
+@pytest.fixture
+def staking_factory(staking_init):
+    # Each test gets its own fork of the deployed state
+    return fork(*staking_init)
+
+
+@pytest.mark.asyncio
+async def test_rewards_accrue_over_time(staking_factory):
+    starknet, staking_rewards, _, _ = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+
+    # USER_A earns the whole rate while staking alone
+    set_block_timestamp(starknet, START + 10)
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(10 * RATE)
+
+    # Then shares it 1:3 with USER_B
+    await staking_rewards.stake(uint(300)).invoke(caller_address=USER_B)
+    set_block_timestamp(starknet, START + 30)
+
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(10 * RATE + 20 * RATE // 4)
+    earned = await staking_rewards.earned(USER_B).call()
+    assert earned.result[0] == uint(20 * RATE * 3 // 4)
+
+    last_update = await staking_rewards.lastUpdateTime().call()
+    assert last_update.result.time == uint(START + 10)
+
+
+@pytest.mark.asyncio
+async def test_no_rewards_without_stakers(staking_factory):
+    starknet, staking_rewards, _, _ = staking_factory
+    set_block_timestamp(starknet, START + 50)
+    reward_per_token = await staking_rewards.rewardPerToken().call()
+    assert reward_per_token.result.reward == uint(0)
+
+    # Nothing is owed for the time nobody was staking
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    set_block_timestamp(starknet, START + 60)
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(10 * RATE)
+
+
+@pytest.mark.asyncio
+async def test_get_reward(staking_factory):
+    starknet, staking_rewards, _, reward_token = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    set_block_timestamp(starknet, START + 10)
+
+    await staking_rewards.getReward().invoke(caller_address=USER_A)
+
+    balance = await reward_token.balance_of(USER_A).call()
+    assert balance.result.balance == uint(10 * RATE)
+    rewards = await staking_rewards.rewards(USER_A).call()
+    assert rewards.result.reward == uint(0)
+
+
+@pytest.mark.asyncio
+async def test_withdraw(staking_factory):
+    starknet, staking_rewards, staking_token, _ = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    set_block_timestamp(starknet, START + 10)
+
+    await assert_revert(staking_rewards.withdraw(uint(101)).invoke(caller_address=USER_A))
+    await staking_rewards.withdraw(uint(40)).invoke(caller_address=USER_A)
+
+    balance = await staking_token.balance_of(USER_A).call()
+    assert balance.result.balance == uint(940)
+
+    # Rewards earned before the withdrawal are kept
+    rewards = await staking_rewards.rewards(USER_A).call()
+    assert rewards.result.reward == uint(10 * RATE)
+
+
+@pytest.mark.asyncio
+async def test_set_reward_rate_accrues_previous_rate(staking_factory):
+    starknet, staking_rewards, _, _ = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    set_block_timestamp(starknet, START + 10)
+    await staking_rewards.setRewardRate(uint(2 * RATE)).invoke(caller_address=OWNER)
+    set_block_timestamp(starknet, START + 20)
+
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(10 * RATE + 10 * 2 * RATE)
+
+
+@pytest.mark.asyncio
+async def test_reward_overflow_reverts(staking_factory):
+    starknet, staking_rewards, _, _ = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    await staking_rewards.setRewardRate((0, 2 ** 127)).invoke(caller_address=OWNER)
+    set_block_timestamp(starknet, START + 10)
+
+    # rate * elapsed * 1e18 no longer fits in 256 bits
+    await assert_revert(staking_rewards.earned(USER_A).call())
+    await assert_revert(staking_rewards.getReward().invoke(caller_address=USER_A))
+
+
+@pytest.mark.asyncio
+async def test_stake_cost_independent_of_stakers(staking_factory):
+    starknet, staking_rewards, staking_token, _ = staking_factory
+
+    steps = []
+    for i in range(20):
+        user = 100 + i
+        await staking_token.mint(user, uint(1000)).invoke(caller_address=TOKEN_OWNER)
+        await staking_token.approve(staking_rewards.contract_address, MAX_UINT256).invoke(caller_address=user)
+        set_block_timestamp(starknet, START + i + 1)
+        execution_info = await staking_rewards.stake(uint(100)).invoke(caller_address=user)
+        steps.append(get_execution_resources(execution_info).n_steps)
+
+    # Only the first stake, with no supply yet, takes the cheaper path. The rest differ by a few
+    # steps with the values the uint256 arithmetic sees, but don't grow with the number of stakers
+    assert steps[0] < min(steps[1:])
+    assert max(steps[1:]) - min(steps[1:]) < 32
+
+
+# (storage reads logged, n_steps) of each entry point before updateReward returned the slots it read,
+# measured on cairo-lang 0.7.0 with the calls in test_entry_points_read_each_slot_once
+REREADING_COSTS = {
+    'stake': (39, 4292),
+    'withdraw': (39, 4100),
+    'getReward': (35, 3793),
+}
+
+
+@pytest.mark.asyncio
+async def test_entry_points_read_each_slot_once(staking_factory):
+    starknet, staking_rewards, _, _ = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_B)
+
+    # Uint256 slots each call writes: the reward per token, the update time and the user's
+    # reward and paid reward per token, plus the total supply and balance when staking
+    for i, (selector, calldata, writes) in enumerate([
+        ('stake', [*uint(100)], 12),
+        ('withdraw', [*uint(40)], 12),
+        ('getReward', [], 8),
+    ]):
+        set_block_timestamp(starknet, START + 10 * (i + 1))
+        execution_info = await starknet.state.invoke_raw(
+            staking_rewards.contract_address, selector, calldata, USER_A
+        )
+        call_info = execution_info.call_info
+        # storage_read_values also logs the previous value of every written slot
+        reads = len(call_info.storage_read_values)
+        assert reads - writes == len(call_info.storage_accessed_addresses)
+
+        rereading_reads, rereading_steps = REREADING_COSTS[selector]
+        assert reads < rereading_reads
+        assert get_execution_resources(execution_info).n_steps < rereading_steps
+
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(0)
+
+
+#############################################
+##             Batch Staking               ##
+#############################################
+
+DISTRIBUTOR = 13
+
+
+async def fund_distributor(staking_rewards, staking_token, amount):
+    await staking_token.mint(DISTRIBUTOR, uint(amount)).invoke(caller_address=TOKEN_OWNER)
+    await staking_token.approve(staking_rewards.contract_address, MAX_UINT256).invoke(caller_address=DISTRIBUTOR)
+
+
+@pytest.mark.asyncio
+async def test_stake_for(staking_factory):
+    starknet, staking_rewards, staking_token, _ = staking_factory
+    await fund_distributor(staking_rewards, staking_token, 1000)
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+
+    recipients = [USER_A, USER_B, 100, USER_B]
+    amounts = [uint(10), uint(20), uint(30), uint(40)]
+    set_block_timestamp(starknet, START + 10)
+    execution_info = await staking_rewards.stakeFor(recipients, amounts).invoke(caller_address=DISTRIBUTOR)
+
+    balance = await staking_token.balance_of(DISTRIBUTOR).call()
+    assert balance.result.balance == uint(900)
+    total_supply = await staking_rewards.totalSupply().call()
+    assert total_supply.result.total_supply == uint(200)
+    for user, staked in [(USER_A, 110), (USER_B, 60), (100, 30)]:
+        balance = await staking_rewards.balanceOf(user).call()
+        assert balance.result.balance == uint(staked)
+
+    # Rewards accrued before the stake are settled, not diluted
+    earned = await staking_rewards.earned(USER_A).call()
+    assert earned.result[0] == uint(10 * RATE)
+
+    # A single call into the staking token
+    assert len(execution_info.internal_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_stake_for_grants_no_claim(staking_factory):
+    starknet, staking_rewards, staking_token, _ = staking_factory
+    await fund_distributor(staking_rewards, staking_token, 1000)
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    set_block_timestamp(starknet, START + 10)
+
+    # Staking a dust amount for a user doesn't make the staker their delegate
+    await staking_rewards.stakeFor([USER_A], [uint(1)]).invoke(caller_address=DISTRIBUTOR)
+    delegate = await staking_rewards.rewardDelegate(USER_A).call()
+    assert delegate.result.delegate == 0
+
+    await assert_revert(staking_rewards.claimMany([USER_A]).invoke(caller_address=DISTRIBUTOR))
+    rewards = await staking_rewards.rewards(USER_A).call()
+    assert rewards.result.reward == uint(10 * RATE)
+
+
+@pytest.mark.asyncio
+async def test_stake_for_length_mismatch(staking_factory):
+    _, staking_rewards, staking_token, _ = staking_factory
+    await fund_distributor(staking_rewards, staking_token, 1000)
+
+    await assert_revert(
+        staking_rewards.stakeFor([USER_A, USER_B], [uint(10)]).invoke(caller_address=DISTRIBUTOR)
+    )
+
+
+@pytest.mark.asyncio
+async def test_claim_many(staking_factory):
+    starknet, staking_rewards, staking_token, reward_token = staking_factory
+    await fund_distributor(staking_rewards, staking_token, 1000)
+    await staking_rewards.stakeFor([USER_A, USER_B], [uint(100), uint(300)]).invoke(caller_address=DISTRIBUTOR)
+    for user in [USER_A, USER_B]:
+        await staking_rewards.setRewardDelegate(DISTRIBUTOR).invoke(caller_address=user)
+
+    set_block_timestamp(starknet, START + 20)
+    execution_info = await staking_rewards.claimMany([USER_A, USER_B]).invoke(caller_address=DISTRIBUTOR)
+
+    balance = await reward_token.balance_of(DISTRIBUTOR).call()
+    assert balance.result.balance == uint(20 * RATE)
+    for user in [USER_A, USER_B]:
+        rewards = await staking_rewards.rewards(user).call()
+        assert rewards.result.reward == uint(0)
+        earned = await staking_rewards.earned(user).call()
+        assert earned.result[0] == uint(0)
+
+    # A single call into the reward token
+    assert len(execution_info.internal_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_claim_many_requires_delegate(staking_factory):
+    starknet, staking_rewards, _, reward_token = staking_factory
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_A)
+    await staking_rewards.stake(uint(100)).invoke(caller_address=USER_B)
+    set_block_timestamp(starknet, START + 20)
+
+    await assert_revert(staking_rewards.claimMany([USER_A, USER_B]).invoke(caller_address=USER_A))
+
+    # Users can always claim their own rewards
+    await staking_rewards.setRewardDelegate(USER_A).invoke(caller_address=USER_B)
+    await staking_rewards.claimMany([USER_A, USER_B]).invoke(caller_address=USER_A)
+    balance = await reward_token.balance_of(USER_A).call()
+    assert balance.result.balance == uint(20 * RATE)
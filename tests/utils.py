@@ -6,12 +6,36 @@ from starkware.crypto.signature.signature import private_to_stark_key, sign
 from starkware.starknet.definitions.error_codes import StarknetErrorCode
 from starkware.starkware_utils.error_handling import StarkException
 from starkware.starknet.public.abi import get_selector_from_name
+from starkware.starknet.compiler.compile import compile_starknet_files
+from starkware.starknet.testing.starknet import Starknet
+from starkware.starknet.business_logic.state import BlockInfo
+from starkware.starknet.services.api.contract_definition import ContractDefinition
+from starkware.cairo.lang.version import __version__ as CAIRO_LANG_VERSION
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
 import math
+import os
+import re
+import sys
+import weakref
 
 MAX_UINT256 = (2**128 - 1, 2**128 - 1)
 PRIME = 3618502788666131213697322783095070105623107215331596699973092056135872020481
 PRIME_HALF = PRIME / 2
 FP_SCALE = 2 ** 61
+# 'Permit' as a Cairo short string
+PERMIT_TYPEHASH = int.from_bytes(b'Permit', 'big')
+# 'StarkNetDomain' as a Cairo short string
+DOMAIN_TYPEHASH = int.from_bytes(b'StarkNetDomain', 'big')
+# The chain id tokens are deployed with in tests, 'SN_GOERLI' as a Cairo short string
+CHAIN_ID = int.from_bytes(b'SN_GOERLI', 'big')
+
+# Compiled contract definitions are cached on disk, keyed by the contract source,
+# every local module it imports and the cairo-lang version
+CONTRACT_CACHE_DIR = os.environ.get('CAIRO_CONTRACT_CACHE', '.cairo_cache')
+CAIRO_IMPORT = re.compile(r'^\s*from\s+([\w.]+)\s+import', re.MULTILINE)
+_contract_definitions = {}
 
 def str_to_felt(text):
     b_text = bytes(text, 'UTF-8')
@@ -46,6 +70,21 @@ def fp_64x61_to_felt(fp):
 def is_fp_close(fp_1, fp_2):
     return math.isclose(fp_1, fp_2, rel_tol=1e-6)
 
+def get_execution_resources(execution_info):
+    """Returns the ExecutionResources (n_steps, builtin_instance_counter, n_memory_holes) of a call."""
+    return execution_info.call_info.cairo_usage
+
+def get_storage(starknet, contract):
+    """Returns the value of every storage slot of `contract` accessed so far in `starknet`'s state, by address."""
+    updates = starknet.state.state.contract_states[contract.contract_address].storage_updates
+    return {address: leaf.value for address, leaf in updates.items()}
+
+def set_block_timestamp(starknet, timestamp):
+    """Sets the timestamp returned by get_block_timestamp to the following transactions."""
+    block_info = starknet.state.state.block_info
+    starknet.state.state.block_info = BlockInfo(
+        block_number=block_info.block_number, block_timestamp=timestamp)
+
 async def assert_invoked_revert(fun, caller):
     try:
         await fun.invoke(caller_address=caller)
@@ -69,6 +108,11 @@ class Signer():
     Parameters
     ----------
     private_key : int
+    track_nonces : bool
+        Cache each account's nonce locally instead of querying it before every
+        transaction. The cache is advanced after each successful `execute` and
+        resynced from the account when a transaction sent with a cached nonce fails.
+        A nonce passed explicitly is never replaced.
     Examples
     ---------
     Constructing a Singer object
@@ -79,27 +123,183 @@ class Signer():
                                       'set_public_key', 
                                       [other.public_key]
                                      )
+    Sending a batch of transactions under one signature
+    >>> await signer.send_transactions(account, [
+                                           (token, 'approve', [spender, *amount]),
+                                           (spender, 'stake', [*amount])
+                                       ])
+    Signing a permit that a spender submits instead of an `approve`
+    >>> signature = signer.sign_permit(token.contract_address, account.contract_address,
+                                       spender, amount, nonce, deadline, chain_id=CHAIN_ID)
     """
 
-    def __init__(self, private_key):
+    def __init__(self, private_key, track_nonces=False):
         self.private_key = private_key
         self.public_key = private_to_stark_key(private_key)
+        self.track_nonces = track_nonces
+        # Keyed by the account's state first, so forked states never share nonces
+        self._nonces = weakref.WeakKeyDictionary()
 
     def sign(self, message_hash):
         return sign(msg_hash=message_hash, priv_key=self.private_key)
 
-    async def send_transaction(self, account, to, selector_name, calldata, nonce=None):
-        if nonce is None:
-            execution_info = await account.get_nonce().call()
-            nonce, = execution_info.result
+    def sign_permit(self, token, owner, spender, amount, nonce, deadline, chain_id=CHAIN_ID):
+        """Returns the [sig_r, sig_s] signature that lets `spender` spend `amount` of `owner`'s `token`."""
+        domain_separator = hash_domain_separator(chain_id, token)
+        return list(self.sign(hash_permit(domain_separator, owner, spender, amount, nonce, deadline)))
 
+    async def get_nonce(self, account):
+        if self.track_nonces:
+            nonces = self._nonces.get(account.state, {})
+            if account.contract_address in nonces:
+                return nonces[account.contract_address]
+        return await self._fetch_nonce(account)
+
+    async def _fetch_nonce(self, account):
+        execution_info = await account.get_nonce().call()
+        nonce, = execution_info.result
+        return nonce
+
+    async def send_transaction(self, account, to, selector_name, calldata, nonce=None):
         selector = get_selector_from_name(selector_name)
+        return await self._send(account, self._execute, (to, selector, calldata), nonce)
+
+    async def send_transactions(self, account, calls, nonce=None):
+        """Sends `calls`, a list of (to, selector_name, calldata), through `execute_batch`."""
+        calls = [(to, get_selector_from_name(selector_name), calldata) for to, selector_name, calldata in calls]
+        return await self._send(account, self._execute_batch, (calls,), nonce)
+
+    async def _send(self, account, execute, args, nonce):
+        # Only a nonce the signer picked itself may be stale, a caller's nonce is sent as given
+        cached = nonce is None
+        if cached:
+            nonce = await self.get_nonce(account)
+
+        try:
+            execution_info = await execute(account, *args, nonce)
+        except StarkException:
+            if not (self.track_nonces and cached):
+                raise
+            # Resync, and retry once if the failure came from a stale cached nonce
+            current_nonce = await self._fetch_nonce(account)
+            self._nonces.setdefault(account.state, {})[account.contract_address] = current_nonce
+            if current_nonce == nonce:
+                raise
+            nonce = current_nonce
+            execution_info = await execute(account, *args, nonce)
+
+        if self.track_nonces:
+            self._nonces.setdefault(account.state, {})[account.contract_address] = nonce + 1
+        return execution_info
+
+    async def _execute(self, account, to, selector, calldata, nonce):
         message_hash = hash_message(
             account.contract_address, to, selector, calldata, nonce)
         sig_r, sig_s = self.sign(message_hash)
 
         return await account.execute(to, selector, calldata, nonce).invoke(signature=[sig_r, sig_s])
 
+    async def _execute_batch(self, account, calls, nonce):
+        call_array, calldata = to_call_array(calls)
+        message_hash = hash_batch(account.contract_address, calls, nonce)
+        sig_r, sig_s = self.sign(message_hash)
+
+        return await account.execute_batch(call_array, calldata, nonce).invoke(signature=[sig_r, sig_s])
+
+
+class PooledSigner(Signer):
+    """
+    Signer that hashes and signs in a process pool, keeping the event loop free and
+    using every core when many signed transactions are generated.
+    Parameters
+    ----------
+    private_key : int
+    track_nonces : bool
+    max_workers : int, defaults to the number of cores
+    Examples
+    ---------
+    Signing a run of transactions up front, then submitting them
+    >>> async with PooledSigner(1234, track_nonces=True) as signer:
+    >>>     presigned = await signer.presign_transactions(account, [
+                                                             (token, 'transfer', [to, *amount]),
+                                                             ...
+                                                         ])
+    >>>     await signer.send_presigned(account, presigned)
+    """
+
+    def __init__(self, private_key, track_nonces=False, max_workers=None):
+        super().__init__(private_key, track_nonces)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def sign_transaction(self, sender, to, selector, calldata, nonce):
+        """Returns the (message_hash, (sig_r, sig_s)) of a transaction, computed in the pool."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, sign_transaction, self.private_key, sender, to, selector, list(calldata), nonce)
+
+    async def sign_batch(self, sender, calls, nonce):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, sign_batch, self.private_key, sender, calls, nonce)
+
+    async def presign_transactions(self, account, calls, nonce=None):
+        """
+        Signs `calls`, a list of (to, selector_name, calldata), for consecutive nonces
+        starting at `nonce` in parallel. Returns a list of (to, selector, calldata, nonce, signature).
+        """
+        if nonce is None:
+            nonce = await self.get_nonce(account)
+
+        txs = [
+            (to, get_selector_from_name(selector_name), calldata, nonce + i)
+            for i, (to, selector_name, calldata) in enumerate(calls)
+        ]
+        signed = await asyncio.gather(*(
+            self.sign_transaction(account.contract_address, *tx) for tx in txs
+        ))
+        return [(*tx, signature) for tx, (_, signature) in zip(txs, signed)]
+
+    async def send_presigned(self, account, presigned):
+        """Submits transactions from `presign_transactions` in nonce order."""
+        results = []
+        for to, selector, calldata, nonce, signature in presigned:
+            results.append(await account.execute(to, selector, calldata, nonce).invoke(signature=list(signature)))
+            if self.track_nonces:
+                self._nonces.setdefault(account.state, {})[account.contract_address] = nonce + 1
+        return results
+
+    async def _execute(self, account, to, selector, calldata, nonce):
+        _, (sig_r, sig_s) = await self.sign_transaction(
+            account.contract_address, to, selector, calldata, nonce)
+
+        return await account.execute(to, selector, calldata, nonce).invoke(signature=[sig_r, sig_s])
+
+    async def _execute_batch(self, account, calls, nonce):
+        call_array, calldata = to_call_array(calls)
+        _, (sig_r, sig_s) = await self.sign_batch(account.contract_address, calls, nonce)
+
+        return await account.execute_batch(call_array, calldata, nonce).invoke(signature=[sig_r, sig_s])
+
+
+# Module level so that PooledSigner's worker processes can run them
+def sign_transaction(private_key, sender, to, selector, calldata, nonce):
+    message_hash = hash_message(sender, to, selector, calldata, nonce)
+    return message_hash, sign(msg_hash=message_hash, priv_key=private_key)
+
+
+def sign_batch(private_key, sender, calls, nonce):
+    message_hash = hash_batch(sender, calls, nonce)
+    return message_hash, sign(msg_hash=message_hash, priv_key=private_key)
+
 
 def hash_message(sender, to, selector, calldata, nonce):
     message = [
@@ -109,4 +309,161 @@ def hash_message(sender, to, selector, calldata, nonce):
         compute_hash_on_elements(calldata),
         nonce
     ]
-    return compute_hash_on_elements(message)
\ No newline at end of file
+    return compute_hash_on_elements(message)
+
+
+def hash_domain_separator(chain_id, token):
+    """The domain separator an ERC20 stores at construction."""
+    return compute_hash_on_elements([DOMAIN_TYPEHASH, chain_id, token])
+
+
+def hash_permit(domain_separator, owner, spender, amount, nonce, deadline):
+    """The message an ERC20 `permit` checks against `owner`'s account."""
+    message = [
+        PERMIT_TYPEHASH,
+        domain_separator,
+        owner,
+        spender,
+        *amount,
+        nonce,
+        deadline
+    ]
+    return compute_hash_on_elements(message)
+
+
+def to_call_array(calls):
+    """Flattens (to, selector, calldata) calls into Account.execute_batch's (call_array, calldata)."""
+    call_array = []
+    calldata = []
+    for to, selector, call_calldata in calls:
+        call_array.append((to, selector, len(calldata), len(call_calldata)))
+        calldata.extend(call_calldata)
+    return call_array, calldata
+
+
+def hash_batch(sender, calls, nonce):
+    call_hashes = [
+        compute_hash_on_elements([to, selector, compute_hash_on_elements(calldata)])
+        for to, selector, calldata in calls
+    ]
+    message = [
+        sender,
+        compute_hash_on_elements(call_hashes),
+        nonce
+    ]
+    return compute_hash_on_elements(message)
+
+
+#############################################
+##         COMPILED CONTRACT CACHE         ##
+#############################################
+
+def _local_imports(path):
+    with open(path, 'rb') as f:
+        source = f.read().decode('utf-8')
+    for module in CAIRO_IMPORT.findall(source):
+        # starkware.* modules are covered by the cairo-lang version
+        module_path = module.replace('.', os.sep) + '.cairo'
+        if os.path.isfile(module_path):
+            yield module_path
+
+def contract_hash(path):
+    """Hashes a contract source together with every local module it imports."""
+    seen = set()
+    pending = [os.path.normpath(path)]
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        pending.extend(os.path.normpath(p) for p in _local_imports(current))
+
+    digest = hashlib.sha256(CAIRO_LANG_VERSION.encode())
+    for current in sorted(seen):
+        with open(current, 'rb') as f:
+            digest.update(current.encode())
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def get_contract_definition(path):
+    """
+    Returns the compiled definition of the contract at `path`, compiling it only
+    when neither this process nor the on-disk cache has seen the same sources.
+    """
+    key = contract_hash(path)
+    if key in _contract_definitions:
+        return _contract_definitions[key]
+
+    cache_file = os.path.join(CONTRACT_CACHE_DIR, key + '.json')
+    if os.path.isfile(cache_file):
+        with open(cache_file) as f:
+            contract_def = ContractDefinition.loads(f.read())
+    else:
+        contract_def = compile_starknet_files(files=[path], debug_info=True)
+        os.makedirs(CONTRACT_CACHE_DIR, exist_ok=True)
+        # Write then rename so concurrent test sessions never read a partial file
+        tmp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            f.write(contract_def.dumps())
+        os.replace(tmp_file, cache_file)
+
+    _contract_definitions[key] = contract_def
+    return contract_def
+
+async def deploy(starknet, path, constructor_calldata=None):
+    """Deploys the contract at `path` using the compiled contract cache."""
+    return await starknet.deploy(
+        contract_def=get_contract_definition(path),
+        constructor_calldata=constructor_calldata
+    )
+
+def fork(starknet, *contracts):
+    """
+    Copies a deployed Starknet state so a test can mutate it without touching the original.
+    Returns the forked Starknet followed by `contracts` rebound to the forked state.
+    """
+    forked = Starknet(state=starknet.state.copy())
+    return (forked, *(_rebind(contract, forked.state) for contract in contracts))
+
+def _rebind(contract, state):
+    # copy.copy would go through StarknetContract.__getattr__ before __dict__ is set and recurse forever
+    rebound = object.__new__(type(contract))
+    rebound.__dict__.update(contract.__dict__)
+    rebound.state = state
+    # StarknetContract caches its function proxies in _contract_functions, and each one
+    # closes over the contract it was built for, so a shared cache would keep calling the original state
+    rebound._contract_functions = {}
+    return rebound
+
+def warm_contract_cache(paths):
+    """Compiles every contract in `paths` into the cache, returning the ones that failed."""
+    failed = []
+    for path in paths:
+        try:
+            get_contract_definition(path)
+        except Exception as err:
+            print('%s: %s' % (path, err), file=sys.stderr)
+            failed.append(path)
+    return failed
+
+def find_contracts(*roots):
+    """Lists every deployable contract under `roots`, skipping interfaces."""
+    paths = []
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            if os.path.basename(dirpath) == 'interfaces':
+                continue
+            paths.extend(
+                os.path.join(dirpath, name)
+                for name in sorted(filenames) if name.endswith('.cairo')
+            )
+    return sorted(paths)
+
+
+if __name__ == '__main__':
+    # Warm-cache mode: `python tests/utils.py [contracts...]` compiles everything up front
+    targets = sys.argv[1:] or find_contracts('contracts', 'tests/mocks')
+    failed = warm_contract_cache(targets)
+    print('cached %d/%d contracts in %s' % (len(targets) - len(failed), len(targets), CONTRACT_CACHE_DIR))
+    # A contract that no longer compiles fails the run, so CI catches it before the tests do
+    sys.exit(1 if failed else 0)